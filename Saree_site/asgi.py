@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Saree_site.settings')
+# storefront statement timeout (Saree_site/database.py)
+os.environ.setdefault('DATABASE_ROLE', 'storefront')
 
 application = get_asgi_application()
@@ -0,0 +1,106 @@
+"""
+Database settings from the environment.
+
+``DATABASES["default"]`` used to be hard-coded with no ``CONN_MAX_AGE`` and
+no pool, so every request opened a new PostgreSQL connection (TCP, auth, a
+fresh backend process) and closed it again. ``database()`` builds the alias
+from ``DATABASE_*`` variables (the old values are the defaults):
+
+* ``DATABASE_POOL`` (default on): psycopg 3's connection pool. A request
+  borrows a connection and hands it back when it finishes; each process
+  keeps ``DATABASE_POOL_MIN_SIZE`` .. ``DATABASE_POOL_MAX_SIZE`` open. With
+  the pool off, connections persist for ``DATABASE_CONN_MAX_AGE`` seconds
+  instead. Either way ``CONN_HEALTH_CHECKS`` tests a reused connection, so a
+  database restart or failover costs one reconnect rather than an error;
+* ``statement_timeout`` by process role (``DATABASE_ROLE``). The storefront
+  (``asgi.py``, ``wsgi.py``, ``runserver``) cancels a query after
+  ``DATABASE_STATEMENT_TIMEOUT`` ms so one slow query cannot hold a pooled
+  connection for long; management commands (imports, exports, rollups,
+  benchmarks) get ``DATABASE_COMMAND_STATEMENT_TIMEOUT`` (0: none);
+* server-side prepared statements: with ``DATABASE_PREPARE_THRESHOLD`` set,
+  queries are bound server-side and a query run that many times on a
+  connection is prepared. Off by default.
+
+``DATABASE_PGBOUNCER`` (a transaction-mode PgBouncer in front of the
+database) hands each transaction a different server connection, so
+anything that outlives a transaction breaks:
+
+* prepared statements are never enabled;
+* ``DISABLE_SERVER_SIDE_CURSORS`` is set: ``.iterator()`` (the streaming
+  exports) fetches its chunks with a named cursor otherwise;
+* no ``options`` startup parameter: PgBouncer rejects it unless it is listed
+  in ``ignore_startup_parameters``, and then drops it, and a session ``SET``
+  would stick to whichever server connection ran it. Give each process role
+  its own database user (``DATABASE_USER``) with the timeout on the role
+  instead, e.g. ``ALTER ROLE myshop_web SET statement_timeout = '5s'``.
+
+``manage.py benchmark_connections`` measures what a request pays for its
+connection under each setup.
+"""
+
+import os
+
+
+STOREFRONT = "storefront"
+COMMAND = "command"
+
+STATEMENT_TIMEOUTS = {STOREFRONT: 5_000, COMMAND: 10 * 60_000}  # ms
+
+
+def _flag(env, name, default):
+    value = env.get(name)
+    if value is None or value == "":
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+def role(env=os.environ):
+    return env.get("DATABASE_ROLE", COMMAND)
+
+
+def statement_timeout(env=os.environ):
+    """Milliseconds a statement may run in this process (0: no limit)."""
+    if role(env) == STOREFRONT:
+        return int(env.get("DATABASE_STATEMENT_TIMEOUT", STATEMENT_TIMEOUTS[STOREFRONT]))
+    return int(env.get("DATABASE_COMMAND_STATEMENT_TIMEOUT", STATEMENT_TIMEOUTS[COMMAND]))
+
+
+def database(env=os.environ):
+    """The ``default`` alias for ``settings.DATABASES``."""
+    pgbouncer = _flag(env, "DATABASE_PGBOUNCER", False)
+    options = {}
+    timeout = statement_timeout(env)
+    if timeout and not pgbouncer:
+        options["options"] = f"-c statement_timeout={timeout}"
+
+    config = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": env.get("DATABASE_NAME", "myshop_db"),
+        "USER": env.get("DATABASE_USER", "myshop_user"),
+        "PASSWORD": env.get("DATABASE_PASSWORD", "myStrongPassword123"),
+        "HOST": env.get("DATABASE_HOST", "localhost"),
+        "PORT": env.get("DATABASE_PORT", "5432"),
+        "CONN_HEALTH_CHECKS": True,
+        "DISABLE_SERVER_SIDE_CURSORS": pgbouncer,
+        "OPTIONS": options,
+    }
+
+    if _flag(env, "DATABASE_POOL", True):
+        # Django refuses a pool together with persistent connections
+        config["CONN_MAX_AGE"] = 0
+        options["pool"] = {
+            "min_size": int(env.get("DATABASE_POOL_MIN_SIZE", 2)),
+            "max_size": int(env.get("DATABASE_POOL_MAX_SIZE", 10)),
+            # seconds a request waits for a free connection before failing
+            "timeout": float(env.get("DATABASE_POOL_TIMEOUT", 10)),
+            "max_idle": float(env.get("DATABASE_POOL_MAX_IDLE", 10 * 60)),
+        }
+    else:
+        config["CONN_MAX_AGE"] = int(env.get("DATABASE_CONN_MAX_AGE", 60))
+
+    threshold = env.get("DATABASE_PREPARE_THRESHOLD")
+    if threshold and not pgbouncer:
+        options["server_side_binding"] = True
+        options["prepare_threshold"] = int(threshold)
+
+    return config
@@ -5,6 +5,8 @@ Django settings for Saree_site project.
 from pathlib import Path
 import os
 
+from .database import database
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -33,6 +35,11 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # collected static files, precompressed and hashed (siteapp/assets.py);
+    # answered before the instrumentation so they do not show up as views
+    'siteapp.assets.StaticFilesMiddleware',
+    'siteapp.instrumentation.PerformanceMiddleware',
+    'siteapp.routing.ReadYourWritesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -54,6 +61,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'siteapp.context_processors.cart',
             ],
         },
     },
@@ -63,18 +71,96 @@ WSGI_APPLICATION = 'Saree_site.wsgi.application'
 
 
 # Database
-# Use PostgreSQL (current config) – adjust if needed.
+# PostgreSQL from DATABASE_* environment variables (Saree_site/database.py):
+# pooled connections with health checks, a short statement timeout for the
+# storefront and a long one for management commands.
 DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.postgresql",
-        "NAME": "myshop_db",
-        "USER": "myshop_user",
-        "PASSWORD": "myStrongPassword123",
-        "HOST": "localhost",
-        "PORT": "5432",
+    "default": database(),
+}
+
+# Read replica (siteapp/routing.py): with DATABASE_REPLICA_HOST set, catalog
+# pages, reports and exports read from a streaming replica of "default".
+# Visitors who just wrote, and everybody right after a catalog change, read
+# from the primary for REPLICA_LAG_SECONDS. Tests mirror the primary; see
+# settings_replica_test.py for two separate databases.
+if os.environ.get("DATABASE_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.environ["DATABASE_REPLICA_HOST"],
+        "TEST": {"MIRROR": "default"},
     }
+DATABASE_ROUTERS = ["siteapp.routing.ReplicaRouter"]
+REPLICA_LAG_SECONDS = int(os.environ.get("REPLICA_LAG_SECONDS", 10))
+
+
+# Caches
+# The catalog cache (rendered product grids, product detail data – see
+# siteapp/caching.py) gets its own alias so it can point at a shared
+# backend such as Redis in production while tests use LocMem. With DEBUG off
+# a process-local catalog cache is reported by `manage.py check`
+# (siteapp.W001): workers would not see each other's catalog changes.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "catalog": {
+        "BACKEND": os.environ.get(
+            "CATALOG_CACHE_BACKEND",
+            "django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": os.environ.get("CATALOG_CACHE_LOCATION", "catalog"),
+    },
+    "carts": {
+        "BACKEND": os.environ.get(
+            "CART_CACHE_BACKEND",
+            "django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": os.environ.get("CART_CACHE_LOCATION", "carts"),
+    },
 }
 
+CATALOG_CACHE_ALIAS = "catalog"
+CATALOG_CACHE_TIMEOUT = 15 * 60  # seconds
+
+# Carts (siteapp/cart_store.py): cache-first, persisted to the Cart table at
+# most once per interval per cart; 0 = write-through. Write-behind only pays
+# off with a shared cart cache: a per-process LocMem cache loses the latest
+# cart on eviction or restart and differs between workers (siteapp.W002), so
+# the default is write-through unless CART_CACHE_BACKEND is set.
+CART_CACHE_ALIAS = "carts"
+CART_PERSIST_INTERVAL = int(os.environ.get(
+    "CART_PERSIST_INTERVAL", 60 if os.environ.get("CART_CACHE_BACKEND") else 0,
+))  # seconds
+CART_TTL = 30 * 24 * 3600  # seconds
+
+# Stock holds (siteapp/holds.py): how long a cart line keeps its pieces
+# reserved; viewing the cart or checkout extends it.
+CART_HOLD_SECONDS = int(os.environ.get("CART_HOLD_SECONDS", 15 * 60))
+
+# Sales reports (siteapp/reports.py): orders younger than this are rolled up
+# on the next run, once their transaction has surely committed.
+REPORTS_LAG_SECONDS = 60
+
+# Request instrumentation (siteapp/instrumentation.py): share of requests
+# sampled (0 disables it), repeats of one statement that count as a suspected
+# N+1, and how often each worker publishes its aggregates to the cache.
+PERF_SAMPLE_RATE = float(os.environ.get("PERF_SAMPLE_RATE", 0.05))
+PERF_N_PLUS_ONE_THRESHOLD = 5
+PERF_FLUSH_INTERVAL = 10  # seconds
+PERF_CACHE_ALIAS = "default"
+
+# Background jobs (siteapp/jobs.py, run by `manage.py run_jobs`) and the
+# mail / SMS backends they send through. Console backends print messages
+# instead of sending them.
+JOB_LEASE_SECONDS = 10 * 60  # a running job is handed out again after this
+EMAIL_BACKEND = os.environ.get("EMAIL_BACKEND", "django.core.mail.backends.console.EmailBackend")
+DEFAULT_FROM_EMAIL = os.environ.get("DEFAULT_FROM_EMAIL", "orders@sareesite.local")
+SMS_BACKEND = os.environ.get("SMS_BACKEND", "siteapp.sms.ConsoleBackend")
+LOW_STOCK_THRESHOLD = 3
+# empty = every active staff user with an email address
+STOCK_ALERT_RECIPIENTS = [e for e in os.environ.get("STOCK_ALERT_RECIPIENTS", "").split(",") if e]
+
 
 # Password validation
 
@@ -106,6 +192,14 @@ STATICFILES_DIRS = [
     BASE_DIR / 'siteapp' / 'static',
 ]
 
+# Static pipeline (siteapp/assets.py): collectstatic writes content-hashed
+# names with gzip / brotli variants; WhiteNoise serves them with far-future,
+# immutable cache headers. Unhashed names keep WhiteNoise's short max-age.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "siteapp.assets.CompressedManifestStaticFilesStorage"},
+}
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
@@ -115,9 +209,13 @@ MEDIA_ROOT = BASE_DIR / 'media'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
-# Node / Tailwind
+# Tailwind (`manage.py build_css`): the CLI from pytailwindcss, pinned to a
+# version, compiles siteapp/tailwind/input.css against the templates.
 
-NPM_BIN_PATH = r"C:\Program Files\nodejs\npm.cmd"
+TAILWIND_CLI = os.environ.get("TAILWIND_CLI", "tailwindcss")
+TAILWIND_VERSION = "v4.3.3"
+TAILWIND_INPUT = BASE_DIR / 'siteapp' / 'tailwind' / 'input.css'
+TAILWIND_OUTPUT = BASE_DIR / 'siteapp' / 'static' / 'siteapp' / 'tailwind.css'
 
 
 # Auth redirects
@@ -0,0 +1,25 @@
+"""
+Two local SQLite databases standing in for the PostgreSQL primary and its
+read replica, for the routing tests:
+
+    python manage.py test siteapp.tests.ReplicaRoutingTests --settings=Saree_site.settings_replica_test
+
+Nothing copies rows between them, which makes the routing visible: a row
+written to the primary only shows up on pages that read from the primary.
+The rest of the suite expects a single database; run it with the default
+settings.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db.sqlite3",
+    },
+    "replica": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db-replica.sqlite3",
+    },
+}
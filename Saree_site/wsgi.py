@@ -12,5 +12,7 @@ import os
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Saree_site.settings')
+# storefront statement timeout (Saree_site/database.py)
+os.environ.setdefault('DATABASE_ROLE', 'storefront')
 
 application = get_wsgi_application()
@@ -7,6 +7,9 @@ import sys
 def main():
     """Run administrative tasks."""
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Saree_site.settings')
+    if sys.argv[1:2] == ['runserver']:
+        # the development server answers storefront requests
+        os.environ.setdefault('DATABASE_ROLE', 'storefront')
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
@@ -1,5 +1,10 @@
-from django.contrib import admin
-from .models import Category, Product, ProductVariant, Order, OrderItem
+from django.contrib import admin, messages
+from django.db.models import Q
+from django.utils import timezone
+
+from . import order_status
+from .changelists import CachedValuesListFilter, CursorPagingAdmin
+from .models import Category, Product, ProductVariant, Order, OrderItem, OrderStatusChange, Job
 
 
 @admin.register(Category)
@@ -15,8 +20,9 @@ class ProductVariantInline(admin.TabularInline):
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ("title", "category", "base_price", "active", "created_at")
-    list_filter = ("active", "category")
+    list_display = ("title", "category", "base_price", "min_price", "total_stock", "active", "created_at")
+    list_select_related = ("category",)
+    list_filter = ("active", "in_stock", "category")
     search_fields = ("title", "description")
     prepopulated_fields = {"slug": ("title",)}
     inlines = [ProductVariantInline]
@@ -25,6 +31,7 @@ class ProductAdmin(admin.ModelAdmin):
 @admin.register(ProductVariant)
 class ProductVariantAdmin(admin.ModelAdmin):
     list_display = ("product", "color", "blouse_option", "price", "stock")
+    list_select_related = ("product",)  # ProductVariant.__str__ reads product.title
     list_filter = ("blouse_option", "product__category")
 
 
@@ -34,9 +41,26 @@ class OrderItemInline(admin.TabularInline):
     readonly_fields = ("variant", "quantity", "price")
     can_delete = False  # prevents accidentally deleting order history
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("variant__product")
+
+
+class OrderStatusChangeInline(admin.TabularInline):
+    model = OrderStatusChange
+    extra = 0
+    fields = ("from_status", "to_status", "changed_by", "created_at")
+    readonly_fields = fields
+    can_delete = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("changed_by")
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(CursorPagingAdmin):
     list_display = (
         "id",
         "customer_name",
@@ -48,9 +72,13 @@ class OrderAdmin(admin.ModelAdmin):
         "payment_status",
         "created_at",
     )
-    list_filter = ("status", "payment_method", "payment_status", "created_at", "city")
-    search_fields = ("customer_name", "phone", "address_line1", "city", "pincode")
-    inlines = [OrderItemInline]
+    list_filter = ("status", "payment_method", "payment_status", ("city", CachedValuesListFilter))
+    # backed by order_created_idx; replaces the created_at list filter
+    date_hierarchy = "created_at"
+    ordering = ("-created_at", "-id")
+    # digits go to indexed lookups instead, see get_search_results
+    search_fields = ("customer_name", "address_line1", "city")
+    inlines = [OrderItemInline, OrderStatusChangeInline]
 
     actions = [
         "mark_confirmed",
@@ -60,22 +88,65 @@ class OrderAdmin(admin.ModelAdmin):
         "mark_cancelled",
     ]
 
+    def get_search_results(self, request, queryset, search_term):
+        """
+        A number is an order id, a phone number (prefix) or a pincode, all
+        indexed lookups; anything else searches the text columns.
+        """
+        term = search_term.strip().replace(" ", "")
+        if not term.isdigit():
+            return super().get_search_results(request, queryset, search_term)
+        condition = Q(phone__startswith=term) | Q(pincode=term)
+        if len(term) <= 18:  # fits a bigint id
+            condition |= Q(pk=int(term))
+        return queryset.filter(condition), False
+
+    def get_readonly_fields(self, request, obj=None):
+        # existing orders change status through the actions (validated, audited)
+        return ("status",) if obj is not None else ()
+
+    def _set_status(self, request, queryset, status):
+        result = order_status.transition(queryset, status, user=request.user)
+        label = dict(Order.STATUS_CHOICES)[status]
+        if result.changed:
+            self.message_user(request, f"{len(result.changed)} order(s) marked as {label}.")
+        if result.skipped:
+            self.message_user(
+                request,
+                f"{result.skipped} order(s) skipped: they cannot move to {label} from their current status.",
+                messages.WARNING,
+            )
+
     @admin.action(description="Mark selected orders as Confirmed")
     def mark_confirmed(self, request, queryset):
-        queryset.update(status="confirmed")
+        self._set_status(request, queryset, "confirmed")
 
     @admin.action(description="Mark selected orders as Packed")
     def mark_packed(self, request, queryset):
-        queryset.update(status="packed")
+        self._set_status(request, queryset, "packed")
 
     @admin.action(description="Mark selected orders as Shipped")
     def mark_shipped(self, request, queryset):
-        queryset.update(status="shipped")
+        self._set_status(request, queryset, "shipped")
 
     @admin.action(description="Mark selected orders as Delivered")
     def mark_delivered(self, request, queryset):
-        queryset.update(status="delivered")
+        self._set_status(request, queryset, "delivered")
 
     @admin.action(description="Mark selected orders as Cancelled")
     def mark_cancelled(self, request, queryset):
-        queryset.update(status="cancelled")
+        self._set_status(request, queryset, "cancelled")
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "task", "status", "attempts", "max_attempts", "run_after", "created_at")
+    list_filter = ("status", "task")
+    readonly_fields = ("task", "payload", "attempts", "locked_by", "locked_at", "last_error", "created_at", "updated_at")
+    actions = ["retry_now"]
+
+    @admin.action(description="Retry selected jobs now")
+    def retry_now(self, request, queryset):
+        queryset.exclude(status=Job.RUNNING).update(
+            status=Job.QUEUED, attempts=0, run_after=timezone.now(), last_error="",
+        )
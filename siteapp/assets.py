@@ -0,0 +1,158 @@
+"""
+Static asset pipeline.
+
+Every page used to load the Tailwind Play CDN, which compiles CSS in the
+browser after downloading the compiler, plus ``style.css`` under a fixed
+name that could only be cached briefly. Now:
+
+* ``manage.py build_css`` compiles ``siteapp/tailwind/input.css`` with the
+  Tailwind CLI into a minified ``siteapp/tailwind.css`` that keeps only the
+  classes the templates use. The build is committed and rebuilt when the
+  templates change; ``--check`` fails on a stale build;
+* ``collectstatic`` (``CompressedManifestStaticFilesStorage``) writes each
+  file under a content-hashed name, with gzip and brotli variants next to
+  it, so compression costs nothing per request;
+* ``StaticFilesMiddleware`` (WhiteNoise) serves the variant the browser
+  accepts and marks hashed names ``immutable`` with a one-year max-age.
+  A changed file gets a new name, so nothing stale is ever cached.
+
+``first_paint()`` adds up the render-blocking CSS / JS linked from a page's
+``<head>`` as it would go over the wire; the tests hold it to
+``FIRST_PAINT_BUDGET``.
+"""
+
+import os
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from whitenoise.middleware import WhiteNoiseMiddleware
+from whitenoise.storage import CompressedManifestStaticFilesStorage as WhiteNoiseStorage
+
+
+# compressed bytes of the CSS / JS a page needs before it can paint
+FIRST_PAINT_BUDGET = 12 * 1024
+
+# Content-Encoding -> suffix of the precompressed variant
+ENCODINGS = {"br": ".br", "gzip": ".gz", "identity": ""}
+
+
+class CompressedManifestStaticFilesStorage(WhiteNoiseStorage):
+    """
+    WhiteNoise's hashed + precompressed storage. Before the first
+    ``collectstatic`` (development, tests) there is no manifest; URLs then
+    use the source names instead of failing.
+    """
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise that also runs in the async (ASGI) middleware chain, so the
+    async catalog views do not pay a thread switch for it on every request.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def add_files(self, root, prefix=None):
+        # nothing collected yet (development, tests): no warning about it
+        if os.path.isdir(root):
+            super().add_files(root, prefix)
+
+    def _static_file(self, request):
+        if self.autorefresh:
+            return self.find_file(request.path_info)
+        return self.files.get(request.path_info)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        static_file = self._static_file(request)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+# ---------------------------------------------------------------------------
+# first-paint weight
+# ---------------------------------------------------------------------------
+
+class _HeadAssets(HTMLParser):
+    """Stylesheets and blocking scripts referenced in ``<head>``."""
+
+    def __init__(self):
+        super().__init__()
+        self.urls = []
+        self.in_head = True
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "body":
+            self.in_head = False
+        elif not self.in_head:
+            return
+        elif tag == "link" and "stylesheet" in (attrs.get("rel") or "").split() and attrs.get("href"):
+            self.urls.append(attrs["href"])
+        elif tag == "script" and attrs.get("src") and not ({"async", "defer"} & set(attrs)):
+            if attrs.get("type") != "module":
+                self.urls.append(attrs["src"])
+
+
+@dataclass
+class FirstPaint:
+    encoding: str
+    assets: dict = field(default_factory=dict)     # url -> bytes sent
+    external: list = field(default_factory=list)   # other hosts: not measurable here
+
+    @property
+    def total(self):
+        return sum(self.assets.values())
+
+
+def _collected_path(url, encoding):
+    """File that would answer ``url`` from ``STATIC_ROOT``, or None."""
+    path = urlsplit(url).path
+    if not path.startswith(settings.STATIC_URL):
+        return None
+    name = path[len(settings.STATIC_URL):]
+    candidate = staticfiles_storage.path(name) + ENCODINGS[encoding]
+    if os.path.exists(candidate):
+        return candidate
+    raw = staticfiles_storage.path(name)
+    return raw if os.path.exists(raw) else None
+
+
+def first_paint(html, encoding="br"):
+    """
+    Render-blocking assets of ``html`` and their size as served from the
+    collected files with ``encoding`` (falling back to the plain file).
+    """
+    parser = _HeadAssets()
+    parser.feed(html)
+    result = FirstPaint(encoding)
+    for url in parser.urls:
+        if urlsplit(url).netloc:
+            result.external.append(url)
+            continue
+        path = _collected_path(url, encoding)
+        if path is None:
+            raise FileNotFoundError(f"{url} is not in STATIC_ROOT; run collectstatic")
+        result.assets[url] = os.path.getsize(path)
+    return result
@@ -0,0 +1,318 @@
+"""
+Per-view query budgets and latency benchmarks.
+
+``SCENARIOS`` describes one request against every URL in ``siteapp/urls.py``
+(the tests fail if a URL is added without one) together with the maximum
+number of SQL queries it may issue. Budgets are deliberately independent of
+data size: a view whose query count grows with the catalog or with an order
+history is an N+1 regression.
+
+``run_benchmarks`` drives the scenarios through the Django test client,
+measuring query counts and p50/p95 wall time, and ``compare`` checks a run
+against a JSON baseline. ``manage.py benchmark_views`` ties these together
+on a synthetic dataset.
+"""
+
+import json
+import statistics
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import caching, cart_store
+from .models import Order, Product, ProductVariant
+from .pagination import KeysetPaginator
+
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / "benchmarks" / "views_baseline.json"
+
+# allowed slowdown against the baseline before a run counts as a regression
+DEFAULT_TOLERANCE = 0.25
+# below this, timing noise dominates; don't flag sub-millisecond "regressions"
+MIN_REGRESSION_SECONDS = 0.002
+
+
+@dataclass
+class BenchContext:
+    """Objects the scenarios need; built once per run from the dataset."""
+
+    customer: object
+    staff: object
+    product: Product
+    variant: ProductVariant
+    order: Order
+    category_slug: str
+    cart: dict = field(default_factory=dict)
+
+
+@dataclass
+class Scenario:
+    name: str                      # url name in siteapp/urls.py
+    max_queries: int
+    path: Callable                 # (ctx) -> url
+    method: str = "get"
+    data: Callable = None          # (ctx) -> POST / GET data
+    user: str = None               # None, "customer" or "staff"
+    prepare: Callable = None       # (ctx) -> None, before every request
+    label: str = ""                # distinguishes several scenarios per url
+
+    @property
+    def key(self):
+        return f"{self.name}:{self.label}" if self.label else self.name
+
+
+def _fill_cart(ctx):
+    cart_store.get_store().save(cart_store.user_key(ctx.customer.pk), dict(ctx.cart), ctx.customer.pk)
+
+
+CHECKOUT_FORM = {
+    "name": "Bench Customer",
+    "phone": "9876543210",
+    "address_line1": "1 Temple Street",
+    "city": "Chennai",
+    "pincode": "600001",
+}
+
+
+SCENARIOS = [
+    Scenario("home", 3, lambda c: reverse("home")),
+    Scenario("home", 4, lambda c: reverse("home"), data=lambda c: {"q": "silk zari"}, label="search"),
+    Scenario(
+        "home", 5, lambda c: reverse("home"),
+        data=lambda c: {"blouse": "with_blouse", "price": ["2000-5000", "5000-10000"]}, label="facets",
+    ),
+    Scenario("category_page", 4, lambda c: reverse("category_page", args=[c.category_slug])),
+    Scenario("product_detail", 4, lambda c: c.product.get_absolute_url()),
+    Scenario("search_suggest", 2, lambda c: reverse("search_suggest"), data=lambda c: {"q": "ban"}),
+    Scenario("cart", 4, lambda c: reverse("cart"), user="customer", prepare=_fill_cart),
+    Scenario(
+        "add_to_cart", 10, lambda c: reverse("add_to_cart"), method="post",
+        data=lambda c: {"variant_id": c.variant.pk}, user="customer", prepare=_fill_cart,
+    ),
+    Scenario(
+        "update_cart_quantity", 9, lambda c: reverse("update_cart_quantity"), method="post",
+        data=lambda c: {"variant_id": c.variant.pk, "action": "inc"}, user="customer", prepare=_fill_cart,
+    ),
+    Scenario(
+        "remove_from_cart", 4, lambda c: reverse("remove_from_cart"), method="post",
+        data=lambda c: {"variant_id": c.variant.pk}, user="customer", prepare=_fill_cart,
+    ),
+    Scenario(
+        "clear_cart", 4, lambda c: reverse("clear_cart"), method="post",
+        user="customer", prepare=_fill_cart,
+    ),
+    Scenario("checkout", 4, lambda c: reverse("checkout"), user="customer", prepare=_fill_cart),
+    Scenario(
+        "checkout", 14, lambda c: reverse("checkout"), method="post",
+        data=lambda c: CHECKOUT_FORM, user="customer", prepare=_fill_cart, label="place_order",
+    ),
+    Scenario("order_thank_you", 2, lambda c: reverse("order_thank_you", args=[c.order.pk])),
+    Scenario("order_track", 1, lambda c: reverse("order_track")),
+    Scenario(
+        "order_track", 2, lambda c: reverse("order_track"), method="post",
+        data=lambda c: {"order_id": c.order.pk, "phone": c.order.phone}, label="lookup",
+    ),
+    Scenario("signup", 1, lambda c: reverse("signup")),
+    Scenario("login", 1, lambda c: reverse("login")),
+    Scenario("logout", 5, lambda c: reverse("logout"), method="post", user="customer"),
+    Scenario("my_orders", 5, lambda c: reverse("my_orders"), user="customer"),
+    Scenario("catalog_cache_stats", 3, lambda c: reverse("catalog_cache_stats"), user="staff"),
+    Scenario("perf_stats", 3, lambda c: reverse("perf_stats"), user="staff"),
+    Scenario("sales_report", 9, lambda c: reverse("sales_report"), user="staff"),
+    Scenario("sales_report_csv", 3, lambda c: reverse("sales_report_csv"), user="staff"),
+    Scenario("export_orders", 3, lambda c: reverse("export_orders", args=["csv"]), user="staff"),
+    Scenario("export_catalog", 3, lambda c: reverse("export_catalog", args=["ndjson"]), user="staff"),
+]
+
+
+@dataclass
+class Measurement:
+    key: str
+    queries: int
+    max_queries: int
+    timings: list
+
+    @property
+    def p50(self):
+        return statistics.median(self.timings)
+
+    @property
+    def p95(self):
+        ordered = sorted(self.timings)
+        return ordered[max(0, round(len(ordered) * 0.95) - 1)]
+
+    @property
+    def over_budget(self):
+        return self.queries > self.max_queries
+
+    def as_dict(self):
+        return {
+            "queries": self.queries,
+            "max_queries": self.max_queries,
+            "p50_ms": round(self.p50 * 1000, 3),
+            "p95_ms": round(self.p95 * 1000, 3),
+        }
+
+
+def build_context(catalog, customer, staff):
+    variants = list(
+        ProductVariant.objects.filter(pk__in=catalog.variant_ids[:50], stock__gte=1000)
+        .select_related("product")[:5]
+    )
+    if not variants:
+        raise ValueError("synthetic catalog has no well-stocked variants to benchmark with")
+    variant = variants[0]
+    return BenchContext(
+        customer=customer,
+        staff=staff,
+        product=variant.product,
+        variant=variant,
+        order=Order.objects.filter(user=customer).order_by("-pk").first(),
+        category_slug=catalog.categories[0].slug,
+        cart={str(v.pk): 1 for v in variants},
+    )
+
+
+def _admin_orders(label, data):
+    return Scenario(
+        "admin:siteapp_order_changelist", 10,
+        lambda c: reverse("admin:siteapp_order_changelist"),
+        data=data, user="staff", label=label,
+    )
+
+
+def _deep_cursor(ctx):
+    # continue from the 20th-oldest order: the last pages of the changelist
+    oldest = Order.objects.order_by("created_at", "id")[19:20].first()
+    if oldest is None:
+        return {}
+    return {"cursor": KeysetPaginator(Order.objects.all(), ("-created_at", "-id")).encode_cursor(oldest)}
+
+
+# the order changelist on a large table (benchmark_admin); ``staff`` must be
+# a superuser
+ADMIN_SCENARIOS = [
+    _admin_orders("all", lambda c: {}),
+    _admin_orders("status", lambda c: {"status__exact": "pending"}),
+    _admin_orders("phone", lambda c: {"q": c.order.phone[:6]}),
+    _admin_orders("pincode", lambda c: {"q": c.order.pincode}),
+    _admin_orders("deep_cursor", _deep_cursor),
+    _admin_orders("year", lambda c: {"created_at__year": c.order.created_at.year}),
+]
+
+
+def growth(results_by_size, max_growth=2.0):
+    """
+    Compare runs of the same scenarios on growing datasets
+    (``{rows: {key: Measurement}}``): query counts must not change and
+    p50 must stay within ``max_growth`` times the smallest run's.
+    """
+    sizes = sorted(results_by_size)
+    problems = []
+    for key, small in sorted(results_by_size[sizes[0]].items()):
+        for size in sizes[1:]:
+            m = results_by_size[size][key]
+            if m.queries != small.queries:
+                problems.append(f"{key}: {m.queries} queries at {size} rows, {small.queries} at {sizes[0]}")
+            if m.p50 > small.p50 * max_growth and m.p50 - small.p50 > MIN_REGRESSION_SECONDS:
+                problems.append(
+                    f"{key}: p50 {m.p50 * 1000:.2f} ms at {size} rows, "
+                    f"{small.p50 * 1000:.2f} ms at {sizes[0]} (x{max_growth:g} allowed)"
+                )
+    return problems
+
+
+def _client_for(scenario, ctx):
+    client = Client()
+    user = getattr(ctx, scenario.user) if scenario.user else None
+    if user is not None:
+        client.force_login(user)
+    return client
+
+
+def measure(scenario, ctx, iterations=1):
+    """
+    Run ``scenario`` ``iterations`` times. The catalog version is bumped
+    before each request, so numbers describe the (worst-case) cache-miss path.
+    Returns the highest query count seen and every wall time.
+    """
+    client = _client_for(scenario, ctx)
+    url = scenario.path(ctx)
+    data = scenario.data(ctx) if scenario.data else None
+    send = getattr(client, scenario.method)
+
+    timings, queries = [], 0
+    for _ in range(iterations):
+        if scenario.prepare:
+            scenario.prepare(ctx)
+        if scenario.user == "customer" and scenario.name == "logout":
+            client.force_login(ctx.customer)
+        caching.bump_catalog_version()
+
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = send(url, data)
+            if response.streaming:
+                b"".join(response.streaming_content)
+            elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            raise AssertionError(f"{scenario.key} returned {response.status_code}")
+        timings.append(elapsed)
+        queries = max(queries, len(captured.captured_queries))
+
+    return Measurement(scenario.key, queries, scenario.max_queries, timings)
+
+
+def run_benchmarks(ctx, iterations=20, scenarios=SCENARIOS):
+    return {s.key: measure(s, ctx, iterations) for s in scenarios}
+
+
+# ---------------------------------------------------------------------------
+# baseline handling
+# ---------------------------------------------------------------------------
+
+def load_baseline(path=DEFAULT_BASELINE):
+    path = Path(path)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def write_baseline(results, meta, path=DEFAULT_BASELINE):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "meta": meta,
+        "views": {key: m.as_dict() for key, m in sorted(results.items())},
+    }
+    path.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Return human-readable regressions of ``results`` against ``baseline``:
+    any query-budget overrun, more queries than the baseline, or a p95
+    slower than the baseline by more than ``tolerance``.
+    """
+    problems = []
+    views = (baseline or {}).get("views", {})
+    for key, m in sorted(results.items()):
+        if m.over_budget:
+            problems.append(f"{key}: {m.queries} queries, budget is {m.max_queries}")
+        base = views.get(key)
+        if base is None:
+            continue
+        if m.queries > base["queries"]:
+            problems.append(f"{key}: {m.queries} queries, baseline {base['queries']}")
+        limit_ms = base["p95_ms"] * (1 + tolerance)
+        p95_ms = m.p95 * 1000
+        if p95_ms > limit_ms and (p95_ms - base["p95_ms"]) / 1000 > MIN_REGRESSION_SECONDS:
+            problems.append(f"{key}: p95 {p95_ms:.2f} ms, baseline {base['p95_ms']:.2f} ms (+{tolerance:.0%} allowed)")
+    return problems
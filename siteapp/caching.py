@@ -0,0 +1,213 @@
+"""
+Catalog caching.
+
+Rendered product-grid fragments, the category list and product detail data
+are cached under keys that embed a global *catalog version*. Anything that
+changes the catalog bumps the version (``signals.py`` on Product / Variant /
+Category saves and deletes, ``import_products``, checkout's stock updates),
+which makes every old key unreachable at once; stale entries simply age out.
+
+The backend is whatever ``settings.CACHES[CATALOG_CACHE_ALIAS]`` points at –
+LocMem by default (and in tests). Use a shared backend (Redis / Memcached)
+when running several workers, otherwise a bump in one process is not seen
+by the others.
+
+Next to the version the cache keeps the time of the last bump; together they
+are the validators of the conditional GETs in ``conditional.py``. A missing
+version (flush, eviction) is seeded from the clock in nanoseconds rather
+than restarted at 1, so it never lands on an old version whose entries may
+still be cached.
+
+Async views use the ``a``-prefixed twins (``aget_or_set``, ``amake_key``
+...), which go through the cache backend's async API.
+"""
+
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+VERSION_KEY = "catalog:version"
+CHANGED_KEY = "catalog:changed"
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[getattr(settings, "CATALOG_CACHE_ALIAS", "default")]
+
+
+def timeout():
+    return getattr(settings, "CATALOG_CACHE_TIMEOUT", 15 * 60)
+
+
+# ---------------------------------------------------------------------------
+# version counter
+# ---------------------------------------------------------------------------
+
+def _seed():
+    # a restarted counter must not reach versions used before the key was lost
+    return time.time_ns()
+
+
+def catalog_version():
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # add() so two workers racing here agree on the same starting value
+        seed = _seed()
+        cache.add(VERSION_KEY, seed, timeout=None)
+        version = cache.get(VERSION_KEY, seed)
+    return version
+
+
+async def acatalog_version():
+    cache = get_cache()
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        seed = _seed()
+        await cache.aadd(VERSION_KEY, seed, timeout=None)
+        version = await cache.aget(VERSION_KEY, seed)
+    return version
+
+
+def bump_catalog_version():
+    cache = get_cache()
+    cache.set(CHANGED_KEY, int(time.time()), timeout=None)
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        seed = _seed()
+        cache.add(VERSION_KEY, seed, timeout=None)
+        return cache.get(VERSION_KEY, seed)
+
+
+def _state(found):
+    return found.get(VERSION_KEY), found.get(CHANGED_KEY)
+
+
+def catalog_state():
+    """``(version, unix time of the last change)`` in one cache round trip."""
+    version, changed = _state(get_cache().get_many([VERSION_KEY, CHANGED_KEY]))
+    if version is None:
+        version = catalog_version()
+    if changed is None:
+        get_cache().add(CHANGED_KEY, int(time.time()), timeout=None)
+        changed = get_cache().get(CHANGED_KEY)
+    return version, changed
+
+
+async def acatalog_state():
+    version, changed = _state(await get_cache().aget_many([VERSION_KEY, CHANGED_KEY]))
+    if version is None:
+        version = await acatalog_version()
+    if changed is None:
+        await get_cache().aadd(CHANGED_KEY, int(time.time()), timeout=None)
+        changed = await get_cache().aget(CHANGED_KEY)
+    return version, changed
+
+
+def bump_on_commit():
+    """
+    Bump once the current transaction commits, so no request can re-cache
+    the old rows under the new version in between.
+    """
+    transaction.on_commit(bump_catalog_version)
+
+
+# ---------------------------------------------------------------------------
+# keys and lookups
+# ---------------------------------------------------------------------------
+
+def _key(version, kind, parts):
+    digest = hashlib.sha1("\x1f".join(str(p) for p in parts).encode()).hexdigest()[:20]
+    return f"catalog:v{version}:{kind}:{digest}"
+
+
+def make_key(kind, *parts):
+    return _key(catalog_version(), kind, parts)
+
+
+async def amake_key(kind, *parts):
+    return _key(await acatalog_version(), kind, parts)
+
+
+def _listing_parts(request, category):
+    return category.slug if category else "", sorted(request.GET.lists())
+
+
+def listing_key(request, category=None):
+    """Grid fragment key: category + every query parameter (search, page...)."""
+    return make_key("grid", *_listing_parts(request, category))
+
+
+async def alisting_key(request, category=None):
+    return await amake_key("grid", *_listing_parts(request, category))
+
+
+def get_or_set(key, compute):
+    """
+    Return the cached value for ``key`` or store ``compute()``. Counts hits
+    and misses per key kind for ``stats()``.
+    """
+    cache = get_cache()
+    kind = key.split(":")[2]
+    value = cache.get(key)
+    if value is not None:
+        _record(kind, "hits")
+        return value
+
+    _record(kind, "misses")
+    value = compute()
+    cache.set(key, value, timeout())
+    return value
+
+
+async def aget_or_set(key, compute):
+    """``get_or_set`` for async views; ``compute`` is a coroutine function."""
+    cache = get_cache()
+    kind = key.split(":")[2]
+    value = await cache.aget(key)
+    if value is not None:
+        _record(kind, "hits")
+        return value
+
+    _record(kind, "misses")
+    value = await compute()
+    await cache.aset(key, value, timeout())
+    return value
+
+
+def _record(kind, outcome):
+    with _stats_lock:
+        _stats[(kind, outcome)] += 1
+
+
+def stats():
+    """``{kind: {"hits": n, "misses": n, "hit_ratio": r}}`` for this process."""
+    with _stats_lock:
+        snapshot = dict(_stats)
+    report = {}
+    for (kind, outcome), count in snapshot.items():
+        report.setdefault(kind, {"hits": 0, "misses": 0})[outcome] = count
+    for counts in report.values():
+        lookups = counts["hits"] + counts["misses"]
+        counts["hit_ratio"] = round(counts["hits"] / lookups, 3) if lookups else 0.0
+    return report
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def clear():
+    """Drop every catalog entry (tests, or after manual DB surgery)."""
+    get_cache().clear()
+    reset_stats()
@@ -0,0 +1,102 @@
+"""
+Cart resolution.
+
+A cart is ``{"<variant_id>": quantity}``, kept by ``cart_store``. Views used to
+look each line up with its own query (plus one more per line for the product
+title in the template); ``resolve_cart`` loads every variant together with its
+product in a single query and prices the whole cart in one pass.
+"""
+
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.http import Http404
+
+from . import cart_store
+from .models import ProductVariant
+
+
+@dataclass
+class CartLine:
+    variant: ProductVariant
+    quantity: int
+    subtotal: Decimal
+
+
+@dataclass
+class ResolvedCart:
+    lines: list = field(default_factory=list)
+    total: Decimal = Decimal("0.00")
+    # variant ids that were in the cart but no longer exist
+    stale_ids: list = field(default_factory=list)
+
+    def __iter__(self):
+        return iter(self.lines)
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __bool__(self):
+        return bool(self.lines)
+
+
+def parse_variant_id(value):
+    """Session keys / POST values are strings; return an int id or None."""
+    try:
+        variant_id = int(value)
+    except (TypeError, ValueError):
+        return None
+    return variant_id if variant_id > 0 else None
+
+
+def get_cart(request):
+    # loaded once per request; the context processor and the view share it
+    if not hasattr(request, "_cart"):
+        request._cart = cart_store.load_cart(request)
+    return request._cart
+
+
+def save_cart(request, cart):
+    request._cart = cart
+    cart_store.store_cart(request, cart)
+
+
+def variants_queryset():
+    return ProductVariant.objects.select_related("product")
+
+
+def get_variant_or_404(variant_id):
+    """Single variant with its product, for the add / update views."""
+    pk = parse_variant_id(variant_id)
+    if pk is None:
+        raise Http404("No such variant.")
+    try:
+        return variants_queryset().get(pk=pk)
+    except ProductVariant.DoesNotExist:
+        raise Http404("No such variant.")
+
+
+def resolve_cart(request):
+    """
+    Price the cart with one query. Lines whose variant has since
+    been deleted are dropped from the cart (and reported in
+    ``stale_ids``) instead of 404-ing the whole page.
+    """
+    cart = get_cart(request)
+    ids = {key: parse_variant_id(key) for key in cart}
+    variants = variants_queryset().in_bulk([pk for pk in ids.values() if pk is not None])
+
+    resolved = ResolvedCart()
+    for key, qty in cart.items():
+        variant = variants.get(ids[key])
+        if variant is None or qty <= 0:
+            resolved.stale_ids.append(key)
+            continue
+        subtotal = variant.price * qty
+        resolved.lines.append(CartLine(variant=variant, quantity=qty, subtotal=subtotal))
+        resolved.total += subtotal
+
+    if resolved.stale_ids:
+        save_cart(request, {k: v for k, v in cart.items() if k not in resolved.stale_ids})
+
+    return resolved
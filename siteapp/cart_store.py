@@ -0,0 +1,193 @@
+"""
+Cart storage.
+
+Carts used to live in ``request.session["cart"]``, so every cart click
+rewrote the whole ``django_session`` row. They now live in their own store:
+
+* the hot copy is a compact string (``"12:1,15:2"``) in the ``carts`` cache;
+* a durable copy is upserted into the ``Cart`` table at most once every
+  ``CART_PERSIST_INTERVAL`` seconds per cart (and immediately when a cart is
+  emptied), so a burst of clicks costs one DB write instead of one each;
+* on a cache miss the cart is read back from the table.
+
+``CART_PERSIST_INTERVAL = 0`` is write-through (``cached_db``-style), the
+default unless a shared ``carts`` cache is configured. Write-behind with a
+per-process cache would lose the newest cart on eviction or restart and give
+each worker its own copy; ``manage.py check`` reports it (``checks.py``).
+
+Logged-in carts are keyed by user id; anonymous carts by a random token kept
+in the session (written once, when the cart is created). On login the
+anonymous cart is merged into the user's – see ``merge_on_login``.
+"""
+
+import secrets
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from .models import Cart
+
+
+SESSION_TOKEN_KEY = "cart_token"
+LEGACY_SESSION_KEY = "cart"
+
+
+def encode(cart):
+    lines = sorted((int(pk), qty) for pk, qty in cart.items() if str(pk).isdigit() and qty > 0)
+    return ",".join(f"{pk}:{qty}" for pk, qty in lines)
+
+
+def decode(payload):
+    cart = {}
+    for part in (payload or "").split(","):
+        pk, sep, qty = part.partition(":")
+        if sep and pk.isdigit() and qty.isdigit() and int(qty) > 0:
+            cart[pk] = int(qty)
+    return cart
+
+
+class CartStore:
+    def __init__(self):
+        self.cache = caches[getattr(settings, "CART_CACHE_ALIAS", "default")]
+        self.ttl = getattr(settings, "CART_TTL", 30 * 24 * 3600)
+        self.persist_interval = getattr(settings, "CART_PERSIST_INTERVAL", 60)
+
+    def _cache_key(self, key):
+        return f"cart:{key}"
+
+    def load(self, key):
+        entry = self.cache.get(self._cache_key(key))
+        if entry is not None:
+            return decode(entry[0])
+
+        payload = Cart.objects.filter(key=key).values_list("data", flat=True).first() or ""
+        self.cache.set(self._cache_key(key), (payload, time.time()), self.ttl)
+        return decode(payload)
+
+    def save(self, key, cart, user_id=None):
+        payload = encode(cart)
+        entry = self.cache.get(self._cache_key(key))
+        persisted_at = entry[1] if entry is not None else 0.0
+        now = time.time()
+
+        if not payload or now - persisted_at >= self.persist_interval:
+            self.persist(key, payload, user_id)
+            persisted_at = now
+
+        self.cache.set(self._cache_key(key), (payload, persisted_at), self.ttl)
+
+    def persist(self, key, payload, user_id=None):
+        if not payload:
+            Cart.objects.filter(key=key).delete()
+            return
+        Cart.objects.bulk_create(
+            [Cart(key=key, user_id=user_id, data=payload)],
+            update_conflicts=True,
+            unique_fields=["key"],
+            update_fields=["data", "updated_at"],
+        )
+
+    def delete(self, key):
+        self.cache.delete(self._cache_key(key))
+        Cart.objects.filter(key=key).delete()
+
+
+def get_store():
+    return CartStore()
+
+
+def user_key(user_id):
+    return f"u:{user_id}"
+
+
+def cart_key(request, create=False):
+    """
+    Store key for this request's cart, or None for an anonymous visitor who
+    has never had one (unless ``create``).
+    """
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return user_key(user.pk)
+
+    token = request.session.get(SESSION_TOKEN_KEY)
+    if token is None and create:
+        token = secrets.token_hex(16)
+        request.session[SESSION_TOKEN_KEY] = token
+    return f"a:{token}" if token else None
+
+
+def _adopt_legacy_session_cart(request, store, key):
+    """Move a pre-store ``session["cart"]`` into the store once."""
+    legacy = request.session.pop(LEGACY_SESSION_KEY, None)
+    if not legacy:
+        return None
+    cart = store.load(key)
+    for pk, qty in legacy.items():
+        cart[str(pk)] = cart.get(str(pk), 0) + int(qty)
+    store.save(key, cart, _user_id(request))
+    return cart
+
+
+def _user_id(request):
+    user = getattr(request, "user", None)
+    return user.pk if user is not None and user.is_authenticated else None
+
+
+def load_cart(request):
+    key = cart_key(request, create=LEGACY_SESSION_KEY in request.session)
+    if key is None:
+        return {}
+    store = get_store()
+    adopted = _adopt_legacy_session_cart(request, store, key)
+    return adopted if adopted is not None else store.load(key)
+
+
+def store_cart(request, cart):
+    key = cart_key(request, create=bool(cart))
+    if key is None:
+        return
+    get_store().save(key, cart, _user_id(request))
+
+
+def merge_on_login(request, user):
+    """
+    Fold the anonymous cart into the user's cart (quantities add up) and
+    forget the anonymous one. Connected to ``user_logged_in``.
+    """
+    token = request.session.pop(SESSION_TOKEN_KEY, None)
+    legacy = request.session.pop(LEGACY_SESSION_KEY, None) or {}
+    if token is None and not legacy:
+        return
+
+    store = get_store()
+    anonymous = store.load(f"a:{token}") if token else {}
+    for pk, qty in legacy.items():
+        anonymous[str(pk)] = anonymous.get(str(pk), 0) + int(qty)
+    if not anonymous:
+        return
+
+    key = user_key(user.pk)
+    cart = store.load(key)
+    for pk, qty in anonymous.items():
+        cart[pk] = cart.get(pk, 0) + qty
+    store.save(key, cart, user.pk)
+    if token:
+        store.delete(f"a:{token}")
+
+
+def expire_abandoned(days, batch_size=5000):
+    """
+    Delete durable carts untouched for ``days`` in primary-key batches, so a
+    large purge never holds one long lock. Cache copies age out by TTL.
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    stale = Cart.objects.filter(updated_at__lt=cutoff).order_by("pk")
+    deleted = 0
+    while True:
+        ids = list(stale.values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += Cart.objects.filter(pk__in=ids).delete()[0]
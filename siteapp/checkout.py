@@ -0,0 +1,183 @@
+"""
+Order placement.
+
+All stock checks happen inside the transaction that writes the order:
+
+1. the cart's variant rows are locked with ``SELECT ... FOR UPDATE`` in
+   primary-key order, so two checkouts touching the same SKUs always queue
+   up in the same order instead of deadlocking;
+2. prices and stock are read from the locked rows (not from the cart page),
+   less whatever other carts currently hold (``holds.py``);
+3. order items go in with one ``bulk_create``;
+4. stock is decremented with one conditional ``UPDATE ... SET stock = stock - n
+   WHERE stock >= n`` for all lines – if any line no longer fits, the row
+   count comes up short and the whole transaction is rolled back.
+
+Serialization failures / deadlocks (or "database is locked" on SQLite) are
+retried a few times with jittered backoff before giving up. Other
+operational errors, such as a ``statement_timeout`` cancellation, are raised
+at once; retrying them would only multiply the wait.
+
+The buyer's own holds are released in the same transaction.
+
+Confirmation messages and low-stock alerts are queued as background jobs
+(``jobs.py``) when the transaction commits; nothing is sent for a rolled
+back attempt.
+"""
+
+import random
+import time
+from decimal import Decimal
+
+from django.db import OperationalError, connection, transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+
+from . import caching, holds, jobs
+from .notifications import low_stock_threshold
+from .models import Order, OrderItem, ProductVariant, StockHold
+from .summaries import refresh_product_summaries
+
+
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 0.02  # seconds, doubled on every retry
+
+# SQLSTATEs worth another attempt: serialization_failure, deadlock_detected
+RETRYABLE_SQLSTATES = {"40001", "40P01"}
+
+
+class CheckoutError(Exception):
+    pass
+
+
+class OutOfStock(CheckoutError):
+    def __init__(self, variant, requested, available):
+        self.variant = variant
+        self.requested = requested
+        self.available = available
+        super().__init__(f"Only {available} left for variant {variant}")
+
+    @property
+    def message(self):
+        if self.variant is None:
+            return "An item in your cart is no longer available."
+        return (
+            f"Only {self.available} left for "
+            f"{self.variant.product.title} ({self.variant.color})."
+        )
+
+
+def _lock_variants(quantities):
+    variants = (
+        ProductVariant.objects
+        .select_for_update(of=("self",))
+        .select_related("product")
+        .filter(pk__in=quantities)
+        .order_by("pk")
+    )
+    return {v.pk: v for v in variants}
+
+
+def _decrement_stock(quantities):
+    """
+    One UPDATE for every line: ``stock - qty`` where ``stock >= qty``.
+    Returns True only if every variant row was updated.
+    """
+    condition = Q()
+    for pk, qty in quantities.items():
+        condition |= Q(pk=pk, stock__gte=qty)
+
+    updated = ProductVariant.objects.filter(condition).update(
+        stock=F("stock") - Case(
+            *[When(pk=pk, then=Value(qty)) for pk, qty in quantities.items()],
+            output_field=IntegerField(),
+        )
+    )
+    return updated == len(quantities)
+
+
+def _place_order_once(user, quantities, details, cart_key):
+    with transaction.atomic():
+        variants = _lock_variants(quantities)
+        held = holds.held_by_others(quantities, cart_key)
+
+        total = Decimal("0.00")
+        for pk, qty in quantities.items():
+            variant = variants.get(pk)
+            if variant is None:
+                raise OutOfStock(None, qty, 0)
+            free = variant.stock - held.get(pk, 0)
+            if free < qty:
+                raise OutOfStock(variant, qty, max(0, free))
+            total += variant.price * qty
+
+        if not _decrement_stock(quantities):
+            # only reachable without row locks (e.g. SQLite), where another
+            # checkout committed between our read and our write
+            fresh = ProductVariant.objects.select_related("product").in_bulk(list(quantities))
+            for pk, qty in quantities.items():
+                variant = fresh.get(pk)
+                if variant is None or variant.stock < qty:
+                    raise OutOfStock(variant, qty, variant.stock if variant else 0)
+            raise OutOfStock(None, 0, 0)
+        refresh_product_summaries({v.product_id for v in variants.values()}, stock_only=True)
+
+        order = Order.objects.create(
+            user=user,
+            total=total,
+            status="pending",
+            payment_method="cod",       # for now always COD
+            payment_status="pending",   # not yet collected
+            **details,
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                variant=variants[pk],
+                quantity=qty,
+                price=variants[pk].price,
+            )
+            for pk, qty in quantities.items()
+        ])
+        if cart_key is not None:
+            StockHold.objects.filter(cart_key=cart_key).delete()
+        # product pages show stock; the F() update bypasses post_save
+        caching.bump_on_commit()
+
+        jobs.enqueue_on_commit("order_confirmation", order_id=order.pk)
+        threshold = low_stock_threshold()
+        running_low = [pk for pk, qty in quantities.items() if variants[pk].stock - qty <= threshold]
+        if running_low:
+            jobs.enqueue_on_commit("low_stock_alert", variant_ids=running_low)
+    return order
+
+
+def _retryable(exc):
+    """A serialization failure or deadlock, or a busy SQLite database."""
+    cause = exc.__cause__
+    # psycopg 3 / psycopg2 name the SQLSTATE differently
+    sqlstate = getattr(cause, "sqlstate", None) or getattr(cause, "pgcode", None)
+    if sqlstate is not None:
+        return sqlstate in RETRYABLE_SQLSTATES
+    return "database is locked" in str(exc)
+
+
+def place_order(user, quantities, cart_key=None, **details):
+    """
+    Create an order for ``quantities`` (``{variant_id: qty}``) and reserve
+    the stock. ``details`` are the Order address fields. ``cart_key`` is the
+    buyer's cart: its holds count as available and are released. Raises
+    ``OutOfStock`` if any line cannot be fulfilled; nothing is written then.
+    """
+    if not quantities:
+        raise CheckoutError("Cart is empty.")
+    quantities = {int(pk): int(qty) for pk, qty in sorted(quantities.items())}
+
+    # retrying only makes sense if we own the outermost transaction
+    attempts = 1 if connection.in_atomic_block else MAX_ATTEMPTS
+    for attempt in range(attempts):
+        try:
+            return _place_order_once(user, quantities, details, cart_key)
+        except OperationalError as exc:
+            if attempt == attempts - 1 or not _retryable(exc):
+                raise
+            time.sleep(BACKOFF_BASE * (2 ** attempt) * (1 + random.random()))
@@ -0,0 +1,59 @@
+"""
+System checks for settings that only work with a single process.
+
+* The catalog cache holds the catalog version and the time of its last bump
+  (``caching.py``). With a per-process backend (LocMem) a bump in the worker
+  that handled a write is invisible to the others: they keep serving cached
+  pages, answer 304 to changed pages (``conditional.py``) and read a lagging
+  replica right after a change (``routing.py``). Reported outside DEBUG.
+* Carts written behind to the database (``cart_store.py``) keep their newest
+  state only in the ``carts`` cache. With a per-process (or dummy) backend an
+  eviction or restart reverts the cart, and each worker serves its own copy.
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Tags, Warning, register
+
+from . import caching
+
+
+def process_local(cache):
+    """The backend keeps its entries inside this process."""
+    return isinstance(cache, LocMemCache)
+
+
+@register(Tags.caches)
+def check_catalog_cache(app_configs, **kwargs):
+    alias = getattr(settings, "CATALOG_CACHE_ALIAS", "default")
+    if settings.DEBUG or alias not in settings.CACHES or not process_local(caching.get_cache()):
+        return []
+    return [Warning(
+        f"The catalog cache ('{alias}') is process-local.",
+        hint=(
+            "Catalog version bumps are not seen by other workers, which keep serving stale pages "
+            "and 304s. Set CATALOG_CACHE_BACKEND / CATALOG_CACHE_LOCATION to a shared backend "
+            "(Redis, Memcached, database)."
+        ),
+        id="siteapp.W001",
+    )]
+
+
+@register(Tags.caches)
+def check_cart_cache(app_configs, **kwargs):
+    alias = getattr(settings, "CART_CACHE_ALIAS", "default")
+    if getattr(settings, "CART_PERSIST_INTERVAL", 60) <= 0 or alias not in settings.CACHES:
+        return []
+    cache = caches[alias]
+    if not (process_local(cache) or isinstance(cache, DummyCache)):
+        return []
+    return [Warning(
+        f"Carts are written behind (CART_PERSIST_INTERVAL) to a process-local cache ('{alias}').",
+        hint=(
+            "An eviction or restart loses the newest cart and each worker serves its own copy. "
+            "Set CART_CACHE_BACKEND to a shared backend, or CART_PERSIST_INTERVAL=0."
+        ),
+        id="siteapp.W002",
+    )]
@@ -0,0 +1,104 @@
+"""
+Conditional GET for the catalog pages.
+
+``home``, ``category_page`` and ``product_detail`` answer a repeat request
+whose ``If-None-Match`` / ``If-Modified-Since`` still holds with a 304
+before the view runs, so no template is rendered and no product is loaded.
+The validators are cheap:
+
+* the catalog version and the time of its last bump
+  (``caching.catalog_state``, one cache read). They change whenever
+  products, variants, categories or stock do;
+* the page itself: path and query string, and for a product its
+  ``created_at``. That is one indexed lookup, which also keeps 304s away
+  from missing or inactive products;
+* the visitor's CSRF cookie, since forms embed a token derived from it.
+
+Once a visitor has a session or pending messages, the page is personalised
+(user, cart badge, messages). Those requests skip the validators and get a
+full response. The ETag is weak because every render masks the CSRF token
+afresh, so two renders are equivalent rather than byte-identical.
+"""
+
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from . import caching
+from .models import Product
+
+
+def personalised(request):
+    """The page would show this visitor's session state or messages."""
+    return settings.SESSION_COOKIE_NAME in request.COOKIES or CookieStorage.cookie_name in request.COOKIES
+
+
+async def product_created(request, slug):
+    """``created_at`` of an active product, None when the view would 404."""
+    return await (
+        Product.objects.filter(slug=slug, active=True).values_list("created_at", flat=True).afirst()
+    )
+
+
+async def validators(request, page=None, *args, **kwargs):
+    """
+    ``(etag, last_modified)`` for this request, or None when the page must
+    not be validated. ``page`` is an optional coroutine function returning
+    the page's own timestamp (None: do not validate).
+    """
+    version, changed = await caching.acatalog_state()
+    if changed is None:
+        # no catalog cache (e.g. DummyCache): nothing tracks changes
+        return None
+    last_modified = changed
+    if page is not None:
+        created = await page(request, *args, **kwargs)
+        if created is None:
+            return None
+        last_modified = max(last_modified, int(created.timestamp()))
+
+    parts = [
+        version, changed, last_modified, request.path, request.META.get("QUERY_STRING", ""),
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ""),
+    ]
+    digest = hashlib.sha1("\x1f".join(str(p) for p in parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"', last_modified
+
+
+def _set_validators(response, etag, last_modified):
+    response.headers.setdefault("ETag", etag)
+    response.headers.setdefault("Last-Modified", http_date(last_modified))
+    # revalidate on every use; the markup may carry a CSRF token
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ("Cookie",))
+    return response
+
+
+def conditional_page(page=None):
+    """
+    Decorator for async catalog views: 304 on a matching validator, else
+    the view's response with ``ETag`` / ``Last-Modified`` set.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD") or personalised(request):
+                return await view(request, *args, **kwargs)
+            found = await validators(request, page, *args, **kwargs)
+            if found is None:
+                return await view(request, *args, **kwargs)
+
+            etag, last_modified = found
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is not None:
+                return _set_validators(response, etag, last_modified)
+            response = await view(request, *args, **kwargs)
+            if response.status_code == 200:
+                _set_validators(response, etag, last_modified)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,6 @@
+from .cart import get_cart
+
+
+def cart(request):
+    # lazy, so pages that never show the header badge don't load the cart
+    return {"cart_count": lambda: len(get_cart(request))}
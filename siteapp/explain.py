@@ -0,0 +1,164 @@
+"""
+Query-plan audit.
+
+Runs every benchmark scenario (see ``benchmarks.py``) plus the order admin's
+filters, captures the SELECTs each one issues and asks the database for
+their plans. Full table scans are reported per view so missing indexes show
+up before the tables are big enough to hurt. Used by
+``manage.py explain_views``.
+
+PostgreSQL plans come from ``EXPLAIN (FORMAT JSON)``; SQLite's from
+``EXPLAIN QUERY PLAN``, where a ``SCAN <table>`` without ``USING ... INDEX``
+is a full scan.
+"""
+
+import json
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+
+from . import benchmarks
+
+
+@dataclass
+class SeqScan:
+    table: str
+    rows: int = None   # planner estimate (PostgreSQL) or table size
+
+
+@dataclass
+class QueryPlan:
+    view: str
+    sql: str
+    seq_scans: list = field(default_factory=list)
+
+
+def _admin_changelist(filters):
+    return benchmarks.Scenario(
+        "admin:siteapp_order_changelist", 30,
+        lambda c: reverse("admin:siteapp_order_changelist"),
+        data=lambda c: filters() if callable(filters) else filters,
+        user="staff",
+        label="&".join(filters) if isinstance(filters, dict) else "created_at",
+    )
+
+
+def _last_week():
+    now = timezone.localtime()
+    return {
+        "created_at__gte": (now - timedelta(days=7)).isoformat(sep=" "),
+        "created_at__lt": (now + timedelta(days=1)).isoformat(sep=" "),
+    }
+
+
+EXTRA_SCENARIOS = [
+    _admin_changelist({}),
+    _admin_changelist({"status__exact": "pending"}),
+    _admin_changelist({"payment_status__exact": "failed"}),
+    _admin_changelist({"city": "Kochi"}),
+    _admin_changelist(_last_week),
+    # SignUpForm.clean_email's lookup
+    benchmarks.Scenario(
+        "signup", 5, lambda c: reverse("signup"), method="post",
+        data=lambda c: {
+            "username": "someone-new", "email": c.customer.email,
+            "password1": "x-Pass-12345", "password2": "x-Pass-12345",
+        },
+        label="taken_email",
+    ),
+]
+
+
+class _Collector:
+    """``execute_wrapper`` that keeps each distinct SELECT with its params."""
+
+    def __init__(self):
+        self.queries = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip().upper().startswith("SELECT"):
+            self.queries.setdefault(sql, params)
+        return execute(sql, params, many, context)
+
+
+def capture(scenario, ctx):
+    collector = _Collector()
+    with connection.execute_wrapper(collector):
+        benchmarks.measure(scenario, ctx)
+    return collector.queries
+
+
+def _walk(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _walk(child)
+
+
+def seq_scans(sql, params):
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return [
+                SeqScan(node["Relation Name"], node.get("Plan Rows"))
+                for node in _walk(plan[0]["Plan"])
+                if node["Node Type"] == "Seq Scan"
+            ]
+
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+        details = [row[-1] for row in cursor.fetchall()]
+        # derived tables (FROM (SELECT ...) alias) are declared as co-routines
+        # or materialized first; scanning their rows is not a table scan
+        derived = {
+            detail.split()[1].lower() for detail in details
+            if detail.startswith(("CO-ROUTINE ", "MATERIALIZE "))
+        }
+        scans = []
+        for detail in details:
+            if detail.startswith("SCAN ") and "USING" not in detail:
+                table = detail.split()[1]
+                name = table.lower()
+                if name not in derived and name != "constant" and not name.startswith("(subquery"):
+                    scans.append(SeqScan(table))
+        return scans
+
+
+def table_sizes(tables):
+    sizes = {}
+    existing = set(connection.introspection.table_names())
+    with connection.cursor() as cursor:
+        for table in tables:
+            if table in existing:
+                cursor.execute(f"SELECT COUNT(*) FROM {connection.ops.quote_name(table)}")
+                sizes[table] = cursor.fetchone()[0]
+    return sizes
+
+
+def audit(ctx, min_rows=1000, scenarios=None):
+    """
+    Plans with full scans of tables holding at least ``min_rows`` rows
+    (small lookup tables like categories are cheaper to scan than to index).
+    Tables the database reports by alias are always included.
+    """
+    scenarios = scenarios if scenarios is not None else benchmarks.SCENARIOS + EXTRA_SCENARIOS
+    plans = []
+    for scenario in scenarios:
+        for sql, params in capture(scenario, ctx).items():
+            scans = seq_scans(sql, params)
+            if scans:
+                plans.append(QueryPlan(scenario.key, sql, scans))
+
+    sizes = table_sizes({scan.table for plan in plans for scan in plan.seq_scans})
+    flagged = []
+    for plan in plans:
+        for scan in plan.seq_scans:
+            scan.rows = sizes.get(scan.table, scan.rows)
+        plan.seq_scans = [s for s in plan.seq_scans if s.rows is None or s.rows >= min_rows]
+        if plan.seq_scans:
+            flagged.append(plan)
+    return flagged
@@ -0,0 +1,186 @@
+"""
+Streaming exports of orders and the catalog.
+
+Ops used to copy order lists out of the admin a page at a time. Exports here
+are generators of text chunks, fed to a ``StreamingHttpResponse`` (staff
+endpoints) or a file (``manage.py export_orders`` / ``export_catalog``):
+
+* rows come from ``values_list(...).iterator(chunk_size=...)``, a
+  server-side cursor on PostgreSQL, so neither the database driver nor
+  Python ever holds more than one chunk;
+* orders are joined to their items in the same query and written as one
+  CSV line per item, or one NDJSON line per order with its items nested
+  (consecutive rows of an order are grouped on the fly);
+* memory use therefore does not depend on the size of the export.
+
+Order filters: local date range on ``created_at`` (index range, no
+per-row date conversion), status and city.
+"""
+
+import csv
+import datetime
+import json
+from itertools import groupby, islice
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import OrderItem, ProductVariant
+
+
+CHUNK_SIZE = 2000        # rows per database fetch
+LINES_PER_WRITE = 200    # lines joined into one chunk of output
+
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+ORDER_FIELDS = [
+    ("order_id", "order_id"),
+    ("created_at", "order__created_at"),
+    ("status", "order__status"),
+    ("payment_method", "order__payment_method"),
+    ("payment_status", "order__payment_status"),
+    ("customer_name", "order__customer_name"),
+    ("phone", "order__phone"),
+    ("city", "order__city"),
+    ("pincode", "order__pincode"),
+    ("total", "order__total"),
+    ("variant_id", "variant_id"),
+    ("product", "variant__product__title"),
+    ("color", "variant__color"),
+    ("blouse_option", "variant__blouse_option"),
+    ("quantity", "quantity"),
+    ("price", "price"),
+]
+# NDJSON: these columns describe the order, the rest go into "items"
+ORDER_LEVEL = 10
+
+CATALOG_FIELDS = [
+    ("variant_id", "id"),
+    ("product_id", "product_id"),
+    ("product", "product__title"),
+    ("slug", "product__slug"),
+    ("category", "product__category__name"),
+    ("color", "color"),
+    ("blouse_option", "blouse_option"),
+    ("price", "price"),
+    ("stock", "stock"),
+    ("active", "product__active"),
+]
+
+
+def parse_date(value):
+    """ISO date or None; raises ValueError for anything else."""
+    return datetime.date.fromisoformat(value) if value else None
+
+
+def _local_midnight(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def order_items(start=None, end=None, status=None, city=None, using=None):
+    """Items of the matching orders, ordered by order, as field tuples."""
+    items = OrderItem.objects.using(using)
+    if start is not None:
+        items = items.filter(order__created_at__gte=_local_midnight(start))
+    if end is not None:
+        items = items.filter(order__created_at__lt=_local_midnight(end + datetime.timedelta(days=1)))
+    if status:
+        items = items.filter(order__status=status)
+    if city:
+        items = items.filter(order__city=city)
+    return (
+        items.order_by("order_id", "id")
+        .values_list(*[field for _, field in ORDER_FIELDS])
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def catalog_variants(using=None):
+    return (
+        ProductVariant.objects.using(using).order_by("product_id", "id")
+        .values_list(*[field for _, field in CATALOG_FIELDS])
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+# ---------------------------------------------------------------------------
+# formats
+# ---------------------------------------------------------------------------
+
+class _Echo:
+    """File-like object whose ``write`` hands the line back to csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def _batched(lines):
+    lines = iter(lines)
+    while chunk := list(islice(lines, LINES_PER_WRITE)):
+        yield "".join(chunk)
+
+
+def csv_lines(columns, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _json_line(record):
+    return json.dumps(record, cls=DjangoJSONEncoder, separators=(",", ":")) + "\n"
+
+
+def ndjson_lines(columns, rows):
+    for row in rows:
+        yield _json_line(dict(zip(columns, row)))
+
+
+def ndjson_orders(rows):
+    """One line per order; consecutive rows of an order share its fields."""
+    names = [name for name, _ in ORDER_FIELDS]
+    for _, group in groupby(rows, key=lambda row: row[0]):
+        group = list(group)
+        order = dict(zip(names[:ORDER_LEVEL], group[0][:ORDER_LEVEL]))
+        order["items"] = [dict(zip(names[ORDER_LEVEL:], row[ORDER_LEVEL:])) for row in group]
+        yield _json_line(order)
+
+
+def export_orders(fmt, **filters):
+    """
+    Text chunks of the order export in ``fmt`` ("csv" or "ndjson").
+    ``using`` (with the filters) picks the database, e.g. the replica.
+    """
+    rows = order_items(**filters)
+    if fmt == "csv":
+        return _batched(csv_lines([name for name, _ in ORDER_FIELDS], rows))
+    return _batched(ndjson_orders(rows))
+
+
+def export_catalog(fmt, using=None):
+    rows = catalog_variants(using)
+    columns = [name for name, _ in CATALOG_FIELDS]
+    if fmt == "csv":
+        return _batched(csv_lines(columns, rows))
+    return _batched(ndjson_lines(columns, rows))
+
+
+def write_file(chunks, path):
+    """Write an export to ``path``; returns the number of characters written."""
+    written = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for chunk in chunks:
+            written += f.write(chunk)
+    return written
+
+
+async def aiterate(chunks):
+    """
+    Serve a sync export from an async (ASGI) response without buffering it:
+    each chunk is produced in the thread that owns the database cursor.
+    """
+    chunks = iter(chunks)
+    next_chunk = sync_to_async(lambda: next(chunks, None))
+    while (chunk := await next_chunk()) is not None:
+        yield chunk
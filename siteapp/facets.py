@@ -0,0 +1,239 @@
+"""
+Faceted browsing of the catalog: category, blouse option, colour and price
+band, each with the number of products a choice would show.
+
+Counting with a GROUP BY over ``ProductVariant`` on every listing would walk
+every variant of the catalog. Instead ``ProductFacet`` holds one row per
+active product and facet value it offers ("has a red variant", "has a
+variant under ₹2,000"), refreshed per product together with the summary in
+``summaries.py``; stock-only changes (checkout, restocks) just copy the new
+``in_stock`` flag onto the rows. Then:
+
+* a selected facet narrows the listing with an ``EXISTS`` probe on the
+  ``(product, facet, value)`` unique index; values of one facet are OR-ed,
+  facets are AND-ed;
+* counts for a facet apply every selection except its own, so shoppers see
+  how many products each alternative would give. Facets sharing the same
+  filters are counted in one grouped query over the index, so a page costs
+  one query plus one per selected facet, whatever the catalog size, and the
+  result is cached per catalog version;
+* each count comes with its in-stock share, which is what "In stock only"
+  shows. Stock state is the product's, as in the listing filter.
+"""
+
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q, Subquery
+
+from .models import Product, ProductFacet, ProductVariant
+from .search import search_products
+
+
+BATCH_SIZE = 1000
+
+# (value, label, lowest price, price up to); bounds are rupees
+PRICE_BANDS = [
+    ("under-2000", "Under ₹2,000", None, 2000),
+    ("2000-5000", "₹2,000 – ₹5,000", 2000, 5000),
+    ("5000-10000", "₹5,000 – ₹10,000", 5000, 10000),
+    ("10000-plus", "₹10,000 and above", 10000, None),
+]
+
+# facets chosen with query parameters; the category is the URL's
+FILTER_FACETS = [ProductFacet.BLOUSE, ProductFacet.COLOR, ProductFacet.PRICE]
+
+_BLOUSE_LABELS = dict(ProductVariant.BLOUSE_CHOICES)
+_PRICE_LABELS = {value: label for value, label, _, _ in PRICE_BANDS}
+_FACET_TITLES = dict(ProductFacet.FACET_CHOICES)
+
+
+def price_band(price):
+    for value, _, low, high in PRICE_BANDS:
+        if (low is None or price >= low) and (high is None or price < high):
+            return value
+    return None
+
+
+def _color_value(color):
+    return color.strip().lower()[:64]
+
+
+def label(facet, value):
+    if facet == ProductFacet.BLOUSE:
+        return _BLOUSE_LABELS.get(value, value)
+    if facet == ProductFacet.PRICE:
+        return _PRICE_LABELS.get(value, value)
+    return value.title()
+
+
+# ---------------------------------------------------------------------------
+# maintaining the index
+# ---------------------------------------------------------------------------
+
+def _facet_rows(product_ids):
+    """Index rows for the active products among ``product_ids``: one query."""
+    rows = (
+        Product.objects.filter(pk__in=product_ids, active=True)
+        .values_list("pk", "category_id", "in_stock", "variants__color", "variants__blouse_option", "variants__price")
+    )
+    values, in_stock = set(), {}
+    for pk, category_id, stocked, color, blouse_option, price in rows:
+        in_stock[pk] = stocked
+        # products without a category still count towards the totals
+        values.add((pk, ProductFacet.CATEGORY, "" if category_id is None else str(category_id)))
+        if blouse_option:
+            values.add((pk, ProductFacet.BLOUSE, blouse_option))
+        if color and _color_value(color):
+            values.add((pk, ProductFacet.COLOR, _color_value(color)))
+        if price is not None:
+            values.add((pk, ProductFacet.PRICE, price_band(price)))
+    return [
+        ProductFacet(product_id=pk, facet=facet, value=value, in_stock=in_stock[pk])
+        for pk, facet, value in sorted(values)
+    ]
+
+
+def refresh_product_facets(product_ids):
+    """Rewrite the index rows of ``product_ids``: one read, delete and insert."""
+    product_ids = {pk for pk in product_ids if pk is not None}
+    if not product_ids:
+        return 0
+    rows = _facet_rows(product_ids)
+    ProductFacet.objects.filter(product_id__in=product_ids).delete()
+    ProductFacet.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    return len(rows)
+
+
+def refresh_stock(product_ids):
+    """Only stock changed: copy each product's ``in_stock`` onto its rows."""
+    product_ids = {pk for pk in product_ids if pk is not None}
+    if not product_ids:
+        return 0
+    return ProductFacet.objects.filter(product_id__in=product_ids).update(
+        in_stock=Subquery(Product.objects.filter(pk=OuterRef("product_id")).values("in_stock")[:1]),
+    )
+
+
+def rebuild(batch_size=BATCH_SIZE):
+    """Recompute the whole index, ``batch_size`` products at a time."""
+    with transaction.atomic():
+        ProductFacet.objects.all().delete()
+        ids = list(Product.objects.filter(active=True).order_by("pk").values_list("pk", flat=True))
+        written = 0
+        for start in range(0, len(ids), batch_size):
+            rows = _facet_rows(ids[start:start + batch_size])
+            ProductFacet.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+            written += len(rows)
+    return written
+
+
+# ---------------------------------------------------------------------------
+# filtering and counting
+# ---------------------------------------------------------------------------
+
+def parse_selection(params):
+    """``{facet: sorted values}`` from the query parameters, empty ones dropped."""
+    selection = {}
+    for facet in FILTER_FACETS:
+        values = sorted({v for v in params.getlist(facet) if v})
+        if values:
+            selection[facet] = values
+    return selection
+
+
+def _offers(facet, values, product="pk"):
+    return Exists(ProductFacet.objects.filter(product_id=OuterRef(product), facet=facet, value__in=values))
+
+
+def filter_products(products, selection):
+    """Narrow a ``Product`` queryset to the selection (category excluded)."""
+    for facet, values in selection.items():
+        if facet != ProductFacet.CATEGORY:
+            products = products.filter(_offers(facet, values))
+    return products
+
+
+def counts(selection, q=""):
+    """
+    ``{facet: {value: (products, in stock)}}`` for every facet, each under
+    the selections of the other facets (and the search ``q``, if any).
+    """
+    matching = None
+    if q:
+        matching = search_products(Product.objects.filter(active=True), q).values("pk")
+
+    # facets counted under the same filters share a query
+    groups = {}
+    for facet, _ in ProductFacet.FACET_CHOICES:
+        groups.setdefault(facet if facet in selection else None, []).append(facet)
+
+    result = {facet: {} for facet, _ in ProductFacet.FACET_CHOICES}
+    for excluded, group in groups.items():
+        rows = ProductFacet.objects.filter(facet__in=group)
+        for facet, values in selection.items():
+            if facet != excluded:
+                rows = rows.filter(_offers(facet, values, product="product_id"))
+        if matching is not None:
+            rows = rows.filter(product_id__in=matching)
+        rows = (
+            rows.values("facet", "value")
+            .annotate(products=Count("id"), stocked=Count("id", filter=Q(in_stock=True)))
+            .order_by()
+        )
+        for row in rows:
+            result[row["facet"]][row["value"]] = (row["products"], row["stocked"])
+    return result
+
+
+def options(selection, facet_counts, in_stock_only=False):
+    """
+    Display groups for the filter facets: ``{"name", "title", "options"}``
+    with each option's ``value``, ``label``, ``count`` and ``selected``.
+    Values with no products are left out unless selected.
+    """
+    order = {
+        ProductFacet.BLOUSE: [value for value, _ in ProductVariant.BLOUSE_CHOICES],
+        ProductFacet.PRICE: [value for value, _, _, _ in PRICE_BANDS],
+    }
+    groups = []
+    for facet in FILTER_FACETS:
+        chosen = set(selection.get(facet, ()))
+        found = facet_counts.get(facet, {})
+        values = set(found) | chosen
+        known = order.get(facet)
+        if known:
+            values = sorted(values, key=lambda v: (known.index(v) if v in known else len(known), v))
+        else:
+            values = sorted(values)
+        opts = []
+        for value in values:
+            total, stocked = found.get(value, (0, 0))
+            count = stocked if in_stock_only else total
+            if count or value in chosen:
+                opts.append({"value": value, "label": label(facet, value), "count": count, "selected": value in chosen})
+        if opts:
+            groups.append({"name": facet, "title": _FACET_TITLES[facet], "options": opts})
+    return groups
+
+
+def category_counts(facet_counts, in_stock_only=False):
+    """``{category id: products}`` as shown on the category chips."""
+    index = 1 if in_stock_only else 0
+    return {
+        int(value): count[index]
+        for value, count in facet_counts.get(ProductFacet.CATEGORY, {}).items()
+        if value
+    }
+
+
+def all_count(facet_counts, in_stock_only=False):
+    """Products across every category, for the "All" chip."""
+    index = 1 if in_stock_only else 0
+    return sum(count[index] for count in facet_counts.get(ProductFacet.CATEGORY, {}).values())
+
+
+def in_stock_count(facet_counts, category=None):
+    """Products of the current selection that are in stock."""
+    rows = facet_counts.get(ProductFacet.CATEGORY, {})
+    if category is not None:
+        return rows.get(str(category.pk), (0, 0))[1]
+    return sum(stocked for _, stocked in rows.values())
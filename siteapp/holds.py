@@ -0,0 +1,153 @@
+"""
+Stock holds for carts.
+
+Adding to a cart used to check ``variant.stock`` and nothing else, so ten
+shoppers could each put the last saree in their cart and nine of them found
+out at checkout. Now a cart line reserves its quantity in ``StockHold`` for
+``CART_HOLD_SECONDS``:
+
+* available stock is ``stock`` minus the unexpired holds of *other* carts,
+  one indexed aggregate per lookup (``hold_variant_expiry_idx``). The
+  product page shows it and adding to the cart checks it; it is never
+  cached, as holds come and go without a catalog change;
+* ``reserve`` sets a cart's hold for a variant with the variant row locked,
+  so two carts cannot both take the last piece; shrinking a cart line never
+  fails, even when its hold has lapsed and others hold the stock meanwhile;
+* viewing the cart or checkout page extends the cart's live holds;
+* checkout counts other carts' holds and drops the buyer's in the same
+  transaction that decrements stock;
+* expired holds simply stop counting; ``manage.py expire_holds`` deletes
+  them in batches from cron.
+
+Holds are keyed by the ``cart_store`` key, so they follow the cart, not the
+session.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from .models import ProductVariant, StockHold
+
+
+class NotAvailable(Exception):
+    def __init__(self, variant_id, requested, available):
+        self.variant_id = variant_id
+        self.requested = requested
+        self.available = available
+        super().__init__(f"Only {available} available for variant {variant_id}")
+
+
+def hold_seconds():
+    return getattr(settings, "CART_HOLD_SECONDS", 15 * 60)
+
+
+def _active(now=None):
+    return StockHold.objects.filter(expires_at__gt=now or timezone.now())
+
+
+def _held_rows(variant_ids, cart_key):
+    holds = _active().filter(variant_id__in=list(variant_ids))
+    if cart_key is not None:
+        holds = holds.exclude(cart_key=cart_key)
+    return holds.values("variant_id").annotate(held=Sum("quantity")).order_by()
+
+
+def held_by_others(variant_ids, cart_key=None):
+    """``{variant_id: quantity}`` held by carts other than ``cart_key``."""
+    return {row["variant_id"]: row["held"] for row in _held_rows(variant_ids, cart_key)}
+
+
+async def aheld_by_others(variant_ids, cart_key=None):
+    return {row["variant_id"]: row["held"] async for row in _held_rows(variant_ids, cart_key)}
+
+
+def unheld(variant, held):
+    """What ``variant`` (already loaded) has left for this cart, given ``held``."""
+    return max(0, variant.stock - held.get(variant.pk, 0))
+
+
+def available(variant_ids, cart_key=None):
+    """``{variant_id: stock - held by others}`` for existing variants."""
+    variant_ids = list(variant_ids)
+    held = held_by_others(variant_ids, cart_key)
+    stock = ProductVariant.objects.filter(pk__in=variant_ids).values_list("pk", "stock")
+    return {pk: max(0, qty - held.get(pk, 0)) for pk, qty in stock}
+
+
+def reserve(cart_key, variant_id, quantity, current=0):
+    """
+    Make ``cart_key``'s hold on ``variant_id`` exactly ``quantity`` (0
+    releases it). ``current`` is the quantity already in the cart: up to
+    that (or the live hold, if larger) nothing is checked. Growing beyond it
+    raises ``NotAvailable`` if the extra pieces are held elsewhere or out of
+    stock; nothing changes then.
+    """
+    if quantity <= 0:
+        release(cart_key, [variant_id])
+        return
+
+    now = timezone.now()
+    with transaction.atomic():
+        # serializes reservations of this variant (a no-op lock on SQLite,
+        # where the write lock of the upsert below does the same job)
+        stock = (
+            ProductVariant.objects.select_for_update()
+            .filter(pk=variant_id).values_list("stock", flat=True).first()
+        )
+        if stock is None:
+            raise NotAvailable(variant_id, quantity, 0)
+
+        totals = _active(now).filter(variant_id=variant_id).aggregate(
+            mine=Sum("quantity", filter=Q(cart_key=cart_key)),
+            others=Sum("quantity", filter=~Q(cart_key=cart_key)),
+        )
+        if quantity > max(current, totals["mine"] or 0):
+            free = max(0, stock - (totals["others"] or 0))
+            if quantity > free:
+                raise NotAvailable(variant_id, quantity, free)
+
+        StockHold.objects.bulk_create(
+            [StockHold(
+                variant_id=variant_id,
+                cart_key=cart_key,
+                quantity=quantity,
+                expires_at=now + timedelta(seconds=hold_seconds()),
+            )],
+            update_conflicts=True,
+            unique_fields=["cart_key", "variant"],
+            update_fields=["quantity", "expires_at"],
+        )
+
+
+def release(cart_key, variant_ids=None):
+    """Drop the cart's holds (all of them, or only for ``variant_ids``)."""
+    holds = StockHold.objects.filter(cart_key=cart_key)
+    if variant_ids is not None:
+        holds = holds.filter(variant_id__in=list(variant_ids))
+    return holds.delete()[0]
+
+
+def extend(cart_key):
+    """Push back the expiry of the cart's live holds (expired ones stay lapsed)."""
+    now = timezone.now()
+    return _active(now).filter(cart_key=cart_key).update(
+        expires_at=now + timedelta(seconds=hold_seconds())
+    )
+
+
+def expire(batch_size=5000):
+    """
+    Delete lapsed holds in primary-key batches, like
+    ``cart_store.expire_abandoned``. Returns the number deleted.
+    """
+    lapsed = StockHold.objects.filter(expires_at__lte=timezone.now()).order_by("pk")
+    deleted = 0
+    while True:
+        ids = list(lapsed.values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += StockHold.objects.filter(pk__in=ids).delete()[0]
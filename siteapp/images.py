@@ -0,0 +1,109 @@
+"""
+Responsive image derivatives for ``Product.featured_image``.
+
+Saree photos are uploaded at camera resolution. For every original we store
+fixed-width JPEG and WebP copies next to it::
+
+    products/kanchi.jpg
+    products/kanchi.w320.jpg   products/kanchi.w320.webp
+    products/kanchi.w640.jpg   products/kanchi.w640.webp
+    ...
+
+Derivatives are generated when a product is saved with a new image
+(``signals.py``) and can be backfilled with ``manage.py generate_thumbnails``.
+Templates emit them as ``srcset`` through the ``product_images`` tag library
+and fall back to the original while derivatives are missing.
+"""
+
+import logging
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+
+logger = logging.getLogger(__name__)
+
+WIDTHS = (320, 640, 960, 1280)
+
+# format -> (file extension, Pillow save options)
+FORMATS = {
+    "jpeg": ("jpg", {"quality": 82, "optimize": True, "progressive": True}),
+    "webp": ("webp", {"quality": 80, "method": 4}),
+}
+
+
+def derivative_name(name, width, fmt):
+    path = PurePosixPath(name)
+    ext = FORMATS[fmt][0]
+    return str(path.with_name(f"{path.stem}.w{width}.{ext}"))
+
+
+def derivative_names(name):
+    return [derivative_name(name, w, fmt) for w in WIDTHS for fmt in FORMATS]
+
+
+def has_derivatives(name, storage=default_storage):
+    # the largest webp is written last, so it marks a complete set
+    return storage.exists(derivative_name(name, WIDTHS[-1], "webp"))
+
+
+def _encode(image, fmt):
+    buffer = BytesIO()
+    options = FORMATS[fmt][1]
+    image.save(buffer, format=fmt.upper(), **options)
+    return buffer.getvalue()
+
+
+def generate_derivatives(name, storage=default_storage, force=False):
+    """
+    Write every width/format derivative of the stored image ``name``.
+    Widths larger than the original are stored at the original size so the
+    srcset is always complete. Returns the number of files written.
+    """
+    if not force and has_derivatives(name, storage):
+        return 0
+
+    with storage.open(name, "rb") as f:
+        original = Image.open(f)
+        original = ImageOps.exif_transpose(original)
+        original.load()
+
+    if original.mode not in ("RGB", "L"):
+        original = original.convert("RGB")
+
+    written = 0
+    for width in WIDTHS:
+        if original.width > width:
+            height = round(original.height * width / original.width)
+            resized = original.resize((width, height), Image.Resampling.LANCZOS)
+        else:
+            resized = original
+        for fmt in FORMATS:
+            target = derivative_name(name, width, fmt)
+            if storage.exists(target):
+                storage.delete(target)
+            storage.save(target, ContentFile(_encode(resized, fmt)))
+            written += 1
+    return written
+
+
+def safe_generate(name, force=False):
+    """
+    Like ``generate_derivatives`` but logs instead of raising, so a broken
+    upload never breaks saving the product. Used by the signal and the
+    backfill workers; returns ``(name, files_written, error)``.
+    """
+    try:
+        return name, generate_derivatives(name, force=force), None
+    except (OSError, ValueError) as exc:
+        logger.warning("Could not create derivatives for %s: %s", name, exc)
+        return name, 0, str(exc)
+
+
+def srcset(name, fmt, storage=default_storage):
+    return ", ".join(
+        f"{storage.url(derivative_name(name, w, fmt))} {w}w" for w in WIDTHS
+    )
@@ -0,0 +1,417 @@
+"""
+Request-level performance instrumentation.
+
+``PerformanceMiddleware`` samples a fraction of requests
+(``PERF_SAMPLE_RATE``) and records, per resolved URL name, wall time, SQL
+query count and time, template render time and response size. Each metric
+is kept as a fixed-bucket histogram, so memory use does not grow with
+traffic and p50/p95 can be read back at any time.
+
+Queries are captured by an execute wrapper on every connection (no
+``DEBUG`` needed), including the threads async views run their queries in.
+A request that runs the same statement shape at least
+``PERF_N_PLUS_ONE_THRESHOLD`` times is counted as a suspected N+1 under that
+signature.
+
+Aggregates live in the worker process and are flushed to the
+``PERF_CACHE_ALIAS`` cache every ``PERF_FLUSH_INTERVAL`` seconds, where they
+expire a few intervals after the worker's last flush; the staff endpoint
+and ``manage.py perf_report`` merge every live worker's snapshot. As with
+the catalog cache, point the alias at a shared backend when running several
+workers.
+"""
+
+import contextvars
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+logger = logging.getLogger(__name__)
+
+# upper bounds; the last bucket is open-ended
+MS_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576)
+
+WORKERS_KEY = "perf:workers"
+WORKERS_LOCK_KEY = "perf:workers:lock"
+WORKERS_LOCK_TTL = 5  # seconds; outlives a crashed flush only briefly
+SNAPSHOT_TTL_FLUSHES = 6
+MAX_SIGNATURES = 20
+
+_current = contextvars.ContextVar("perf_sample", default=None)
+
+
+def sample_rate():
+    return getattr(settings, "PERF_SAMPLE_RATE", 0.0)
+
+
+def n_plus_one_threshold():
+    return getattr(settings, "PERF_N_PLUS_ONE_THRESHOLD", 5)
+
+
+def _sampled():
+    rate = sample_rate()
+    return rate > 0 and random.random() < rate
+
+
+def get_cache():
+    return caches[getattr(settings, "PERF_CACHE_ALIAS", "default")]
+
+
+def flush_interval():
+    return getattr(settings, "PERF_FLUSH_INTERVAL", 10)
+
+
+def snapshot_ttl():
+    """Seconds a published snapshot outlives its worker's last flush."""
+    return max(SNAPSHOT_TTL_FLUSHES * flush_interval(), 60)
+
+
+# ---------------------------------------------------------------------------
+# histograms
+# ---------------------------------------------------------------------------
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def merge(self, data):
+        self.counts = [a + b for a, b in zip(self.counts, data["counts"])]
+        self.count += data["count"]
+        self.total += data["total"]
+        self.max = max(self.max, data["max"])
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the ``p``-th percentile."""
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return self.max
+
+    def as_dict(self):
+        return {"counts": self.counts, "count": self.count, "total": self.total, "max": self.max}
+
+    def summary(self):
+        return {
+            "mean": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "max": round(self.max, 3),
+        }
+
+
+METRICS = {
+    "wall_ms": MS_BUCKETS,
+    "sql_queries": COUNT_BUCKETS,
+    "sql_ms": MS_BUCKETS,
+    "template_ms": MS_BUCKETS,
+    "response_bytes": BYTES_BUCKETS,
+}
+
+
+class ViewStats:
+    def __init__(self):
+        self.metrics = {name: Histogram(buckets) for name, buckets in METRICS.items()}
+        # signature -> number of sampled requests where it repeated
+        self.n_plus_one = Counter()
+
+    def merge(self, data):
+        for name, hist in data["metrics"].items():
+            self.metrics[name].merge(hist)
+        self.n_plus_one.update(data["n_plus_one"])
+
+    def as_dict(self):
+        return {
+            "metrics": {name: h.as_dict() for name, h in self.metrics.items()},
+            "n_plus_one": dict(self.n_plus_one.most_common(MAX_SIGNATURES)),
+        }
+
+
+# ---------------------------------------------------------------------------
+# per-request sample
+# ---------------------------------------------------------------------------
+
+_IN_LIST = re.compile(r"IN \((?:%s, )*%s\)")
+_LITERAL = re.compile(r"\b\d+\b|'[^']*'")
+_SPACES = re.compile(r"\s+")
+
+
+def signature(sql):
+    """Statement shape: parameters, literals and IN-list lengths removed."""
+    sql = _IN_LIST.sub("IN (...)", sql)
+    sql = _LITERAL.sub("?", sql)
+    return _SPACES.sub(" ", sql).strip()[:300]
+
+
+class Sample:
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        # called by _sql_wrapper for queries of the sampled request
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.queries += 1
+            self.statements[sql] += 1
+
+    def suspected_n_plus_one(self):
+        threshold = n_plus_one_threshold()
+        repeated = Counter()
+        for sql, n in self.statements.items():
+            repeated[signature(sql)] += n
+        return {sig: n for sig, n in repeated.items() if n >= threshold}
+
+
+def _sql_wrapper(execute, sql, params, many, context):
+    sample = _current.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    return sample(execute, sql, params, many, context)
+
+
+def _add_sql_wrapper(connection, **kwargs):
+    # first in the list: execute_wrapper() context managers pop the last one
+    if _sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _sql_wrapper)
+
+
+def _wrap_open_connections():
+    for conn in connections.all(initialized_only=True):
+        _add_sql_wrapper(conn)
+
+
+def install_sql_timer():
+    """
+    Time queries on every connection, in every thread (async views run
+    their queries in ``sync_to_async`` threads). New connections are wrapped
+    as they open; ones already open are wrapped when a sampled request runs
+    in their thread. Unsampled requests only pay for one context-variable
+    lookup per query.
+    """
+    connection_created.connect(_add_sql_wrapper, dispatch_uid="siteapp.instrumentation.sql")
+    _wrap_open_connections()
+
+
+def install_template_timer():
+    """
+    Time top-level template renders of the Django backend (nested renders are
+    part of their parent). Only sampled requests pay for the bookkeeping.
+    """
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, "_perf_timed", False):
+        return
+
+    original = Template.render
+
+    @wraps(original)
+    def render(self, context=None, request=None):
+        sample = _current.get()
+        if sample is None:
+            return original(self, context, request)
+        sample.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            sample.template_depth -= 1
+            if not sample.template_depth:
+                sample.template_time += time.perf_counter() - start
+
+    render._perf_timed = True
+    Template.render = render
+
+
+# ---------------------------------------------------------------------------
+# process-wide aggregates
+# ---------------------------------------------------------------------------
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+        self._last_flush = 0.0
+
+    def record(self, view_name, wall, sample, response_bytes):
+        suspects = sample.suspected_n_plus_one()
+        if suspects:
+            logger.info("Suspected N+1 in %s: %s", view_name, suspects)
+
+        with self._lock:
+            stats = self._views.setdefault(view_name, ViewStats())
+            stats.metrics["wall_ms"].observe(wall * 1000)
+            stats.metrics["sql_queries"].observe(sample.queries)
+            stats.metrics["sql_ms"].observe(sample.sql_time * 1000)
+            stats.metrics["template_ms"].observe(sample.template_time * 1000)
+            stats.metrics["response_bytes"].observe(response_bytes)
+            stats.n_plus_one.update(suspects.keys())
+
+        self.maybe_flush()
+
+    def snapshot(self):
+        with self._lock:
+            return {name: stats.as_dict() for name, stats in self._views.items()}
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+    def maybe_flush(self):
+        now = time.monotonic()
+        if now - self._last_flush >= flush_interval():
+            self._last_flush = now
+            self.flush()
+
+    def flush(self):
+        """
+        Publish this worker's snapshot for ``report()`` in other processes.
+
+        The snapshot expires after a few flush intervals, so a worker that
+        exited (or has been idle that long) drops out of the report. The
+        worker list is rewritten under a short lock, pruned of workers whose
+        snapshot has expired; a flush that finds the lock taken leaves the
+        list alone and the next one registers this worker.
+        """
+        cache = get_cache()
+        key = f"perf:worker:{os.getpid()}"
+        cache.set(key, self.snapshot(), timeout=snapshot_ttl())
+        if not cache.add(WORKERS_LOCK_KEY, os.getpid(), timeout=WORKERS_LOCK_TTL):
+            return
+        try:
+            workers = cache.get(WORKERS_KEY) or []
+            live = [k for k in cache.get_many(workers) if k != key] + [key]
+            if live != workers:
+                cache.set(WORKERS_KEY, live, timeout=None)
+        finally:
+            cache.delete(WORKERS_LOCK_KEY)
+
+
+recorder = Recorder()
+
+
+def report(view=None):
+    """
+    Merge every worker's published snapshot (plus this process's live data)
+    into ``{view_name: {"samples", metric: {mean, p50, p95, max}, "n_plus_one"}}``.
+    """
+    recorder.flush()
+    cache = get_cache()
+    snapshots = cache.get_many(cache.get(WORKERS_KEY) or []).values()
+
+    merged = {}
+    for snapshot in snapshots:
+        for name, data in snapshot.items():
+            if view is None or name == view:
+                merged.setdefault(name, ViewStats()).merge(data)
+
+    result = {}
+    for name, stats in sorted(merged.items()):
+        result[name] = {
+            "samples": stats.metrics["wall_ms"].count,
+            **{metric: h.summary() for metric, h in stats.metrics.items()},
+            "n_plus_one": dict(stats.n_plus_one.most_common(MAX_SIGNATURES)),
+        }
+    return result
+
+
+def reset():
+    """Drop live and published data of every worker."""
+    recorder.reset()
+    cache = get_cache()
+    cache.delete_many(cache.get(WORKERS_KEY) or [])
+    cache.delete(WORKERS_KEY)
+
+
+# ---------------------------------------------------------------------------
+# middleware
+# ---------------------------------------------------------------------------
+
+class PerformanceMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        install_sql_timer()
+        install_template_timer()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not _sampled():
+            return self.get_response(request)
+
+        _wrap_open_connections()
+        sample = Sample()
+        token = _current.set(sample)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._record(request, response, time.perf_counter() - start, sample)
+        return response
+
+    async def __acall__(self, request):
+        if not _sampled():
+            return await self.get_response(request)
+
+        # the context variable follows the request into sync_to_async threads
+        await sync_to_async(_wrap_open_connections)()
+        sample = Sample()
+        token = _current.set(sample)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._record(request, response, time.perf_counter() - start, sample)
+        return response
+
+    @staticmethod
+    def _record(request, response, wall, sample):
+        match = getattr(request, "resolver_match", None)
+        view_name = match.view_name if match else "<unresolved>"
+        size = 0 if response.streaming else len(response.content)
+        recorder.record(view_name, wall, sample, size)
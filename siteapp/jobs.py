@@ -0,0 +1,260 @@
+"""
+Background jobs.
+
+Side effects of an order (confirmation SMS / email, status updates, stock
+alerts) used to run inside the request. They are now rows in the ``Job``
+table, written once the surrounding transaction commits and picked up by
+``manage.py run_jobs``:
+
+* a task is a plain function registered with ``@task("name")``; its
+  keyword arguments are stored as JSON, so pass ids, not model instances;
+* ``enqueue_on_commit`` adds the row only if the order (or status change)
+  was actually committed – a rolled-back checkout sends nothing;
+* workers claim one due job at a time (``SKIP LOCKED`` on PostgreSQL, a
+  conditional UPDATE elsewhere), so any number of threads / processes can
+  share the table;
+* a failing job is retried with exponential backoff up to its
+  ``max_attempts`` and then parked as ``failed`` for the admin;
+* a job whose worker died is handed out again after ``JOB_LEASE_SECONDS``.
+"""
+
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 5
+BACKOFF_BASE = 10        # seconds before the first retry, doubled each time
+BACKOFF_CAP = 60 * 60    # never wait longer than this between attempts
+
+_registry = {}
+
+
+def task(name, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """Register ``func`` as the handler for jobs called ``name``."""
+    def register(func):
+        func.task_name = name
+        func.max_attempts = max_attempts
+        _registry[name] = func
+        return func
+    return register
+
+
+def get_task(name):
+    # importing the task modules fills the registry
+    from . import notifications  # noqa: F401
+    return _registry.get(name)
+
+
+def lease_seconds():
+    return getattr(settings, "JOB_LEASE_SECONDS", 10 * 60)
+
+
+# ---------------------------------------------------------------------------
+# producers
+# ---------------------------------------------------------------------------
+
+def _check(name):
+    func = get_task(name)
+    if func is None:
+        raise LookupError(f"Unknown task {name!r}")
+    return func
+
+
+def _new_job(name, payload, delay=0):
+    return Job(
+        task=name,
+        payload=payload,
+        max_attempts=_check(name).max_attempts,
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def enqueue(name, delay=0, **payload):
+    job = _new_job(name, payload, delay)
+    job.save()
+    return job
+
+
+def enqueue_many(name, payloads, delay=0):
+    """One INSERT for many jobs of the same task (admin bulk actions)."""
+    return Job.objects.bulk_create([_new_job(name, p, delay) for p in payloads])
+
+
+def enqueue_on_commit(name, **payload):
+    """
+    Queue the job once the current transaction commits; immediately outside
+    one. Unknown task names fail here, in the request, not in the worker.
+    The hook is robust: failing to queue a message is logged, it never turns
+    an already committed order into an error page.
+    """
+    _check(name)
+    transaction.on_commit(lambda: enqueue(name, **payload), robust=True)
+
+
+def enqueue_many_on_commit(name, payloads):
+    payloads = list(payloads)
+    if payloads:
+        _check(name)
+        transaction.on_commit(lambda: enqueue_many(name, payloads), robust=True)
+
+
+# ---------------------------------------------------------------------------
+# workers
+# ---------------------------------------------------------------------------
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def backoff(attempts):
+    delay = min(BACKOFF_CAP, BACKOFF_BASE * 2 ** (attempts - 1))
+    return delay * (1 + random.random() / 4)
+
+
+def _due():
+    return Job.objects.filter(status=Job.QUEUED, run_after__lte=timezone.now()).order_by("run_after", "id")
+
+
+def claim(worker_id):
+    """Mark the next due job as running for ``worker_id`` and return it."""
+    now = timezone.now()
+    claimed = {"status": Job.RUNNING, "locked_by": worker_id[:100], "locked_at": now}
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = _due().select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            Job.objects.filter(pk=job.pk).update(attempts=F("attempts") + 1, **claimed)
+    else:
+        # no row locks: whoever flips the status first owns the job
+        for job in _due()[:10]:
+            if Job.objects.filter(pk=job.pk, status=Job.QUEUED).update(attempts=F("attempts") + 1, **claimed):
+                break
+        else:
+            return None
+
+    for field, value in claimed.items():
+        setattr(job, field, value)
+    job.attempts += 1
+    return job
+
+
+def _record(job, **fields):
+    # a finished job must not be lost to a momentary lock; retry briefly
+    for attempt in range(3):
+        try:
+            Job.objects.filter(pk=job.pk).update(locked_by="", locked_at=None, **fields)
+            return
+        except OperationalError:
+            if attempt == 2:
+                raise
+            time.sleep(0.05 * (attempt + 1))
+
+
+def run_job(job):
+    """Run a claimed job and record the outcome. Returns True on success."""
+    func = get_task(job.task)
+    try:
+        if func is None:
+            raise LookupError(f"Unknown task {job.task!r}")
+        func(**job.payload)
+    except Exception as exc:
+        logger.exception("Job %s (%s) failed on attempt %d", job.pk, job.task, job.attempts)
+        if job.attempts >= job.max_attempts:
+            update = {"status": Job.FAILED}
+        else:
+            update = {
+                "status": Job.QUEUED,
+                "run_after": timezone.now() + timedelta(seconds=backoff(job.attempts)),
+            }
+        _record(job, last_error=f"{type(exc).__name__}: {exc}"[:2000], **update)
+        return False
+
+    _record(job, status=Job.DONE, last_error="")
+    return True
+
+
+def requeue_stale(lease=None):
+    """
+    Hand out again jobs whose worker stopped reporting back. A job that has
+    used up its attempts is marked failed instead, like any other failure,
+    so one that takes its worker down every time is not retried forever.
+    """
+    cutoff = timezone.now() - timedelta(seconds=lease if lease is not None else lease_seconds())
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=cutoff)
+    stale.filter(attempts__gte=F("max_attempts")).update(
+        status=Job.FAILED, locked_by="", locked_at=None,
+        last_error="Lease expired: the worker stopped reporting back.",
+    )
+    return stale.update(status=Job.QUEUED, locked_by="", locked_at=None)
+
+
+def purge_finished(days):
+    cutoff = timezone.now() - timedelta(days=days)
+    return Job.objects.filter(status=Job.DONE, updated_at__lt=cutoff).delete()[0]
+
+
+def _loop(worker_id, once, poll_interval, stop):
+    processed = 0
+    while not stop.is_set():
+        try:
+            job = claim(worker_id)
+        except OperationalError as exc:
+            # lock contention / lost connection: try again shortly
+            logger.warning("Worker %s could not claim a job: %s", worker_id, exc)
+            stop.wait(random.uniform(0.01, 0.1))
+            continue
+        if job is None:
+            if once:
+                break
+            requeue_stale()
+            stop.wait(poll_interval)
+            continue
+        try:
+            run_job(job)
+        except OperationalError as exc:
+            # the outcome was not recorded; the lease hands the job out again
+            logger.warning("Worker %s could not record job %s: %s", worker_id, job.pk, exc)
+        processed += 1
+    return processed
+
+
+def work(concurrency=1, once=False, poll_interval=1.0, stop=None):
+    """
+    Process jobs until ``stop`` is set (or, with ``once``, until nothing is
+    due). ``concurrency`` > 1 runs that many threads, each with its own
+    database connection. Returns the number of jobs processed.
+    """
+    stop = stop or threading.Event()
+    if concurrency <= 1:
+        return _loop(default_worker_id(), once, poll_interval, stop)
+
+    counts = []
+
+    def thread_main():
+        try:
+            counts.append(_loop(default_worker_id(), once, poll_interval, stop))
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=thread_main, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts)
@@ -0,0 +1,167 @@
+"""
+HTTP load generator for comparing deployments (ASGI vs WSGI servers).
+
+A small asyncio HTTP/1.1 client with keep-alive connections – no third-party
+dependency, so it runs wherever the project does. ``run`` keeps
+``concurrency`` connections busy for ``duration`` seconds, cycling through
+``paths``, and returns throughput and latency percentiles.
+``manage.py loadtest`` drives it against a running server or starts ASGI
+and WSGI servers in turn and prints them side by side.
+"""
+
+import asyncio
+import statistics
+import time
+from dataclasses import dataclass, field
+from itertools import cycle
+from urllib.parse import urlsplit
+
+
+@dataclass
+class LoadResult:
+    label: str
+    duration: float = 0.0
+    latencies: list = field(default_factory=list)
+    errors: int = 0
+    statuses: dict = field(default_factory=dict)
+
+    @property
+    def requests(self):
+        return len(self.latencies)
+
+    @property
+    def throughput(self):
+        return self.requests / self.duration if self.duration else 0.0
+
+    def percentile(self, p):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, max(0, round(len(ordered) * p / 100) - 1))]
+
+    def summary(self):
+        return {
+            "label": self.label,
+            "requests": self.requests,
+            "errors": self.errors,
+            "rps": round(self.throughput, 1),
+            "mean_ms": round(statistics.mean(self.latencies) * 1000, 2) if self.latencies else 0.0,
+            "p50_ms": round(self.percentile(50) * 1000, 2),
+            "p95_ms": round(self.percentile(95) * 1000, 2),
+            "p99_ms": round(self.percentile(99) * 1000, 2),
+            "statuses": dict(sorted(self.statuses.items())),
+        }
+
+
+class _Connection:
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+    async def get(self, path):
+        """Send one GET, read the whole response, return the status code."""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+            f"Connection: keep-alive\r\nAccept-Encoding: identity\r\n\r\n".encode()
+        )
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("server closed the connection")
+        status = int(status_line.split()[1])
+
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif "content-length" in headers:
+            await self.reader.readexactly(int(headers["content-length"]))
+        else:
+            await self.reader.read()
+            await self.close()
+            return status
+
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status
+
+
+async def _client(conn, paths, deadline, result):
+    while time.perf_counter() < deadline:
+        path = next(paths)
+        start = time.perf_counter()
+        try:
+            status = await conn.get(path)
+        except (OSError, ConnectionError, ValueError, asyncio.IncompleteReadError):
+            result.errors += 1
+            await conn.close()
+            continue
+        result.latencies.append(time.perf_counter() - start)
+        result.statuses[status] = result.statuses.get(status, 0) + 1
+        if status >= 500:
+            result.errors += 1
+    await conn.close()
+
+
+async def _run(base_url, paths, concurrency, duration, warmup, label):
+    parts = urlsplit(base_url)
+    host, port = parts.hostname, parts.port or 80
+    prefix = parts.path.rstrip("/")
+    full_paths = [prefix + p for p in paths]
+
+    if warmup:
+        await _run_phase(host, port, full_paths, concurrency, warmup, LoadResult("warmup"))
+    result = LoadResult(label)
+    await _run_phase(host, port, full_paths, concurrency, duration, result)
+    return result
+
+
+async def _run_phase(host, port, paths, concurrency, duration, result):
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*[
+        # each client starts at a different path so all are hit evenly
+        _client(_Connection(host, port), cycle(paths[i % len(paths):] + paths[:i % len(paths)]), deadline, result)
+        for i in range(concurrency)
+    ])
+    result.duration = time.perf_counter() - start
+
+
+def run(base_url, paths, concurrency=50, duration=10.0, warmup=1.0, label=""):
+    """Hammer ``base_url`` + each of ``paths``; returns a ``LoadResult``."""
+    return asyncio.run(_run(base_url, list(paths), concurrency, duration, warmup, label or base_url))
+
+
+async def wait_for_port(host, port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+        except OSError:
+            await asyncio.sleep(0.2)
+            continue
+        writer.close()
+        return True
+    return False
@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from siteapp import benchmarks, caching, synthetic
+from siteapp.models import Order
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the order admin changelist (filters, phone / pincode search, deep "
+        "cursor, date drill-down) as the order table grows and fail if load time "
+        "or query counts grow with it. Data is created inside a transaction that "
+        "is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[20_000, 100_000, 1_000_000],
+                            help="order counts to measure at (cumulative); keep them above "
+                                 "changelists.EXACT_COUNT_LIMIT so every size counts the same way")
+        parser.add_argument("--iterations", type=int, default=10, help="requests per scenario and size")
+        parser.add_argument("--max-growth", type=float, default=2.0,
+                            help="allowed p50 ratio between the largest and smallest size")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        try:
+            with transaction.atomic():
+                results = self.run(options)
+                transaction.set_rollback(True)
+        finally:
+            teardown_test_environment()
+            caching.bump_catalog_version()
+
+        self.report(results)
+        if connection.vendor != "postgresql":
+            self.stdout.write(self.style.WARNING(
+                f"{connection.vendor} has no planner row estimates: counts above "
+                "the exact limit are real COUNT(*)s here."
+            ))
+        problems = benchmarks.growth(results, options["max_growth"])
+        if problems:
+            raise CommandError("Changelist cost grows with the table:\n  " + "\n  ".join(problems))
+        self.stdout.write(self.style.SUCCESS("✅ Changelist load time stays flat."))
+
+    def run(self, options):
+        catalog = synthetic.build_catalog(products=200)
+        customer = synthetic.build_customer(catalog.variant_ids, orders=1)
+        staff = get_user_model().objects.create_superuser(
+            f"{synthetic.PREFIX}-admin", f"{synthetic.PREFIX}-admin@example.com", "bench-password",
+        )
+        ctx = benchmarks.build_context(catalog, customer, staff)
+        # fill the cached filter choices, so every size measures warm pages
+        benchmarks.measure(benchmarks.ADMIN_SCENARIOS[0], ctx)
+
+        results = {}
+        for size in sorted(options["sizes"]):
+            missing = size - Order.objects.count()
+            if missing > 0:
+                self.stdout.write(f"Growing the order table to {size}…")
+                synthetic.build_orders(catalog.variant_ids, missing, seed=size)
+            if connection.vendor == "postgresql":
+                # fresh planner statistics for the estimated counts
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE siteapp_order")
+            results[size] = benchmarks.run_benchmarks(
+                ctx, options["iterations"], scenarios=benchmarks.ADMIN_SCENARIOS,
+            )
+        return results
+
+    def report(self, results):
+        sizes = sorted(results)
+        self.stdout.write(f"{'scenario':<44}" + "".join(f"{size:>16,}" for size in sizes))
+        for key in sorted(results[sizes[0]]):
+            cells = "".join(
+                f"{results[size][key].p50 * 1000:>9.2f} ms/{results[size][key].queries:<3}" for size in sizes
+            )
+            self.stdout.write(f"{key:<44}{cells}")
@@ -0,0 +1,65 @@
+import statistics
+import time
+
+from django.contrib.sessions.backends.db import SessionStore as DBSessionStore
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from siteapp import cart_store
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare cart write latency: the old session-in-database cart against "
+        "the cache-first cart store. Writes into a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writes", type=int, default=500, help="cart updates per backend")
+        parser.add_argument("--lines", type=int, default=5, help="distinct variants in the cart")
+
+    def handle(self, *args, **options):
+        writes, lines = options["writes"], options["lines"]
+
+        with transaction.atomic():
+            results = {
+                "db session (old)": self.bench_session(writes, lines),
+                "cart store": self.bench_store(writes, lines),
+            }
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{writes} writes, {lines}-line cart")
+        for name, timings in results.items():
+            timings.sort()
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            self.stdout.write(
+                f"  {name:<18} mean {statistics.mean(timings) * 1000:7.3f} ms   "
+                f"p95 {p95 * 1000:7.3f} ms"
+            )
+
+    @staticmethod
+    def carts(writes, lines):
+        for i in range(writes):
+            yield {str(pk): 1 + (i + pk) % 3 for pk in range(1, lines + 1)}
+
+    def bench_session(self, writes, lines):
+        session = DBSessionStore()
+        session.create()
+        timings = []
+        for cart in self.carts(writes, lines):
+            start = time.perf_counter()
+            session["cart"] = cart
+            session.save()
+            timings.append(time.perf_counter() - start)
+        return timings
+
+    def bench_store(self, writes, lines):
+        store = cart_store.get_store()
+        key = "a:benchmark"
+        timings = []
+        for cart in self.carts(writes, lines):
+            start = time.perf_counter()
+            store.save(key, cart)
+            timings.append(time.perf_counter() - start)
+        store.cache.delete(store._cache_key(key))
+        return timings
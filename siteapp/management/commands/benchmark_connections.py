@@ -0,0 +1,82 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+# name -> (CONN_MAX_AGE, pool)
+MODES = {
+    "per-request": (0, False),   # the old settings: connect and close every request
+    "persistent": (600, False),  # DATABASE_POOL=0
+    "pool": (0, True),           # the default
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the same tiny query as a series of requests (request_started / "
+        "request_finished, as Django's handlers send them) with a fresh "
+        "connection per request, persistent connections and the psycopg "
+        "pool, and report what each request pays for its connection."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        if connection.in_atomic_block:
+            raise CommandError("Run outside a transaction: connections are opened and closed per request.")
+        modes = [m for m in MODES if MODES[m][1] is False or connection.vendor == "postgresql"]
+
+        original = {**connection.settings_dict, "OPTIONS": {**connection.settings_dict["OPTIONS"]}}
+        results = {}
+        try:
+            for mode in modes:
+                results[mode] = self.run(connection, mode, options["requests"])
+        finally:
+            self.configure(connection, original["CONN_MAX_AGE"], original["OPTIONS"].get("pool"))
+
+        best = min(per_request for _, per_request in results.values())
+        self.stdout.write(f"{'mode':<12} {'connections':>11} {'ms/request':>11} {'overhead ms':>12}")
+        for mode, (opened, per_request) in results.items():
+            self.stdout.write(
+                f"{mode:<12} {opened:>11,} {per_request * 1000:>11.3f} {(per_request - best) * 1000:>12.3f}"
+            )
+        if len(modes) < len(MODES):
+            self.stdout.write(f"(no pool on {connection.vendor}; it needs PostgreSQL with psycopg 3)")
+
+        saved = results["per-request"][1] - best
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Reusing connections saves {saved * 1000:.3f} ms per request ({connection.vendor})."
+        ))
+
+    def configure(self, connection, max_age, pool):
+        connection.close()
+        if connection.vendor == "postgresql":
+            connection.close_pool()
+        connection.settings_dict["CONN_MAX_AGE"] = max_age
+        if pool:
+            connection.settings_dict["OPTIONS"]["pool"] = pool
+        else:
+            connection.settings_dict["OPTIONS"].pop("pool", None)
+
+    def run(self, connection, mode, requests):
+        max_age, pool = MODES[mode]
+        original_pool = connection.settings_dict["OPTIONS"].get("pool")
+        self.configure(connection, max_age, (original_pool or True) if pool else None)
+
+        # keep each raw connection alive so distinct ones can be counted by identity
+        opened = {}
+        start = time.perf_counter()
+        for _ in range(requests):
+            request_started.send(sender=self.__class__)
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            opened.setdefault(id(connection.connection), connection.connection)
+            request_finished.send(sender=self.__class__)
+        elapsed = time.perf_counter() - start
+        return len(opened), elapsed / requests
@@ -0,0 +1,73 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from siteapp import exports, synthetic
+from siteapp.models import Order
+
+
+class Command(BaseCommand):
+    help = (
+        "Export growing numbers of synthetic orders (CSV and NDJSON) and fail "
+        "if peak Python memory grows with the export. Data is created inside "
+        "a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000],
+                            help="order counts to export at (cumulative)")
+        parser.add_argument("--items-per-order", type=int, default=2)
+        parser.add_argument("--max-growth", type=float, default=2.0,
+                            help="allowed peak-memory ratio between the largest and smallest export")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            results = self.run(options)
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{'orders':>10} {'format':<7} {'rows/s':>10} {'MB out':>9} {'peak MB':>8}")
+        for size, fmt, seconds, chars, peak in results:
+            rows = size * options["items_per_order"]
+            self.stdout.write(
+                f"{size:>10,} {fmt:<7} {rows / seconds:>10,.0f} {chars / 1e6:>9.1f} {peak / 1e6:>8.2f}"
+            )
+        self.stdout.write("(throughput measured with tracemalloc running)")
+
+        problems = []
+        for fmt in exports.FORMATS:
+            peaks = [(size, peak) for size, f, _, _, peak in results if f == fmt]
+            (small, small_peak), (large, large_peak) = peaks[0], peaks[-1]
+            if large_peak > small_peak * options["max_growth"]:
+                problems.append(
+                    f"{fmt}: peak {large_peak / 1e6:.2f} MB for {large:,} orders, "
+                    f"{small_peak / 1e6:.2f} MB for {small:,}"
+                )
+        if problems:
+            raise CommandError("Export memory grows with its size:\n  " + "\n  ".join(problems))
+        self.stdout.write(self.style.SUCCESS("✅ Export memory stays flat."))
+
+    def run(self, options):
+        catalog = synthetic.build_catalog(products=500)
+        results = []
+        for size in sorted(options["sizes"]):
+            missing = size - Order.objects.count()
+            if missing > 0:
+                self.stdout.write(f"Growing the order table to {size:,} ({connection.vendor})…")
+                synthetic.build_orders(
+                    catalog.variant_ids, missing, items_per_order=options["items_per_order"], seed=size,
+                )
+            for fmt in exports.FORMATS:
+                results.append((size, fmt, *self.export(fmt)))
+        return results
+
+    def export(self, fmt):
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            chars = sum(len(chunk) for chunk in exports.export_orders(fmt))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return time.perf_counter() - start, chars, peak
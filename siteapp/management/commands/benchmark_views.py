@@ -0,0 +1,87 @@
+import platform
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from siteapp import benchmarks, caching, cart_store, synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive every siteapp URL against a synthetic catalog, check per-view "
+        "query budgets and compare p50/p95 latency with a JSON baseline. "
+        "Data is created inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=10_000)
+        parser.add_argument("--orders", type=int, default=500, help="order history of the benchmark customer")
+        parser.add_argument("--iterations", type=int, default=20, help="requests per view")
+        parser.add_argument("--baseline", default=str(benchmarks.DEFAULT_BASELINE))
+        parser.add_argument("--tolerance", type=float, default=benchmarks.DEFAULT_TOLERANCE,
+                            help="allowed p95 slowdown, e.g. 0.25 for +25%%")
+        parser.add_argument("--update-baseline", action="store_true",
+                            help="write this run as the new baseline instead of comparing")
+
+    def handle(self, *args, **options):
+        # the test client needs testserver in ALLOWED_HOSTS, like the test runner
+        setup_test_environment()
+        try:
+            with transaction.atomic():
+                results = self.run(options)
+                transaction.set_rollback(True)
+        finally:
+            teardown_test_environment()
+            # cached entries may refer to rolled-back rows
+            caching.bump_catalog_version()
+
+        self.report(results)
+
+        meta = {
+            "products": options["products"],
+            "orders": options["orders"],
+            "iterations": options["iterations"],
+            "database": connection.vendor,
+            "python": platform.python_version(),
+        }
+        if options["update_baseline"]:
+            benchmarks.write_baseline(results, meta, options["baseline"])
+            self.stdout.write(self.style.SUCCESS(f"✅ Baseline written to {options['baseline']}"))
+            return
+
+        baseline = benchmarks.load_baseline(options["baseline"])
+        if baseline is None:
+            # timings are machine-specific, so no baseline ships with the repo
+            self.stdout.write(self.style.WARNING(
+                f"No baseline at {options['baseline']}: checking query budgets only, not latency. "
+                "Run with --update-baseline first to record one on this machine."
+            ))
+        problems = benchmarks.compare(results, baseline, options["tolerance"])
+        if problems:
+            raise CommandError("Performance regressions:\n  " + "\n  ".join(problems))
+        if baseline is None:
+            self.stdout.write(self.style.SUCCESS("✅ All views within budget (no baseline)."))
+        else:
+            self.stdout.write(self.style.SUCCESS("✅ All views within budget and baseline."))
+
+    def run(self, options):
+        self.stdout.write(f"Building {options['products']} products, {options['orders']} orders…")
+        catalog = synthetic.build_catalog(products=options["products"])
+        customer = synthetic.build_customer(catalog.variant_ids, orders=options["orders"])
+        staff = get_user_model().objects.create_user(
+            f"{synthetic.PREFIX}-staff", password="bench-password", is_staff=True,
+        )
+        ctx = benchmarks.build_context(catalog, customer, staff)
+        try:
+            return benchmarks.run_benchmarks(ctx, iterations=options["iterations"])
+        finally:
+            store = cart_store.get_store()
+            store.cache.delete(store._cache_key(cart_store.user_key(customer.pk)))
+
+    def report(self, results):
+        self.stdout.write(f"{'view':<28} {'queries':>9} {'p50 ms':>9} {'p95 ms':>9}")
+        for key, m in sorted(results.items()):
+            line = f"{key:<28} {m.queries:>4}/{m.max_queries:<4} {m.p50 * 1000:9.2f} {m.p95 * 1000:9.2f}"
+            self.stdout.write(self.style.ERROR(line) if m.over_budget else line)
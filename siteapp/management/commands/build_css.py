@@ -0,0 +1,44 @@
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Compile the purged, minified Tailwind stylesheet from the templates "
+        "with the Tailwind CLI (pytailwindcss). Run it after changing templates, "
+        "before collectstatic."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cli", default=settings.TAILWIND_CLI, help="Tailwind CLI executable")
+        parser.add_argument("--check", action="store_true",
+                            help="fail if the committed build differs from a fresh one, without writing it")
+
+    def handle(self, *args, **options):
+        output = Path(settings.TAILWIND_OUTPUT)
+        with tempfile.TemporaryDirectory() as tmp:
+            target = Path(tmp) / output.name if options["check"] else output
+            self.build(options["cli"], target)
+            size = target.stat().st_size
+            if options["check"]:
+                if not output.exists() or output.read_bytes() != target.read_bytes():
+                    raise CommandError(f"{output} is stale; run `python manage.py build_css`.")
+                self.stdout.write(self.style.SUCCESS(f"✅ {output.name} is up to date ({size:,} bytes)."))
+                return
+        self.stdout.write(self.style.SUCCESS(f"✅ Built {output} ({size:,} bytes)."))
+
+    def build(self, cli, target):
+        # pytailwindcss downloads this CLI version on first use
+        env = {**os.environ, "TAILWINDCSS_VERSION": settings.TAILWIND_VERSION}
+        command = [cli, "--input", str(settings.TAILWIND_INPUT), "--output", str(target), "--minify"]
+        try:
+            subprocess.run(command, env=env, check=True, capture_output=True, text=True)
+        except FileNotFoundError:
+            raise CommandError(f"Tailwind CLI {cli!r} not found; pip install pytailwindcss or pass --cli.")
+        except subprocess.CalledProcessError as e:
+            raise CommandError(f"Tailwind build failed:\n{e.stderr}")
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from siteapp import cart_store
+
+
+class Command(BaseCommand):
+    help = "Delete carts that have not been touched for --days days (run from cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=30)
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        deleted = cart_store.expire_abandoned(options["days"], options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"✅ Deleted {deleted} abandoned cart(s)."))
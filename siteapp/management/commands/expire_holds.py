@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from siteapp import holds
+
+
+class Command(BaseCommand):
+    help = "Delete lapsed cart stock holds (run from cron, e.g. every few minutes)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        deleted = holds.expire(options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"✅ Deleted {deleted} expired stock hold(s)."))
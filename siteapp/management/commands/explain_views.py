@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from siteapp import benchmarks, caching, explain, synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN every query issued by the siteapp views and the order admin "
+        "against a generated dataset and report full table scans. Data is "
+        "created inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=10_000)
+        parser.add_argument("--orders", type=int, default=20_000, help="guest orders besides the customer's")
+        parser.add_argument("--min-rows", type=int, default=1000,
+                            help="ignore scans of tables smaller than this")
+        parser.add_argument("--fail", action="store_true", help="exit with an error if any scan is found")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        try:
+            with transaction.atomic():
+                flagged = self.run(options)
+                transaction.set_rollback(True)
+        finally:
+            teardown_test_environment()
+            caching.bump_catalog_version()
+
+        for plan in flagged:
+            tables = ", ".join(
+                f"{scan.table} (~{scan.rows} rows)" if scan.rows is not None else scan.table
+                for scan in plan.seq_scans
+            )
+            self.stdout.write(self.style.WARNING(f"{plan.view}: sequential scan of {tables}"))
+            self.stdout.write(f"    {plan.sql[:400]}")
+
+        if not flagged:
+            self.stdout.write(self.style.SUCCESS("✅ No sequential scans on large tables."))
+        elif options["fail"]:
+            raise CommandError(f"{len(flagged)} queries scan large tables.")
+        else:
+            self.stdout.write(f"{len(flagged)} queries scan large tables.")
+
+    def run(self, options):
+        self.stdout.write(f"Building {options['products']} products, {options['orders']} orders…")
+        catalog = synthetic.build_catalog(products=options["products"])
+        customer = synthetic.build_customer(catalog.variant_ids, orders=100)
+        synthetic.build_orders(catalog.variant_ids, options["orders"])
+        staff = get_user_model().objects.create_superuser(
+            f"{synthetic.PREFIX}-admin", email="", password="bench-password",
+        )
+        # fresh statistics, or the planner still thinks the tables are empty
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        ctx = benchmarks.build_context(catalog, customer, staff)
+        try:
+            return explain.audit(ctx, min_rows=options["min_rows"])
+        finally:
+            store = benchmarks.cart_store.get_store()
+            store.cache.delete(store._cache_key(benchmarks.cart_store.user_key(customer.pk)))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from siteapp import exports
+
+
+class Command(BaseCommand):
+    help = "Stream every product variant with its product and category as CSV or NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=sorted(exports.FORMATS), default="csv")
+        parser.add_argument("--output", default="-", help="file to write, - for stdout")
+
+    def handle(self, *args, **options):
+        chunks = exports.export_catalog(options["format"])
+        if options["output"] == "-":
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+        else:
+            exports.write_file(chunks, options["output"])
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from siteapp import exports
+
+
+class Command(BaseCommand):
+    help = "Stream orders with their items as CSV (one line per item) or NDJSON (one line per order)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=sorted(exports.FORMATS), default="csv")
+        parser.add_argument("--start", help="first day, YYYY-MM-DD (local time)")
+        parser.add_argument("--end", help="last day, YYYY-MM-DD (local time)")
+        parser.add_argument("--status")
+        parser.add_argument("--city")
+        parser.add_argument("--output", default="-", help="file to write, - for stdout")
+
+    def handle(self, *args, **options):
+        try:
+            start = exports.parse_date(options["start"])
+            end = exports.parse_date(options["end"])
+        except ValueError:
+            raise CommandError("Dates must look like 2025-01-31.")
+
+        chunks = exports.export_orders(
+            options["format"], start=start, end=end, status=options["status"], city=options["city"],
+        )
+        if options["output"] == "-":
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+        else:
+            exports.write_file(chunks, options["output"])
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from siteapp import synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with a synthetic catalog and customers with long "
+        "order histories (slugs and usernames start with 'bench-'), for "
+        "load tests and EXPLAIN checks against realistic table sizes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=10_000)
+        parser.add_argument("--variants-per-product", type=int, default=2)
+        parser.add_argument("--customers", type=int, default=10)
+        parser.add_argument("--orders-per-customer", type=int, default=200)
+        parser.add_argument("--guest-orders", type=int, default=0, help="orders without a user")
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        catalog = synthetic.build_catalog(
+            products=options["products"],
+            variants_per_product=options["variants_per_product"],
+            batch_size=options["batch_size"],
+            seed=options["seed"],
+        )
+        for i in range(options["customers"]):
+            synthetic.build_customer(
+                catalog.variant_ids,
+                orders=options["orders_per_customer"],
+                batch_size=options["batch_size"],
+                seed=options["seed"] + i,
+            )
+        if options["guest_orders"]:
+            synthetic.build_orders(
+                catalog.variant_ids, options["guest_orders"],
+                batch_size=options["batch_size"], seed=options["seed"],
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Created {len(catalog.product_ids)} products, {len(catalog.variant_ids)} variants, "
+            f"{options['customers']} customers with {options['orders_per_customer']} orders each, "
+            f"{options['guest_orders']} guest orders."
+        ))
@@ -1,94 +1,250 @@
 import csv
+import time
+from collections import Counter
+from decimal import Decimal, InvalidOperation
+from itertools import islice
 from pathlib import Path
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 from django.utils.text import slugify
 
+from siteapp import caching, search
 from siteapp.models import Category, Product, ProductVariant
+from siteapp.summaries import refresh_product_summaries
+
+
+# CSV path: siteapp/data/products.csv
+DEFAULT_CSV = Path(__file__).resolve().parent.parent.parent / "data" / "products.csv"
+
+PRODUCT_FIELDS = ("title", "description", "category_id", "base_price")
+VARIANT_FIELDS = ("price", "stock")
+
+# one variant per blouse option, columns prefixed in the CSV
+VARIANT_COLUMNS = {
+    "with_blouse": ("variant_with_blouse_price", "variant_with_blouse_stock"),
+    "without_blouse": ("variant_without_blouse_price", "variant_without_blouse_stock"),
+}
+
+
+def parse_row(row):
+    """Normalise one CSV row; raises ValueError / KeyError on bad data."""
+    try:
+        parsed = {
+            "title": row["title"].strip(),
+            "slug": row["slug"].strip(),
+            "category": row["category"].strip(),
+            "description": row["description"].strip(),
+            "base_price": Decimal(row["base_price"].strip()),
+            "variants": {
+                option: (Decimal(row[price_col].strip()), int(row[stock_col]))
+                for option, (price_col, stock_col) in VARIANT_COLUMNS.items()
+            },
+        }
+    except InvalidOperation as exc:
+        raise ValueError(f"bad price: {exc}") from exc
+    if not parsed["slug"] or not parsed["title"]:
+        raise ValueError("missing title/slug")
+    # checked here, so one bad row is skipped instead of failing its chunk's write
+    if parsed["base_price"] < 0:
+        raise ValueError("negative base price")
+    for option, (price, stock) in parsed["variants"].items():
+        if price < 0 or stock < 0:
+            raise ValueError(f"negative price or stock for {option}")
+    return parsed
 
 
 class Command(BaseCommand):
-    help = "Import products + with/without-blouse variants from CSV"
+    help = "Import products + with/without-blouse variants from CSV (bulk upsert, streamed in batches)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default=str(DEFAULT_CSV), help="CSV file to import")
+        parser.add_argument("--batch-size", type=int, default=1000, help="rows per transaction")
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="classify rows and report counts without writing anything",
+        )
 
     def handle(self, *args, **options):
-        # CSV path: siteapp/data/products.csv
-        base_dir = Path(__file__).resolve().parent.parent.parent  # -> siteapp/
-        csv_path = base_dir / "data" / "products.csv"
+        csv_path = Path(options["path"])
+        batch_size = options["batch_size"]
+        dry_run = options["dry_run"]
 
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1")
         if not csv_path.exists():
             self.stderr.write(self.style.ERROR(f"CSV file not found: {csv_path}"))
             return
 
-        self.stdout.write(f"Reading: {csv_path}")
+        self.stdout.write(f"Reading: {csv_path}" + (" (dry run)" if dry_run else ""))
+
+        self.stats = Counter()
+        # categories are few; keep slug -> id for the whole run
+        self.categories = dict(Category.objects.values_list("slug", "id"))
 
+        started = time.monotonic()
         with csv_path.open(newline="", encoding="utf-8") as f:
             reader = csv.DictReader(f)
+            while True:
+                chunk = list(islice(reader, batch_size))
+                if not chunk:
+                    break
+                with transaction.atomic():
+                    self.import_chunk(chunk, dry_run)
+                self.stdout.write(f" … {self.stats['rows']} rows")
+        elapsed = time.monotonic() - started
+
+        if not dry_run:
+            # bulk writes skip post_save, so bump the catalog cache explicitly
+            caching.bump_catalog_version()
+
+        self.report(elapsed, dry_run)
+
+    # ------------------------------------------------------------------
+
+    def import_chunk(self, chunk, dry_run):
+        rows = []
+        for line in chunk:
+            self.stats["rows"] += 1
+            try:
+                rows.append(parse_row(line))
+            except (KeyError, ValueError, TypeError) as exc:
+                self.stats["skipped"] += 1
+                self.stderr.write(self.style.WARNING(f"Skipping row {self.stats['rows']}: {exc}"))
+
+        # a slug repeated within the chunk: last row wins
+        rows = list({row["slug"]: row for row in rows}.values())
+        if not rows:
+            return
+
+        self.ensure_categories(rows, dry_run)
+
+        existing = {
+            p["slug"]: p
+            for p in Product.objects.filter(slug__in=[r["slug"] for r in rows]).values("id", "slug", *PRODUCT_FIELDS)
+        }
+
+        to_write = []
+        for row in rows:
+            values = {
+                "title": row["title"],
+                "description": row["description"],
+                "category_id": self.categories.get(slugify(row["category"])),
+                "base_price": row["base_price"],
+            }
+            current = existing.get(row["slug"])
+            if current is None:
+                self.stats["products_inserted"] += 1
+            elif all(current[f] == values[f] for f in PRODUCT_FIELDS):
+                self.stats["products_unchanged"] += 1
+                continue
+            else:
+                self.stats["products_updated"] += 1
+            to_write.append(Product(slug=row["slug"], active=True, **values))
+
+        if to_write and not dry_run:
+            Product.objects.bulk_create(
+                to_write,
+                update_conflicts=True,
+                unique_fields=["slug"],
+                update_fields=["title", "description", "category", "base_price"],
+            )
+            # upserts don't hand back ids on every backend; one lookup per chunk
+            ids = dict(Product.objects.filter(slug__in=[r["slug"] for r in rows]).values_list("slug", "id"))
+        else:
+            ids = {slug: p["id"] for slug, p in existing.items()}
+
+        changed = self.upsert_variants(rows, ids, dry_run)
+        if not dry_run:
+            written = {ids[p.slug] for p in to_write if p.slug in ids}
+            # a product's own fields (e.g. its category) feed the summary and facets too
+            refresh_product_summaries(changed | written)
+            # bulk writes skip post_save; only written products need new search data
+            search.reindex_products(written)
+
+    def ensure_categories(self, rows, dry_run):
+        missing = {}
+        for row in rows:
+            slug = slugify(row["category"])
+            if slug not in self.categories:
+                missing.setdefault(slug, row["category"])
+        if not missing:
+            return
+
+        self.stats["categories_inserted"] += len(missing)
+        if dry_run:
+            # placeholder ids so later rows in the run count as existing
+            self.categories.update({slug: None for slug in missing})
+            return
 
-            for row in reader:
-                title = row["title"].strip()
-                slug = row["slug"].strip()
-                category_name = row["category"].strip()
-                description = row["description"].strip()
-                base_price = row["base_price"].strip()
-
-                with_blouse_price = row["variant_with_blouse_price"].strip()
-                with_blouse_stock = int(row["variant_with_blouse_stock"])
-                without_blouse_price = row["variant_without_blouse_price"].strip()
-                without_blouse_stock = int(row["variant_without_blouse_stock"])
-
-                # Category: your Category model has name + slug
-                category_slug = slugify(category_name)
-                category, _ = Category.objects.get_or_create(
-                    slug=category_slug,
-                    defaults={"name": category_name},
-                )
-
-                # Product
-                product, created_prod = Product.objects.get_or_create(
-                    slug=slug,
-                    defaults={
-                        "title": title,
-                        "description": description,
-                        "category": category,
-                        "base_price": base_price,
-                        "active": True,
-                    },
-                )
-
-                if created_prod:
-                    self.stdout.write(self.style.SUCCESS(f"Created product: {product.title}"))
+        Category.objects.bulk_create(
+            [Category(slug=slug, name=name) for slug, name in missing.items()],
+            ignore_conflicts=True,
+        )
+        self.categories.update(Category.objects.filter(slug__in=missing).values_list("slug", "id"))
+
+    def upsert_variants(self, rows, ids, dry_run):
+        # the CSV has no colour column: a row's variant is the one for its
+        # blouse option, whatever its colour (the colourless one if several)
+        existing = {}
+        for v in ProductVariant.objects.filter(
+            product_id__in=[pk for pk in ids.values()],
+            blouse_option__in=list(VARIANT_COLUMNS),
+        ).order_by("color", "pk").values("id", "product_id", "blouse_option", "color", *VARIANT_FIELDS):
+            existing.setdefault((v["product_id"], v["blouse_option"]), []).append(v)
+
+        to_create, to_update = [], []
+        for row in rows:
+            product_id = ids.get(row["slug"])
+            for option, (price, stock) in row["variants"].items():
+                matches = existing.get((product_id, option), [])
+                if len(matches) > 1 and matches[0]["color"]:
+                    self.stats["variants_ambiguous"] += 1
+                    self.stderr.write(self.style.WARNING(
+                        f"Skipping {row['slug']} / {option}: several colours, the CSV names none"
+                    ))
+                    continue
+                current = matches[0] if matches else None
+                if current is None:
+                    self.stats["variants_inserted"] += 1
+                    if product_id is not None:
+                        to_create.append(ProductVariant(
+                            product_id=product_id, blouse_option=option, color="", sku="", price=price, stock=stock,
+                        ))
+                elif current["price"] == price and current["stock"] == stock:
+                    self.stats["variants_unchanged"] += 1
                 else:
-                    self.stdout.write(self.style.WARNING(f"Product already exists, updating variants: {product.title}"))
-
-                # Variant 1: WITH BLOUSE
-                ProductVariant.objects.update_or_create(
-                    product=product,
-                    blouse_option="with_blouse",
-                    defaults={
-                        "price": with_blouse_price,
-                        "stock": with_blouse_stock,
-                        "sku": "",
-                        "color": "",
-                    },
-                )
-
-                # Variant 2: WITHOUT BLOUSE
-                ProductVariant.objects.update_or_create(
-                    product=product,
-                    blouse_option="without_blouse",
-                    defaults={
-                        "price": without_blouse_price,
-                        "stock": without_blouse_stock,
-                        "sku": "",
-                        "color": "",
-                    },
-                )
-
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f" → Variants synced for: {product.title} "
-                        f"(with blouse: {with_blouse_stock}, without blouse: {without_blouse_stock})"
-                    )
-                )
-
-        self.stdout.write(self.style.SUCCESS("✅ Import complete."))
+                    self.stats["variants_updated"] += 1
+                    to_update.append(ProductVariant(
+                        pk=current["id"], product_id=product_id, price=price, stock=stock,
+                    ))
+
+        if dry_run:
+            return set()
+        if to_create:
+            ProductVariant.objects.bulk_create(to_create)
+        if to_update:
+            ProductVariant.objects.bulk_update(to_update, list(VARIANT_FIELDS))
+        return {v.product_id for v in to_create + to_update}
+
+    def report(self, elapsed, dry_run):
+        s = self.stats
+        rate = s["rows"] / elapsed if elapsed > 0 else float(s["rows"])
+        self.stdout.write(
+            f"Rows: {s['rows']} ({s['skipped']} skipped) in {elapsed:.2f}s – {rate:,.0f} rows/sec"
+        )
+        self.stdout.write(
+            f"Products: {s['products_inserted']} inserted, {s['products_updated']} updated, "
+            f"{s['products_unchanged']} unchanged"
+        )
+        self.stdout.write(
+            f"Variants: {s['variants_inserted']} inserted, {s['variants_updated']} updated, "
+            f"{s['variants_unchanged']} unchanged, {s['variants_ambiguous']} ambiguous"
+        )
+        self.stdout.write(f"Categories: {s['categories_inserted']} inserted")
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING("Dry run – nothing was written."))
+        else:
+            self.stdout.write(self.style.SUCCESS("✅ Import complete."))
@@ -0,0 +1,112 @@
+import asyncio
+import json
+import os
+import shlex
+import shutil
+import subprocess
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from siteapp import loadtest
+from siteapp.models import Category, Product
+
+
+SERVERS = {
+    "asgi": "uvicorn Saree_site.asgi:application --host 127.0.0.1 --port {port} "
+            "--workers {workers} --no-access-log --log-level warning",
+    "wsgi": "gunicorn Saree_site.wsgi:application --bind 127.0.0.1:{port} "
+            "--workers {workers} --threads {threads} --log-level warning",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the catalog and order-tracking pages. With --url, hit a "
+        "running server; otherwise start an ASGI (uvicorn) and a WSGI "
+        "(gunicorn) server in turn and compare throughput and tail latency. "
+        "Fill the database first, e.g. with generate_synthetic_data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", help="base URL of an already running server")
+        parser.add_argument("--servers", nargs="+", choices=sorted(SERVERS), default=["asgi", "wsgi"])
+        parser.add_argument("--asgi-cmd", default=SERVERS["asgi"])
+        parser.add_argument("--wsgi-cmd", default=SERVERS["wsgi"])
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--workers", type=int, default=2, help="server processes")
+        parser.add_argument("--threads", type=int, default=8, help="threads per WSGI worker")
+        parser.add_argument("--concurrency", type=int, default=200, help="open client connections")
+        parser.add_argument("--duration", type=float, default=20.0, help="seconds per run")
+        parser.add_argument("--warmup", type=float, default=3.0, help="seconds before measuring")
+        parser.add_argument("--paths", nargs="+", help="paths to request (default: catalog + order track)")
+        parser.add_argument("--json", action="store_true")
+
+    def handle(self, *args, **options):
+        paths = options["paths"] or self.default_paths()
+        self.stdout.write(f"Paths: {', '.join(paths)}")
+
+        if options["url"]:
+            results = [self.run(options["url"], paths, options, label=options["url"])]
+        else:
+            results = [self.run_server(name, paths, options) for name in options["servers"]]
+
+        if options["json"]:
+            self.stdout.write(json.dumps([r.summary() for r in results], indent=2))
+            return
+
+        self.stdout.write(
+            f"{'server':<24} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}"
+        )
+        for r in results:
+            row = r.summary()
+            self.stdout.write(
+                f"{row['label']:<24} {row['rps']:>8} {row['p50_ms']:>8} {row['p95_ms']:>8} "
+                f"{row['p99_ms']:>8} {row['errors']:>7}"
+            )
+
+    def default_paths(self):
+        paths = [reverse("home"), reverse("order_track")]
+        category = Category.objects.order_by("pk").first()
+        if category:
+            paths.append(category.get_absolute_url())
+        paths += [
+            p.get_absolute_url()
+            for p in Product.objects.filter(active=True).order_by("-created_at", "-id")[:20]
+        ]
+        return paths
+
+    def run(self, url, paths, options, label):
+        self.stdout.write(
+            f"{label}: {options['concurrency']} connections for {options['duration']:.0f}s…"
+        )
+        return loadtest.run(
+            url, paths,
+            concurrency=options["concurrency"],
+            duration=options["duration"],
+            warmup=options["warmup"],
+            label=label,
+        )
+
+    def run_server(self, name, paths, options):
+        command = shlex.split(options[f"{name}_cmd"].format(
+            port=options["port"], workers=options["workers"], threads=options["threads"],
+        ))
+        if shutil.which(command[0]) is None:
+            raise CommandError(f"{command[0]} is not installed (pip install {command[0]}).")
+
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get(
+            "DJANGO_SETTINGS_MODULE", "Saree_site.settings",
+        ))
+        server = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env)
+        try:
+            if not asyncio.run(loadtest.wait_for_port("127.0.0.1", options["port"])):
+                raise CommandError(f"{name} server did not start: {' '.join(command)}")
+            return self.run(f"http://127.0.0.1:{options['port']}", paths, options, label=f"{name} ({command[0]})")
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
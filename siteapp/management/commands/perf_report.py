@@ -0,0 +1,44 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from siteapp import instrumentation
+
+
+class Command(BaseCommand):
+    help = (
+        "Show per-view request timings collected by PerformanceMiddleware "
+        "(sampled; merged across workers through the cache)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--view", help="only this URL name")
+        parser.add_argument("--json", action="store_true", help="print the raw report")
+        parser.add_argument("--reset", action="store_true", help="clear all collected data")
+
+    def handle(self, *args, **options):
+        if options["reset"]:
+            instrumentation.reset()
+            self.stdout.write(self.style.SUCCESS("✅ Performance data cleared."))
+            return
+
+        report = instrumentation.report(options["view"])
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        if not report:
+            self.stdout.write("No samples yet (is PERF_SAMPLE_RATE > 0?).")
+            return
+
+        self.stdout.write(
+            f"{'view':<28} {'n':>6} {'p50 ms':>8} {'p95 ms':>8} {'queries':>8} "
+            f"{'sql ms':>8} {'tmpl ms':>8} {'KiB':>7}"
+        )
+        for name, row in report.items():
+            self.stdout.write(
+                f"{name:<28} {row['samples']:>6} {row['wall_ms']['p50']:>8} {row['wall_ms']['p95']:>8} "
+                f"{row['sql_queries']['mean']:>8} {row['sql_ms']['mean']:>8} "
+                f"{row['template_ms']['mean']:>8} {row['response_bytes']['mean'] / 1024:>7.1f}"
+            )
+            for sig, requests in row["n_plus_one"].items():
+                self.stdout.write(self.style.WARNING(f"    N+1 suspect ({requests} requests): {sig}"))
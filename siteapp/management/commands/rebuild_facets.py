@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from siteapp import caching, facets
+
+
+class Command(BaseCommand):
+    help = "Recompute the facet index (blouse / color / price / category) behind the catalog filters"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=facets.BATCH_SIZE, help="products per read")
+
+    def handle(self, *args, **options):
+        rows = facets.rebuild(batch_size=options["batch_size"])
+        caching.bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f"✅ Facet index rebuilt ({rows} rows)."))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from siteapp import search
+
+
+class Command(BaseCommand):
+    help = "Recompute the product search vectors (PostgreSQL) or reset the in-process index"
+
+    def handle(self, *args, **options):
+        search.rebuild_index()
+        backend = "tsvector/GIN" if search.uses_postgres() else "in-process inverted index"
+        self.stdout.write(self.style.SUCCESS(f"✅ Search index rebuilt ({backend})."))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from siteapp import reports
+
+
+class Command(BaseCommand):
+    help = "Fold new orders and cancellations into the daily sales rollups (run from cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=reports.BATCH_SIZE)
+        parser.add_argument("--lag", type=int, default=None,
+                            help="seconds to leave the newest rows alone (default REPORTS_LAG_SECONDS)")
+        parser.add_argument("--rebuild", action="store_true", help="drop the rollups and recompute them")
+
+    def handle(self, *args, **options):
+        result = reports.refresh(options["batch_size"], options["lag"], options["rebuild"])
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Rolled up {result.orders} order(s) and {result.cancellations} cancellation(s)."
+        ))
@@ -0,0 +1,40 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from siteapp import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background jobs (order confirmations, status updates, "
+        "stock alerts). Stops cleanly on SIGINT / SIGTERM after the current jobs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=1, help="worker threads")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="seconds to sleep when idle")
+        parser.add_argument("--once", action="store_true", help="exit when no job is due")
+        parser.add_argument("--purge-days", type=int, default=None,
+                            help="first delete finished jobs older than this many days")
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stop.set())
+
+        if options["purge_days"] is not None:
+            purged = jobs.purge_finished(options["purge_days"])
+            self.stdout.write(f"Purged {purged} finished job(s).")
+        requeued = jobs.requeue_stale()
+        if requeued:
+            self.stdout.write(self.style.WARNING(f"Re-queued {requeued} job(s) from dead workers."))
+
+        processed = jobs.work(
+            concurrency=options["concurrency"],
+            once=options["once"],
+            poll_interval=options["poll_interval"],
+            stop=stop,
+        )
+        self.stdout.write(self.style.SUCCESS(f"✅ Processed {processed} job(s)."))
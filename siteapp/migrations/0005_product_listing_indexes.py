@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('siteapp', '0004_order_payment_method_order_payment_status_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('active', True)), fields=['-created_at', '-id'], name='product_active_listing_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('active', True)), fields=['category', '-created_at', '-id'], name='product_category_listing_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:55
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# GIN indexes only exist on PostgreSQL; other backends use the in-process
+# inverted index from siteapp/search.py, so the index and the backfill are
+# applied conditionally instead of being declared on the model.
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS product_search_vector_gin "
+        "ON siteapp_product USING gin (search_vector)"
+    )
+    schema_editor.execute(
+        """
+        UPDATE siteapp_product AS p SET search_vector =
+            setweight(to_tsvector('english', coalesce(p.title, '')), 'A')
+            || setweight(to_tsvector('english', coalesce(p.description, '')), 'B')
+            || setweight(to_tsvector('english', coalesce(
+                (SELECT c.name FROM siteapp_category c WHERE c.id = p.category_id), ''
+            )), 'C')
+        """
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS product_search_vector_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('siteapp', '0005_product_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:59
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_variants(apps, schema_editor):
+    # Before the constraint nothing stopped two rows for the same option.
+    # The oldest row of each (product, color, blouse_option) stays and keeps
+    # its price; it takes over the others' stock and order lines.
+    ProductVariant = apps.get_model("siteapp", "ProductVariant")
+    OrderItem = apps.get_model("siteapp", "OrderItem")
+
+    groups = (
+        ProductVariant.objects.values("product", "color", "blouse_option")
+        .annotate(rows=Count("id"), keep=Min("id"), stock=Sum("stock"))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for group in groups:
+        duplicates = ProductVariant.objects.filter(
+            product=group["product"], color=group["color"], blouse_option=group["blouse_option"],
+        ).exclude(pk=group["keep"])
+        OrderItem.objects.filter(variant__in=duplicates).update(variant_id=group["keep"])
+        ProductVariant.objects.filter(pk=group["keep"]).update(stock=group["stock"])
+        duplicates.delete()
+
+    if schema_editor.connection.vendor == "postgresql":
+        # fire the deferred FK checks now; ALTER TABLE refuses to run with
+        # trigger events pending on the table
+        schema_editor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('siteapp', '0007_order_user_created_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_variants, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='productvariant',
+            constraint=models.UniqueConstraint(fields=('product', 'color', 'blouse_option'), name='unique_product_variant_option'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:02
+
+from django.db import migrations, models
+from django.db.models import Exists, IntegerField, Max, Min, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_summaries(apps, schema_editor):
+    # same single UPDATE as siteapp.summaries, against the historical models
+    Product = apps.get_model("siteapp", "Product")
+    ProductVariant = apps.get_model("siteapp", "ProductVariant")
+
+    def aggregate(function, field):
+        return Subquery(
+            ProductVariant.objects.filter(product=OuterRef("pk"))
+            .order_by()
+            .values("product")
+            .annotate(value=function(field))
+            .values("value")
+        )
+
+    Product.objects.update(
+        min_price=aggregate(Min, "price"),
+        max_price=aggregate(Max, "price"),
+        total_stock=Coalesce(aggregate(Sum, "stock"), Value(0), output_field=IntegerField()),
+        in_stock=Exists(ProductVariant.objects.filter(product=OuterRef("pk"), stock__gt=0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('siteapp', '0008_productvariant_unique_option'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='in_stock',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='max_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='min_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='total_stock',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('active', True), ('in_stock', True)), fields=['-created_at', '-id'], name='product_instock_listing_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('active', True)), fields=['min_price', 'id'], name='product_price_listing_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# SignUpForm.clean_email looks users up by email. auth.User belongs to
+# another app, so its index is created here rather than on a model Meta.
+
+def create_user_email_index(apps, schema_editor):
+    table = apps.get_model(settings.AUTH_USER_MODEL)._meta.db_table
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS siteapp_user_email_idx "
+        f"ON {schema_editor.quote_name(table)} (email)"
+    )
+
+
+def drop_user_email_index(apps, schema_editor):
+    schema_editor.execute("DROP INDEX IF EXISTS siteapp_user_email_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('siteapp', '0010_cart'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'confirmed', 'packed', 'shipped'])), fields=['status', '-created_at'], name='order_open_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['payment_status', '-created_at'], name='order_payment_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at'], name='order_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['city'], name='order_city_idx'),
+        ),
+        migrations.RunPython(create_user_email_index, drop_user_email_index),
+    ]
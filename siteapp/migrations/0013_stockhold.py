@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('siteapp', '0012_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cart_key', models.CharField(max_length=64)),
+                ('quantity', models.PositiveIntegerField()),
+                ('expires_at', models.DateTimeField()),
+                ('variant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='siteapp.productvariant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['variant', 'expires_at'], name='hold_variant_expiry_idx'), models.Index(fields=['expires_at'], name='hold_expiry_idx')],
+                'constraints': [models.UniqueConstraint(fields=('cart_key', 'variant'), name='unique_cart_hold')],
+            },
+        ),
+    ]
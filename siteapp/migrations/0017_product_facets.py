@@ -0,0 +1,67 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# frozen copy of siteapp.facets.PRICE_BANDS: (value, from, below)
+PRICE_BANDS = [
+    ("under-2000", None, 2000),
+    ("2000-5000", 2000, 5000),
+    ("5000-10000", 5000, 10000),
+    ("10000-plus", 10000, None),
+]
+
+
+def backfill_facets(apps, schema_editor):
+    # same rows as siteapp.facets, against the historical models
+    Product = apps.get_model("siteapp", "Product")
+    ProductFacet = apps.get_model("siteapp", "ProductFacet")
+
+    def band(price):
+        for value, low, high in PRICE_BANDS:
+            if (low is None or price >= low) and (high is None or price < high):
+                return value
+
+    values, in_stock = set(), {}
+    rows = Product.objects.filter(active=True).values_list(
+        "pk", "category_id", "in_stock", "variants__color", "variants__blouse_option", "variants__price",
+    )
+    for pk, category_id, stocked, color, blouse_option, price in rows.iterator(chunk_size=2000):
+        in_stock[pk] = stocked
+        values.add((pk, "category", "" if category_id is None else str(category_id)))
+        if blouse_option:
+            values.add((pk, "blouse", blouse_option))
+        if color and color.strip():
+            values.add((pk, "color", color.strip().lower()[:64]))
+        if price is not None:
+            values.add((pk, "price", band(price)))
+    ProductFacet.objects.bulk_create(
+        [ProductFacet(product_id=pk, facet=f, value=v, in_stock=in_stock[pk]) for pk, f, v in sorted(values)],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('siteapp', '0016_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(choices=[('category', 'Category'), ('blouse', 'Blouse'), ('color', 'Color'), ('price', 'Price')], max_length=16)),
+                ('value', models.CharField(max_length=64)),
+                ('in_stock', models.BooleanField(default=False)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='facets', to='siteapp.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['facet', 'value', 'product'], name='facet_value_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'facet', 'value'), name='unique_product_facet')],
+            },
+        ),
+        migrations.RunPython(backfill_facets, migrations.RunPython.noop),
+    ]
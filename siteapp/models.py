@@ -1,5 +1,7 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.urls import reverse
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 
 
@@ -42,6 +44,43 @@ class Product(models.Model):
     active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # variant summary maintained by summaries.py, so listings can show
+    # "from ₹X" / stock state and filter or sort without joining variants
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, editable=False)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, editable=False)
+    total_stock = models.PositiveIntegerField(default=0, editable=False)
+    in_stock = models.BooleanField(default=False, editable=False)
+
+    # weighted title/description/category tsvector maintained by search.py;
+    # its GIN index is created by migration 0006 on PostgreSQL only
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # keyset pagination of the storefront listings (see pagination.py)
+            models.Index(
+                fields=["-created_at", "-id"],
+                name="product_active_listing_idx",
+                condition=models.Q(active=True),
+            ),
+            models.Index(
+                fields=["category", "-created_at", "-id"],
+                name="product_category_listing_idx",
+                condition=models.Q(active=True),
+            ),
+            # "in stock only" and price-sorted listings
+            models.Index(
+                fields=["-created_at", "-id"],
+                name="product_instock_listing_idx",
+                condition=models.Q(active=True, in_stock=True),
+            ),
+            models.Index(
+                fields=["min_price", "id"],
+                name="product_price_listing_idx",
+                condition=models.Q(active=True),
+            ),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -94,6 +133,15 @@ class ProductVariant(models.Model):
 
     stock = models.PositiveIntegerField(default=0)
 
+    class Meta:
+        constraints = [
+            # one row per colour / blouse combination
+            models.UniqueConstraint(
+                fields=["product", "color", "blouse_option"],
+                name="unique_product_variant_option",
+            ),
+        ]
+
     def __str__(self):
         bits = [self.product.title]
         if self.color:
@@ -103,8 +151,49 @@ class ProductVariant(models.Model):
             bits.append(blouse_label)
         return " – ".join(bits)
 
+
+class ProductFacet(models.Model):
+    """
+    Facet index row (facets.py): active ``product`` has a variant with this
+    ``value`` of ``facet``. ``in_stock`` copies the product's stock state so
+    counts never join ``Product``.
+    """
+
+    CATEGORY = "category"
+    BLOUSE = "blouse"
+    COLOR = "color"
+    PRICE = "price"
+    FACET_CHOICES = [
+        (CATEGORY, "Category"),
+        (BLOUSE, "Blouse"),
+        (COLOR, "Color"),
+        (PRICE, "Price"),
+    ]
+
+    product = models.ForeignKey(Product, related_name="facets", on_delete=models.CASCADE)
+    facet = models.CharField(max_length=16, choices=FACET_CHOICES)
+    value = models.CharField(max_length=64)
+    in_stock = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            # also the "product has one of these values" probe of the filters
+            models.UniqueConstraint(fields=["product", "facet", "value"], name="unique_product_facet"),
+        ]
+        indexes = [
+            # counts per value and the products of a selected value
+            models.Index(fields=["facet", "value", "product"], name="facet_value_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} {self.facet}={self.value}"
+
+
 User = get_user_model()
 
+# orders still being worked on; the admin's day-to-day view
+OPEN_ORDER_STATUSES = ["pending", "confirmed", "packed", "shipped"]
+
 
 class Order(models.Model):
     STATUS_CHOICES = [
@@ -157,6 +246,26 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # my_orders: a customer's history, newest first, keyset-paginated
+            models.Index(fields=["user", "-created_at", "-id"], name="order_user_created_idx"),
+            # OrderAdmin filters. order_track's (id, phone) lookup is already
+            # a primary-key probe and needs nothing extra.
+            models.Index(
+                fields=["status", "-created_at"],
+                name="order_open_status_idx",
+                condition=models.Q(status__in=OPEN_ORDER_STATUSES),
+            ),
+            models.Index(fields=["payment_status", "-created_at"], name="order_payment_status_idx"),
+            models.Index(fields=["created_at"], name="order_created_idx"),
+            models.Index(fields=["city"], name="order_city_idx"),
+            # admin search: phone prefix (LIKE 'x%' needs the pattern opclass
+            # on PostgreSQL) and exact pincode
+            models.Index(fields=["phone"], name="order_phone_idx", opclasses=["varchar_pattern_ops"]),
+            models.Index(fields=["pincode"], name="order_pincode_idx"),
+        ]
+
     def __str__(self):
         return f"Order #{self.id} - {self.customer_name}"
 
@@ -179,4 +288,161 @@ class OrderItem(models.Model):
     )
 
     def __str__(self):
-        return f"{self.variant} x {self.quantity}"
\ No newline at end of file
+        return f"{self.variant} x {self.quantity}"
+
+
+class OrderStatusChange(models.Model):
+    """Audit log of order status changes, written by order_status.py."""
+
+    order = models.ForeignKey(Order, related_name="status_changes", on_delete=models.CASCADE)
+    from_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    to_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            models.Index(fields=["order", "-created_at"], name="status_change_order_idx"),
+        ]
+
+    def __str__(self):
+        return f"#{self.order_id}: {self.from_status} → {self.to_status}"
+
+
+class DailyRollup(models.Model):
+    """
+    Sales of one day for one value of a reporting dimension (reports.py).
+    Maintained incrementally; reports and exports read only these rows.
+    """
+
+    VARIANT = "variant"
+    PRODUCT = "product"
+    CATEGORY = "category"
+    CITY = "city"
+    PAYMENT_STATUS = "payment_status"
+    DIMENSION_CHOICES = [
+        (VARIANT, "Variant"),
+        (PRODUCT, "Product"),
+        (CATEGORY, "Category"),
+        (CITY, "City"),
+        (PAYMENT_STATUS, "Payment status"),
+    ]
+
+    date = models.DateField()
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    key = models.CharField(max_length=100)      # id or value within the dimension
+    label = models.CharField(max_length=255)    # display name when last rolled up
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    orders = models.IntegerField(default=0)     # distinct orders
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["dimension", "date", "key"], name="unique_daily_rollup"),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.dimension}={self.label}"
+
+
+class RollupWatermark(models.Model):
+    """Highest Order / OrderStatusChange id already folded into the rollups."""
+
+    name = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_id}"
+
+
+class Cart(models.Model):
+    """
+    Durable copy of a shopping cart. The live copy is kept in the cache and
+    written here at most every CART_PERSIST_INTERVAL seconds (cart_store.py).
+    """
+
+    key = models.CharField(max_length=64, unique=True)  # "u:<user id>" / "a:<token>"
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    data = models.TextField(blank=True)  # "variant_id:qty,..."
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f"Cart {self.key}"
+
+
+class StockHold(models.Model):
+    """
+    Stock set aside for a cart until ``expires_at`` (holds.py).
+    Available stock is ``stock`` minus the unexpired holds of other carts.
+    """
+
+    variant = models.ForeignKey(ProductVariant, related_name="holds", on_delete=models.CASCADE)
+    cart_key = models.CharField(max_length=64)  # cart_store key: "u:<id>" / "a:<token>"
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["cart_key", "variant"], name="unique_cart_hold"),
+        ]
+        indexes = [
+            # "held by others" aggregate per variant
+            models.Index(fields=["variant", "expires_at"], name="hold_variant_expiry_idx"),
+            # the sweeper
+            models.Index(fields=["expires_at"], name="hold_expiry_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.variant_id} for {self.cart_key}"
+
+
+class Job(models.Model):
+    """
+    A queued side effect (confirmation SMS / email, stock alerts ...), run by
+    ``manage.py run_jobs``. See jobs.py.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # the workers' "next due job" probe
+            models.Index(
+                fields=["run_after", "id"],
+                name="job_queued_idx",
+                condition=models.Q(status="queued"),
+            ),
+            # finding jobs whose worker died mid-run
+            models.Index(
+                fields=["locked_at"],
+                name="job_running_idx",
+                condition=models.Q(status="running"),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
@@ -0,0 +1,94 @@
+"""
+Customer and staff notifications, run as background jobs (see jobs.py).
+
+Tasks load what they need from the database when they run, so a job queued
+for an order that has since changed sends the current state (or nothing).
+A retried job may repeat a message that already went out before the
+failure; every message here is safe to receive twice.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import send_mail
+from django.db.models import Prefetch
+from django.template.loader import render_to_string
+
+from .jobs import task
+from .models import Order, OrderItem, ProductVariant
+from .sms import send_sms
+
+
+# statuses the customer hears about; "packed" is internal
+NOTIFY_STATUSES = {"confirmed", "shipped", "delivered", "cancelled"}
+
+
+def low_stock_threshold():
+    return getattr(settings, "LOW_STOCK_THRESHOLD", 3)
+
+
+def _load_order(order_id):
+    return (
+        Order.objects.select_related("user")
+        .prefetch_related(Prefetch("items", queryset=OrderItem.objects.select_related("variant__product")))
+        .filter(pk=order_id)
+        .first()
+    )
+
+
+def _customer_email(order):
+    return order.user.email if order.user_id and order.user.email else None
+
+
+@task("order_confirmation")
+def order_confirmation(order_id):
+    order = _load_order(order_id)
+    if order is None:
+        return
+    send_sms(order.phone, f"Thank you for your order #{order.id} of ₹{order.total}. We'll text you when it ships.")
+    email = _customer_email(order)
+    if email:
+        send_mail(
+            f"Order #{order.id} received",
+            render_to_string("siteapp/email/order_confirmation.txt", {"order": order}),
+            None,
+            [email],
+        )
+
+
+@task("order_status_changed")
+def order_status_changed(order_id, status):
+    order = _load_order(order_id)
+    # skip if the order moved on again before we got to it
+    if order is None or order.status != status or status not in NOTIFY_STATUSES:
+        return
+    send_sms(order.phone, f"Your order #{order.id} is now {order.get_status_display().lower()}.")
+    email = _customer_email(order)
+    if email:
+        send_mail(
+            f"Order #{order.id}: {order.get_status_display()}",
+            render_to_string("siteapp/email/order_status.txt", {"order": order}),
+            None,
+            [email],
+        )
+
+
+def stock_alert_recipients():
+    configured = getattr(settings, "STOCK_ALERT_RECIPIENTS", [])
+    if configured:
+        return list(configured)
+    staff = get_user_model().objects.filter(is_staff=True, is_active=True).exclude(email="")
+    return list(staff.values_list("email", flat=True))
+
+
+@task("low_stock_alert")
+def low_stock_alert(variant_ids):
+    variants = list(
+        ProductVariant.objects.select_related("product")
+        .filter(pk__in=variant_ids, stock__lte=low_stock_threshold())
+        .order_by("product__title", "pk")
+    )
+    recipients = stock_alert_recipients()
+    if not variants or not recipients:
+        return
+    lines = "\n".join(f"- {v} (#{v.pk}): {v.stock} left" for v in variants)
+    send_mail(f"Low stock: {len(variants)} variant(s)", f"Running low:\n\n{lines}\n", None, recipients)
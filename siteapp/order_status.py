@@ -0,0 +1,132 @@
+"""
+Order status transitions.
+
+The admin's "Mark as ..." actions used to ``update(status=...)`` whatever
+was selected: delivered orders could go back to pending, cancelled orders
+kept their stock out of the shop and nothing recorded who did it.
+``transition`` applies one target status to any number of orders:
+
+* only orders whose current status may move to the target
+  (``TRANSITIONS``) change; the rest are reported as skipped;
+* the selected rows are locked, then changed with one UPDATE;
+* cancelling returns the items to stock with one ``F()`` UPDATE per batch of
+  variants and refreshes the product summaries, like checkout in reverse;
+* every change is written to ``OrderStatusChange`` with one bulk INSERT;
+* customers are notified by background jobs once the change commits.
+
+The number of statements does not depend on how many orders are selected.
+"""
+
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.utils import timezone
+
+from . import caching, jobs
+from .models import Order, OrderItem, OrderStatusChange, ProductVariant
+from .summaries import refresh_product_summaries
+
+
+TRANSITIONS = {
+    "pending": {"confirmed", "cancelled"},
+    "confirmed": {"packed", "cancelled"},
+    "packed": {"shipped", "cancelled"},
+    "shipped": {"delivered"},
+    "delivered": set(),
+    "cancelled": set(),
+}
+
+# statuses whose items are still in the warehouse, i.e. go back to stock
+RESTOCK_ON_CANCEL = {"pending", "confirmed", "packed"}
+
+RESTOCK_BATCH = 500    # variants per stock UPDATE
+AUDIT_BATCH = 1000     # rows per audit INSERT
+
+
+@dataclass
+class TransitionResult:
+    status: str
+    changed: list = field(default_factory=list)   # order ids
+    skipped: int = 0                               # selected but not allowed
+
+
+def allowed_sources(status):
+    return sorted(source for source, targets in TRANSITIONS.items() if status in targets)
+
+
+def can_transition(current, status):
+    return status in TRANSITIONS.get(current, ())
+
+
+def _restore_stock(order_ids):
+    """Put the items of ``order_ids`` back on the shelf."""
+    quantities = dict(
+        OrderItem.objects.filter(order_id__in=order_ids)
+        .values("variant_id")
+        .annotate(qty=Sum("quantity"))
+        .order_by()
+        .values_list("variant_id", "qty")
+    )
+    if not quantities:
+        return
+
+    # lock in primary-key order, as checkout does, so the two never deadlock
+    variants = list(
+        ProductVariant.objects.select_for_update()
+        .filter(pk__in=quantities).order_by("pk")
+        .values_list("pk", "product_id")
+    )
+    pks = [pk for pk, _ in variants]
+    for start in range(0, len(pks), RESTOCK_BATCH):
+        batch = pks[start:start + RESTOCK_BATCH]
+        ProductVariant.objects.filter(pk__in=batch).update(
+            stock=F("stock") + Case(
+                *[When(pk=pk, then=Value(quantities[pk])) for pk in batch],
+                output_field=IntegerField(),
+            )
+        )
+    refresh_product_summaries({product_id for _, product_id in variants}, stock_only=True)
+    caching.bump_on_commit()
+
+
+def transition(queryset, status, user=None):
+    """
+    Move the orders in ``queryset`` to ``status`` where allowed. Returns a
+    ``TransitionResult``; ``skipped`` counts selected orders left alone.
+    """
+    if status not in TRANSITIONS:
+        raise ValueError(f"Unknown order status {status!r}")
+
+    result = TransitionResult(status)
+    with transaction.atomic():
+        selected = queryset.count()
+        rows = list(
+            queryset.filter(status__in=allowed_sources(status))
+            .select_for_update(of=("self",))
+            .order_by("pk")
+            .values_list("pk", "status")
+        )
+        result.changed = [pk for pk, _ in rows]
+        result.skipped = selected - len(rows)
+        if not rows:
+            return result
+
+        # update() skips auto_now, so updated_at is set by hand
+        Order.objects.filter(pk__in=result.changed).update(status=status, updated_at=timezone.now())
+
+        if status == "cancelled":
+            _restore_stock([pk for pk, current in rows if current in RESTOCK_ON_CANCEL])
+
+        OrderStatusChange.objects.bulk_create(
+            [
+                OrderStatusChange(order_id=pk, from_status=current, to_status=status, changed_by=user)
+                for pk, current in rows
+            ],
+            batch_size=AUDIT_BATCH,
+        )
+        # customers are told once the change is committed
+        jobs.enqueue_many_on_commit(
+            "order_status_changed", [{"order_id": pk, "status": status} for pk in result.changed]
+        )
+    return result
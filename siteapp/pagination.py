@@ -0,0 +1,161 @@
+"""
+Keyset (cursor) pagination for catalog listings.
+
+OFFSET pagination gets slower the deeper you page because the database still
+has to walk every skipped row. Here the page boundary is encoded as the sort
+key values of the last row shown, so every page is a single indexed range
+scan of ``page_size + 1`` rows no matter how large the catalog grows.
+"""
+
+import base64
+import binascii
+import datetime
+import json
+from dataclasses import dataclass
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+CATALOG_PAGE_SIZE = 24
+ORDERS_PAGE_SIZE = 10
+
+# newest first; ``id`` breaks ties between rows created in the same instant
+CATALOG_ORDERING = ("-created_at", "-id")
+
+# ?sort= values for the storefront listings; price sorts use the
+# denormalised Product.min_price (see summaries.py)
+LISTING_SORTS = {
+    "newest": CATALOG_ORDERING,
+    "price_asc": ("min_price", "id"),
+    "price_desc": ("-min_price", "-id"),
+}
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder rounds datetimes to milliseconds, which would make
+    # the cursor skip rows whose timestamps differ only in microseconds.
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+@dataclass
+class KeysetPage:
+    object_list: list
+    next_cursor: str | None = None
+    is_first: bool = True
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+class KeysetPaginator:
+    """
+    Paginate ``queryset`` by the (unique) tuple of fields in ``ordering``.
+
+    Each entry is a field name, optionally prefixed with ``-`` for descending
+    order. The last entry must make the tuple unique (normally ``id``).
+    """
+
+    def __init__(self, queryset, ordering=CATALOG_ORDERING, page_size=CATALOG_PAGE_SIZE):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.page_size = page_size
+
+    def _fields(self):
+        return [(name.lstrip("-"), name.startswith("-")) for name in self.ordering]
+
+    # cursor encoding ---------------------------------------------------
+
+    def encode_cursor(self, obj):
+        values = [getattr(obj, name) for name, _ in self._fields()]
+        raw = json.dumps(values, cls=_CursorEncoder, separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        """
+        Return the list of key values stored in ``cursor``, or None when the
+        cursor is missing or malformed (callers fall back to the first page).
+        """
+        if not cursor:
+            return None
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (binascii.Error, ValueError, UnicodeDecodeError):
+            return None
+
+        fields = self._fields()
+        if not isinstance(values, list) or len(values) != len(fields):
+            return None
+
+        opts = self.queryset.model._meta
+        decoded = []
+        for (name, _), value in zip(fields, values):
+            try:
+                model_field = opts.get_field(name)
+            except FieldDoesNotExist:
+                # annotation (e.g. a computed rank) – use the JSON value as-is
+                decoded.append(value)
+                continue
+            try:
+                decoded.append(model_field.to_python(value))
+            except ValidationError:
+                return None
+        return decoded
+
+    # querying ------------------------------------------------------------
+
+    def _after(self, values):
+        """
+        Build ``(f1, f2, ...) > (v1, v2, ...)`` in the paginator's sort
+        direction as an OR of prefix-equality terms, which every backend
+        can satisfy from a composite index on the same columns.
+        """
+        condition = Q()
+        equal_prefix = {}
+        for (name, descending), value in zip(self._fields(), values):
+            lookup = "lt" if descending else "gt"
+            condition |= Q(**equal_prefix, **{f"{name}__{lookup}": value})
+            equal_prefix[name] = value
+        return condition
+
+    def _page_query(self, values):
+        qs = self.queryset.order_by(*self.ordering)
+        if values is not None:
+            qs = qs.filter(self._after(values))
+        return qs[: self.page_size + 1]
+
+    def _make_page(self, rows, values):
+        next_cursor = None
+        if len(rows) > self.page_size:
+            rows = rows[: self.page_size]
+            next_cursor = self.encode_cursor(rows[-1])
+
+        return KeysetPage(
+            object_list=rows,
+            next_cursor=next_cursor,
+            is_first=values is None,
+        )
+
+    def page(self, cursor=None):
+        values = self.decode_cursor(cursor)
+        return self._make_page(list(self._page_query(values)), values)
+
+    async def apage(self, cursor=None):
+        """``page()`` for async views."""
+        values = self.decode_cursor(cursor)
+        return self._make_page([obj async for obj in self._page_query(values)], values)
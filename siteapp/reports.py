@@ -0,0 +1,284 @@
+"""
+Sales reporting from precomputed daily rollups.
+
+"Revenue by category per day" and "top SKUs" used to be GROUP BYs over every
+``OrderItem``. ``DailyRollup`` keeps, per day and per value of a dimension
+(variant, product, category, city, payment status), the units sold, revenue
+and number of distinct orders. Reports and CSV exports read only those rows,
+so their cost depends on the date range, not on the order history.
+
+``refresh()`` (``manage.py refresh_rollups`` from cron) is incremental:
+
+* orders with an id above the ``orders`` watermark are aggregated in
+  primary-key batches and added to the existing rows, the watermark moving
+  forward in the same transaction as the rows it covers;
+* cancellations recorded in ``OrderStatusChange`` since the
+  ``cancellations`` watermark are subtracted again, on the order's own day;
+* an order is folded only if its cancellation, if any, is still to be
+  subtracted, and only folded orders are subtracted. Orders cancelled with
+  no audit row (before ``OrderStatusChange`` existed) never count;
+* rows newer than ``REPORTS_LAG_SECONDS`` are left for the next run, so an
+  order whose transaction commits a little after a later one is not skipped.
+
+Days are local dates (``TIME_ZONE``). Labels and payment status are as of
+roll-up time; ``refresh(rebuild=True)`` recomputes everything.
+"""
+
+import datetime
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DecimalField, Exists, F, OuterRef, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyRollup, Order, OrderItem, OrderStatusChange, RollupWatermark
+
+
+ORDERS_WATERMARK = "orders"
+CANCELLATIONS_WATERMARK = "cancellations"
+BATCH_SIZE = 5000
+
+# dimension -> (key field, label fields) on OrderItem
+DIMENSIONS = {
+    DailyRollup.VARIANT: ("variant_id", ("variant__product__title", "variant__color")),
+    DailyRollup.PRODUCT: ("variant__product_id", ("variant__product__title",)),
+    DailyRollup.CATEGORY: ("variant__product__category_id", ("variant__product__category__name",)),
+    DailyRollup.CITY: ("order__city", ()),
+    DailyRollup.PAYMENT_STATUS: ("order__payment_status", ()),
+}
+
+_PAYMENT_STATUSES = dict(Order.PAYMENT_STATUS_CHOICES)
+_REVENUE = DecimalField(max_digits=14, decimal_places=2)
+
+
+def lag_seconds():
+    return getattr(settings, "REPORTS_LAG_SECONDS", 60)
+
+
+def _label(dimension, key, names):
+    if dimension == DailyRollup.VARIANT:
+        title, color = names
+        return f"{title} ({color})" if color else title
+    if dimension == DailyRollup.CATEGORY and key is None:
+        return "Uncategorised"
+    if dimension == DailyRollup.PAYMENT_STATUS:
+        return _PAYMENT_STATUSES.get(key, key)
+    return names[0] if names else key
+
+
+# ---------------------------------------------------------------------------
+# refreshing
+# ---------------------------------------------------------------------------
+
+def _deltas(order_ids, sign=1):
+    """
+    ``{(dimension, date, key): [label, units, revenue, orders]}`` for the
+    items of ``order_ids`` – one aggregate query per dimension.
+    """
+    items = OrderItem.objects.filter(order_id__in=order_ids).annotate(day=TruncDate("order__created_at"))
+    deltas = {}
+    for dimension, (key_field, label_fields) in DIMENSIONS.items():
+        rows = (
+            items.values("day", key_field, *label_fields)
+            .annotate(
+                units=Sum("quantity"),
+                revenue=Sum(F("quantity") * F("price"), output_field=_REVENUE),
+                orders=Count("order_id", distinct=True),
+            )
+            .order_by()
+        )
+        for row in rows:
+            key = row[key_field]
+            deltas[(dimension, row["day"], "" if key is None else str(key))] = [
+                _label(dimension, key, [row[f] for f in label_fields])[:255],
+                sign * row["units"],
+                sign * Decimal(row["revenue"]),
+                sign * row["orders"],
+            ]
+    return deltas
+
+
+def _apply(deltas):
+    """Add ``deltas`` to the stored rows with one read and one upsert."""
+    if not deltas:
+        return
+    existing = {
+        (r.dimension, r.date, r.key): r
+        for r in DailyRollup.objects.filter(
+            dimension__in={d for d, _, _ in deltas},
+            date__in={day for _, day, _ in deltas},
+            key__in={k for _, _, k in deltas},
+        )
+    }
+    rows = []
+    for (dimension, day, key), (label, units, revenue, orders) in deltas.items():
+        row = existing.get((dimension, day, key)) or DailyRollup(dimension=dimension, date=day, key=key)
+        row.label = label
+        row.units += units
+        row.revenue += revenue
+        row.orders += orders
+        rows.append(row)
+    DailyRollup.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["dimension", "date", "key"],
+        update_fields=["label", "units", "revenue", "orders"],
+        batch_size=1000,
+    )
+
+
+def _locked_watermark(name):
+    # one refresher at a time: the second one waits on this row
+    RollupWatermark.objects.get_or_create(name=name)
+    return RollupWatermark.objects.select_for_update().get(name=name)
+
+
+def _fold_orders(cutoff, batch_size):
+    folded = 0
+    while True:
+        with transaction.atomic():
+            mark = _locked_watermark(ORDERS_WATERMARK)
+            # always orders, then cancellations: the latter never waits on the former
+            cancellations = _locked_watermark(CANCELLATIONS_WATERMARK)
+            batch = list(
+                Order.objects.filter(pk__gt=mark.last_id, created_at__lt=cutoff)
+                .annotate(pending_cancellation=Exists(OrderStatusChange.objects.filter(
+                    order=OuterRef("pk"), to_status="cancelled", pk__gt=cancellations.last_id,
+                )))
+                .order_by("pk").values_list("pk", "status", "pending_cancellation")[:batch_size]
+            )
+            if not batch:
+                return folded
+            # a cancelled order counts only while its cancellation is yet to be subtracted
+            live = [pk for pk, status, pending in batch if status != "cancelled" or pending]
+            _apply(_deltas(live))
+            mark.last_id = batch[-1][0]
+            mark.save(update_fields=["last_id", "updated_at"])
+        folded += len(live)
+
+
+def _fold_cancellations(cutoff, batch_size):
+    folded = 0
+    while True:
+        with transaction.atomic():
+            mark = _locked_watermark(CANCELLATIONS_WATERMARK)
+            changes = list(
+                OrderStatusChange.objects.filter(pk__gt=mark.last_id, created_at__lt=cutoff)
+                .order_by("pk").values_list("pk", "order_id", "to_status")[:batch_size]
+            )
+            if not changes:
+                return folded
+            # orders not folded yet are left out when they are folded
+            folded_up_to = (
+                RollupWatermark.objects.filter(name=ORDERS_WATERMARK).values_list("last_id", flat=True).first() or 0
+            )
+            cancelled = [
+                order_id for _, order_id, status in changes
+                if status == "cancelled" and order_id <= folded_up_to
+            ]
+            if cancelled:
+                _apply(_deltas(cancelled, sign=-1))
+            mark.last_id = changes[-1][0]
+            mark.save(update_fields=["last_id", "updated_at"])
+        folded += len(cancelled)
+
+
+@dataclass
+class RefreshResult:
+    orders: int
+    cancellations: int
+
+
+def refresh(batch_size=BATCH_SIZE, lag=None, rebuild=False):
+    """Fold orders and cancellations since the watermarks into the rollups."""
+    if rebuild:
+        with transaction.atomic():
+            DailyRollup.objects.all().delete()
+            RollupWatermark.objects.all().delete()
+    cutoff = timezone.now() - datetime.timedelta(seconds=lag_seconds() if lag is None else lag)
+    # orders first: a cancellation is only ever subtracted from a folded order
+    orders = _fold_orders(cutoff, batch_size)
+    return RefreshResult(orders, _fold_cancellations(cutoff, batch_size))
+
+
+# ---------------------------------------------------------------------------
+# reading
+# ---------------------------------------------------------------------------
+
+DEFAULT_DAYS = 30
+
+
+def date_range(start=None, end=None, days=DEFAULT_DAYS):
+    """
+    ``(start, end)`` from ISO date strings; the last ``days`` days up to
+    today for anything missing or malformed.
+    """
+    def parse(value):
+        try:
+            return datetime.date.fromisoformat(value) if value else None
+        except ValueError:
+            return None
+
+    end = parse(end) or timezone.localdate()
+    start = parse(start)
+    if start is None or start > end:
+        start = end - datetime.timedelta(days=days - 1)
+    return start, end
+
+
+def _rows(dimension, start, end):
+    return DailyRollup.objects.filter(dimension=dimension, date__gte=start, date__lte=end)
+
+
+def daily_totals(start, end):
+    """Units, revenue and orders per day (every order has one payment status)."""
+    return list(
+        _rows(DailyRollup.PAYMENT_STATUS, start, end)
+        .values("date")
+        .annotate(units=Sum("units"), revenue=Sum("revenue"), orders=Sum("orders"))
+        .order_by("date")
+    )
+
+
+def by_day(dimension, start, end):
+    """The stored rows: one per day and dimension value."""
+    return list(
+        _rows(dimension, start, end)
+        .order_by("date", "-revenue")
+        .values("date", "key", "label", "units", "revenue", "orders")
+    )
+
+
+def top(dimension, start, end, limit=20):
+    """
+    Dimension values by revenue over the range, with their latest label.
+    Adding up daily distinct order counts is exact: an order has one day.
+    """
+    rows = (
+        _rows(dimension, start, end)
+        .values("key")
+        .annotate(units=Sum("units"), revenue=Sum("revenue"), orders=Sum("orders"))
+        .order_by("-revenue", "key")
+    )
+    rows = list(rows[:limit] if limit else rows)
+    labels = dict(
+        _rows(dimension, start, end).filter(key__in=[r["key"] for r in rows])
+        .order_by("date").values_list("key", "label")
+    )
+    for row in rows:
+        row["label"] = labels.get(row["key"], row["key"])
+    return rows
+
+
+EXPORT_COLUMNS = ["date", "dimension", "key", "label", "units", "revenue", "orders"]
+
+
+def export_rows(dimension, start, end):
+    """Rows for the CSV export, oldest day first."""
+    for row in _rows(dimension, start, end).order_by("date", "key").values_list(
+        "date", "dimension", "key", "label", "units", "revenue", "orders"
+    ):
+        yield row
@@ -0,0 +1,175 @@
+"""
+Read-replica routing.
+
+Catalog browsing and staff reporting used to share the primary with
+checkout writes. With a ``replica`` alias in ``DATABASES`` (see
+``settings.py``), views marked ``@replica_reads`` read the catalog and
+reporting tables from it:
+
+* only the models in ``REPLICA_MODELS``. Sessions, users, carts, holds and
+  jobs always come from the primary, so logging in or a fresh cart is never
+  lost to replication lag;
+* writes always go to the primary (``db_for_write`` stays default);
+* read-your-writes: a successful POST (checkout, any cart change, admin
+  save...) sets a short-lived cookie, and the visitor reads from the
+  primary for ``REPLICA_LAG_SECONDS`` afterwards;
+* for the same window after any catalog change (``caching.catalog_state``)
+  everybody reads from the primary. Otherwise a lagging replica could put
+  old rows into the cache under the new catalog version.
+
+Streaming responses are read after the view has returned, so their
+querysets take the alias explicitly (``current()``).
+
+Without a ``replica`` alias all of this is inert.
+"""
+
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from . import caching
+
+
+REPLICA = "replica"
+PIN_COOKIE = "primary_until"
+
+REPLICA_MODELS = {
+    "siteapp.category",
+    "siteapp.product",
+    "siteapp.productvariant",
+    "siteapp.productfacet",
+    "siteapp.dailyrollup",
+    "siteapp.order",
+    "siteapp.orderitem",
+}
+
+_reading = ContextVar("replica_alias", default=None)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+def lag_seconds():
+    return getattr(settings, "REPLICA_LAG_SECONDS", 10)
+
+
+def current():
+    """Alias the current read-only view reads from (None: the primary)."""
+    return _reading.get()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = _reading.get()
+        if alias is not None and model._meta.label_lower in REPLICA_MODELS:
+            return alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replica holds the same rows as the primary
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, REPLICA}:
+            return True
+        return None
+
+
+# ---------------------------------------------------------------------------
+# choosing the alias
+# ---------------------------------------------------------------------------
+
+def pinned(request):
+    """The visitor wrote something a moment ago."""
+    try:
+        return int(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def _read_alias(request, changed):
+    if pinned(request) or changed is None or changed > time.time() - lag_seconds():
+        return None
+    return REPLICA
+
+
+def read_alias(request):
+    if not replica_configured():
+        return None
+    return _read_alias(request, caching.catalog_state()[1])
+
+
+async def aread_alias(request):
+    if not replica_configured():
+        return None
+    return _read_alias(request, (await caching.acatalog_state())[1])
+
+
+def replica_reads(view):
+    """Route the reads of a read-only view (sync or async) to the replica."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            token = _reading.set(await aread_alias(request))
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _reading.reset(token)
+    else:
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            token = _reading.set(read_alias(request))
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                _reading.reset(token)
+    return wrapper
+
+
+# ---------------------------------------------------------------------------
+# read-your-writes
+# ---------------------------------------------------------------------------
+
+def pin(response):
+    seconds = lag_seconds()
+    response.set_cookie(
+        PIN_COOKIE, str(int(time.time()) + seconds),
+        max_age=seconds, httponly=True, samesite="Lax",
+    )
+    return response
+
+
+class ReadYourWritesMiddleware:
+    """Pin the visitor to the primary after a successful unsafe request."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def _process(request, response):
+        if (
+            replica_configured()
+            and request.method not in ("GET", "HEAD", "OPTIONS", "TRACE")
+            and response.status_code < 400
+        ):
+            pin(response)
+        return response
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self._process(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._process(request, await self.get_response(request))
@@ -0,0 +1,274 @@
+"""
+Product search.
+
+On PostgreSQL every product carries a weighted ``search_vector`` (title A,
+description B, category name C) backed by a GIN index, and queries are
+ranked with ``ts_rank``. Other backends (SQLite in local/test runs) use an
+in-process inverted index with the same weighting so both paths behave the
+same from the views' point of view and can be benchmarked side by side.
+
+The vector / inverted index is refreshed from ``signals.py`` whenever a
+product or category is saved and rebuilt wholesale by ``import_products``
+and ``manage.py rebuild_search_index``.
+"""
+
+import bisect
+import re
+import threading
+from collections import defaultdict
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection, transaction
+from django.db.models import Case, F, FloatField, Value, When
+
+from .models import Category, Product
+
+
+SEARCH_CONFIG = "english"
+
+# rank descending, then newest id; used with pagination.KeysetPaginator
+SEARCH_ORDERING = ("-search_rank", "-id")
+
+SUGGEST_LIMIT = 8
+
+# same relative weights PostgreSQL uses for ts_rank's default {D, C, B, A}
+WEIGHTS = {"A": 1.0, "B": 0.4, "C": 0.2}
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text):
+    return [t.lower() for t in _TOKEN_RE.findall(text or "")]
+
+
+def uses_postgres():
+    return connection.vendor == "postgresql"
+
+
+# ---------------------------------------------------------------------------
+# PostgreSQL: tsvector column
+# ---------------------------------------------------------------------------
+
+def _vector(category_name):
+    return (
+        SearchVector("title", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("description", weight="B", config=SEARCH_CONFIG)
+        + SearchVector(Value(category_name or ""), weight="C", config=SEARCH_CONFIG)
+    )
+
+
+def _tsquery(q):
+    """
+    ``saree silk ban`` -> ``saree & silk & ban:*`` so the last word typed
+    matches as a prefix (typeahead) while earlier words must match fully.
+    """
+    tokens = tokenize(q)
+    if not tokens:
+        return None
+    terms = tokens[:-1] + [f"{tokens[-1]}:*"]
+    return SearchQuery(" & ".join(terms), search_type="raw", config=SEARCH_CONFIG)
+
+
+# ---------------------------------------------------------------------------
+# Fallback: in-process inverted index
+# ---------------------------------------------------------------------------
+
+class InvertedIndex:
+    """
+    token -> {product_id: score}, with a sorted token list for prefix lookups.
+    Built lazily from a single query and patched incrementally afterwards.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = None
+        self._docs = {}
+        self._sorted_tokens = []
+
+    def _document(self, title, description, category_name):
+        scores = defaultdict(float)
+        for weight, text in (("A", title), ("B", description), ("C", category_name)):
+            for token in tokenize(text):
+                scores[token] += WEIGHTS[weight]
+        return scores
+
+    def _build(self):
+        postings = defaultdict(dict)
+        docs = {}
+        rows = Product.objects.values_list("id", "title", "description", "category__name")
+        for pk, title, description, category_name in rows.iterator():
+            doc = self._document(title, description, category_name)
+            docs[pk] = doc
+            for token, score in doc.items():
+                postings[token][pk] = score
+        self._postings = postings
+        self._docs = docs
+        self._sorted_tokens = sorted(postings)
+
+    def _ensure_built(self):
+        if self._postings is None:
+            self._build()
+
+    def invalidate(self):
+        with self._lock:
+            self._postings = None
+            self._docs = {}
+            self._sorted_tokens = []
+
+    def _remove_locked(self, pk):
+        for token in self._docs.pop(pk, {}):
+            posting = self._postings.get(token)
+            if posting is not None:
+                posting.pop(pk, None)
+                if not posting:
+                    del self._postings[token]
+                    i = bisect.bisect_left(self._sorted_tokens, token)
+                    if i < len(self._sorted_tokens) and self._sorted_tokens[i] == token:
+                        self._sorted_tokens.pop(i)
+
+    def update(self, product, category_name=None):
+        with self._lock:
+            if self._postings is None:
+                return  # not built yet – the next search builds from the DB
+            self._remove_locked(product.pk)
+            doc = self._document(product.title, product.description, category_name)
+            self._docs[product.pk] = doc
+            for token, score in doc.items():
+                if token not in self._postings:
+                    bisect.insort(self._sorted_tokens, token)
+                self._postings[token][product.pk] = score
+
+    def remove(self, pk):
+        with self._lock:
+            if self._postings is not None:
+                self._remove_locked(pk)
+
+    def _prefix_matches(self, prefix):
+        tokens = self._sorted_tokens
+        i = bisect.bisect_left(tokens, prefix)
+        while i < len(tokens) and tokens[i].startswith(prefix):
+            yield tokens[i]
+            i += 1
+
+    def search(self, q):
+        """
+        Return ``{product_id: rank}`` for products matching every word of
+        ``q``, the last word as a prefix.
+        """
+        tokens = tokenize(q)
+        if not tokens:
+            return {}
+
+        with self._lock:
+            self._ensure_built()
+            result = None
+            for position, token in enumerate(tokens):
+                if position == len(tokens) - 1:
+                    scores = defaultdict(float)
+                    for match in self._prefix_matches(token):
+                        for pk, score in self._postings[match].items():
+                            scores[pk] += score
+                else:
+                    scores = self._postings.get(token, {})
+
+                if result is None:
+                    result = dict(scores)
+                else:
+                    result = {pk: rank + scores[pk] for pk, rank in result.items() if pk in scores}
+                if not result:
+                    return {}
+            return result
+
+
+inverted_index = InvertedIndex()
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def search_products(queryset, q):
+    """
+    Filter ``queryset`` down to products matching ``q`` and annotate each
+    with ``search_rank``; order with ``SEARCH_ORDERING``.
+    """
+    if uses_postgres():
+        query = _tsquery(q)
+        if query is None:
+            return queryset.none()
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F("search_vector"), query),
+        )
+
+    ranks = inverted_index.search(q)
+    if not ranks:
+        return queryset.none()
+    return queryset.filter(pk__in=list(ranks)).annotate(
+        search_rank=Case(
+            *[When(pk=pk, then=Value(rank)) for pk, rank in ranks.items()],
+            default=Value(0.0),
+            output_field=FloatField(),
+        ),
+    )
+
+
+def suggest(q, limit=SUGGEST_LIMIT):
+    """Top ``limit`` active products for a typeahead prefix."""
+    products = Product.objects.filter(active=True).only("title", "slug")
+    return list(search_products(products, q).order_by(*SEARCH_ORDERING)[:limit])
+
+
+def index_product(product):
+    """Refresh the search data of a single product after it was saved."""
+    category_name = product.category.name if product.category_id else ""
+    if uses_postgres():
+        Product.objects.filter(pk=product.pk).update(search_vector=_vector(category_name))
+    else:
+        # the in-process index must not see rows from a rolled back transaction
+        transaction.on_commit(lambda: inverted_index.update(product, category_name))
+
+
+def unindex_product(pk):
+    if not uses_postgres():
+        transaction.on_commit(lambda: inverted_index.remove(pk))
+
+
+def reindex_category(category):
+    """Category names are part of the vector, so renames touch its products."""
+    if uses_postgres():
+        Product.objects.filter(category=category).update(search_vector=_vector(category.name))
+    else:
+        transaction.on_commit(inverted_index.invalidate)
+
+
+def reindex_products(product_ids):
+    """
+    Refresh the search data of ``product_ids`` after bulk writes (which skip
+    ``post_save``): one UPDATE per category among them on PostgreSQL, a
+    lazy rebuild elsewhere.
+    """
+    product_ids = {pk for pk in product_ids if pk is not None}
+    if not product_ids:
+        return
+    if not uses_postgres():
+        transaction.on_commit(inverted_index.invalidate)
+        return
+
+    products = Product.objects.filter(pk__in=product_ids)
+    for category in Category.objects.filter(pk__in=products.values("category_id")):
+        products.filter(category=category).update(search_vector=_vector(category.name))
+    products.filter(category__isnull=True).update(search_vector=_vector(""))
+
+
+def rebuild_index():
+    """
+    Recompute every product's search data: one UPDATE per category (plus
+    uncategorised products) on PostgreSQL, a lazy rebuild elsewhere.
+    """
+    if not uses_postgres():
+        transaction.on_commit(inverted_index.invalidate)
+        return
+
+    for category in Category.objects.all():
+        reindex_category(category)
+    Product.objects.filter(category__isnull=True).update(search_vector=_vector(""))
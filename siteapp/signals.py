@@ -0,0 +1,72 @@
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import caching, cart_store, facets, images, search
+from .models import Category, Product, ProductFacet, ProductVariant
+from .summaries import refresh_product_summaries
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_product(instance)
+    # a form save writes back whatever summary the instance was loaded with
+    refresh_product_summaries([instance.pk])
+
+
+@receiver(post_save, sender=Product)
+def product_image_saved(sender, instance, raw=False, **kwargs):
+    # thumbnails for a fresh upload; a no-op once the set exists
+    if raw or not instance.featured_image:
+        return
+    if not images.has_derivatives(instance.featured_image.name):
+        images.safe_generate(instance.featured_image.name)
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    search.unindex_product(instance.pk)
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, created=False, raw=False, **kwargs):
+    if raw or created:
+        return
+    search.reindex_category(instance)
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    # its products were moved to "no category" without signals
+    facets.refresh_product_facets(
+        ProductFacet.objects.filter(facet=ProductFacet.CATEGORY, value=str(instance.pk))
+        .values_list("product_id", flat=True)
+    )
+
+
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+def variant_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    refresh_product_summaries([instance.product_id])
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def catalog_changed(sender, raw=False, **kwargs):
+    if raw:
+        return
+    caching.bump_on_commit()
+
+
+@receiver(user_logged_in)
+def merge_cart_on_login(sender, request, user, **kwargs):
+    if request is not None:
+        cart_store.merge_on_login(request, user)
@@ -0,0 +1,51 @@
+"""
+SMS sending, behind a small pluggable backend in the spirit of Django's
+``EMAIL_BACKEND``. ``SMS_BACKEND`` names the class; this module ships a
+console backend for development and an in-memory one for tests
+(``siteapp.sms.outbox``, like ``django.core.mail.outbox``). A gateway
+backend only needs ``send_messages(messages)``.
+"""
+
+import sys
+import threading
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+@dataclass
+class SMSMessage:
+    to: str
+    body: str
+
+
+# filled by LocMemBackend
+outbox = []
+_outbox_lock = threading.Lock()
+
+
+class ConsoleBackend:
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send_messages(self, messages):
+        for message in messages:
+            self.stream.write(f"SMS to {message.to}: {message.body}\n")
+        self.stream.flush()
+        return len(messages)
+
+
+class LocMemBackend:
+    def send_messages(self, messages):
+        with _outbox_lock:
+            outbox.extend(messages)
+        return len(messages)
+
+
+def get_backend():
+    return import_string(getattr(settings, "SMS_BACKEND", "siteapp.sms.ConsoleBackend"))()
+
+
+def send_sms(to, body):
+    return get_backend().send_messages([SMSMessage(to=to, body=body)])
@@ -0,0 +1,65 @@
+"""
+Denormalised price / stock summary on ``Product``.
+
+Listing cards need "from ₹X" and "in stock" for every product on the page,
+and shoppers can filter on stock and sort by price. Rather than aggregating
+``ProductVariant`` rows per request, each product carries ``min_price``,
+``max_price``, ``total_stock`` and ``in_stock``, recomputed here whenever its
+variants change:
+
+* admin / ORM saves and deletes – ``signals.py``;
+* checkout's bulk stock decrement – ``checkout.py``;
+* bulk upserts – ``import_products``.
+
+Callers run inside the transaction that changed the variants, so the summary
+commits (or rolls back) together with them. The facet index (``facets.py``)
+is derived from the same rows and refreshed here as well.
+"""
+
+from django.db.models import Exists, IntegerField, Max, Min, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from . import facets
+from .models import Product, ProductVariant
+
+
+def _aggregate(function, field):
+    return Subquery(
+        ProductVariant.objects.filter(product=OuterRef("pk"))
+        .order_by()
+        .values("product")
+        .annotate(value=function(field))
+        .values("value")
+    )
+
+
+def summary_expressions():
+    return {
+        "min_price": _aggregate(Min, "price"),
+        "max_price": _aggregate(Max, "price"),
+        "total_stock": Coalesce(_aggregate(Sum, "stock"), Value(0), output_field=IntegerField()),
+        "in_stock": Exists(ProductVariant.objects.filter(product=OuterRef("pk"), stock__gt=0)),
+    }
+
+
+def refresh_product_summaries(product_ids, stock_only=False):
+    """
+    Recompute the summary of ``product_ids`` with a single UPDATE, then their
+    facet rows. ``stock_only``: nothing but stock changed, so the facet rows
+    only take the new ``in_stock``.
+    """
+    product_ids = {pk for pk in product_ids if pk is not None}
+    if not product_ids:
+        return 0
+    updated = Product.objects.filter(pk__in=product_ids).update(**summary_expressions())
+    if stock_only:
+        facets.refresh_stock(product_ids)
+    else:
+        facets.refresh_product_facets(product_ids)
+    return updated
+
+
+def refresh_all_summaries():
+    updated = Product.objects.update(**summary_expressions())
+    facets.rebuild()
+    return updated
@@ -0,0 +1,132 @@
+"""
+Synthetic data for benchmarks and load tests.
+
+Builds catalogs of any size (10k+ products with variants) and customers with
+long order histories using batched ``bulk_create`` so even large datasets
+take seconds. Everything is prefixed ``bench-`` so it is easy to spot and
+remove. Used by ``benchmark_views``, ``generate_synthetic_data`` and the
+query-budget tests.
+"""
+
+import random
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+
+from . import caching, search
+from .models import Category, Order, OrderItem, Product, ProductVariant
+from .summaries import refresh_all_summaries
+
+
+PREFIX = "bench"
+
+CITIES = ["Chennai", "Kolkata", "Varanasi", "Mumbai", "Bengaluru", "Hyderabad", "Jaipur", "Kochi"]
+COLORS = ["Red", "Maroon", "Gold", "Green", "Blue", "Ivory", "Pink", "Black"]
+WORDS = [
+    "silk", "cotton", "banarasi", "kanjivaram", "zari", "handloom", "chanderi",
+    "organza", "georgette", "tussar", "ikat", "bandhani", "pattu", "kasavu",
+]
+
+
+@dataclass
+class SyntheticCatalog:
+    categories: list = field(default_factory=list)
+    product_ids: list = field(default_factory=list)
+    variant_ids: list = field(default_factory=list)
+
+
+def _batched(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def build_catalog(products=10_000, categories=12, variants_per_product=2, batch_size=2000, seed=0):
+    rng = random.Random(seed)
+    start = Product.objects.filter(slug__startswith=f"{PREFIX}-").count()
+
+    Category.objects.bulk_create(
+        [Category(name=f"Bench {w.title()}", slug=f"{PREFIX}-{w}") for w in WORDS[:categories]],
+        ignore_conflicts=True,
+    )
+    cats = list(Category.objects.filter(slug__startswith=f"{PREFIX}-"))
+
+    catalog = SyntheticCatalog(categories=cats)
+    options = [o for o, _ in ProductVariant.BLOUSE_CHOICES]
+
+    for chunk in _batched(range(start, start + products), batch_size):
+        batch = []
+        for i in chunk:
+            words = rng.sample(WORDS, 3)
+            batch.append(Product(
+                title=" ".join(w.title() for w in words) + f" Saree {i}",
+                slug=f"{PREFIX}-saree-{i}",
+                description=f"{words[0]} weave with {words[1]} border, {rng.choice(COLORS).lower()} pallu.",
+                category=rng.choice(cats),
+                base_price=Decimal(rng.randrange(999, 25000)),
+            ))
+        created = Product.objects.bulk_create(batch)
+        catalog.product_ids.extend(p.pk for p in created)
+
+        variants = []
+        for product in created:
+            for v in range(variants_per_product):
+                variants.append(ProductVariant(
+                    product=product,
+                    color=COLORS[v // len(options)] if v >= len(options) else "",
+                    blouse_option=options[v % len(options)],
+                    price=product.base_price + Decimal(rng.choice([0, 0, 250, -150])),
+                    stock=rng.choice([0, 1, 3, 8, 25, 10_000]),
+                ))
+        catalog.variant_ids.extend(v.pk for v in ProductVariant.objects.bulk_create(variants))
+
+    # bulk_create skips signals: bring the derived data up to date once
+    refresh_all_summaries()
+    search.rebuild_index()
+    caching.bump_catalog_version()
+    return catalog
+
+
+def build_customer(variant_ids, orders=200, items_per_order=3, username=None, batch_size=2000, seed=0):
+    User = get_user_model()
+    username = username or f"{PREFIX}-customer-{User.objects.count()}"
+    user = User.objects.create_user(username, email=f"{username}@example.com", password="bench-password")
+    build_orders(variant_ids, orders, items_per_order, user=user, batch_size=batch_size, seed=seed)
+    return user
+
+
+def build_orders(variant_ids, count, items_per_order=3, user=None, batch_size=2000, seed=0):
+    """``count`` orders (optionally for ``user``) with random cities/statuses."""
+    rng = random.Random(seed)
+    statuses = [s for s, _ in Order.STATUS_CHOICES]
+    payment_statuses = [s for s, _ in Order.PAYMENT_STATUS_CHOICES]
+    prices = dict(ProductVariant.objects.filter(pk__in=variant_ids).values_list("pk", "price"))
+
+    for chunk in _batched(range(count), batch_size):
+        orders = Order.objects.bulk_create([
+            Order(
+                user=user,
+                customer_name=f"Customer {i}",
+                phone=f"9{rng.randrange(10 ** 8, 10 ** 9)}",
+                address_line1=f"{rng.randrange(1, 500)} Temple Street",
+                city=rng.choice(CITIES),
+                pincode=str(rng.randrange(110001, 855999)),
+                total=Decimal("0"),
+                status=rng.choice(statuses),
+                payment_status=rng.choice(payment_statuses),
+            )
+            for i in chunk
+        ])
+        items = []
+        for order in orders:
+            for variant_id in rng.sample(variant_ids, min(items_per_order, len(variant_ids))):
+                item = OrderItem(
+                    order=order,
+                    variant_id=variant_id,
+                    quantity=rng.randrange(1, 3),
+                    price=prices[variant_id],
+                )
+                order.total += item.price * item.quantity
+                items.append(item)
+        OrderItem.objects.bulk_create(items)
+        Order.objects.bulk_update(orders, ["total"])
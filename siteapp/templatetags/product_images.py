@@ -0,0 +1,35 @@
+from django import template
+from django.utils.html import format_html
+
+from siteapp import images
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(image, alt="", css_class="", sizes="100vw", lazy=True):
+    """
+    ``<picture>`` with WebP and JPEG ``srcset`` for a product image, or a
+    plain ``<img>`` of the original while its derivatives don't exist yet.
+    """
+    if not image:
+        return ""
+
+    loading = "lazy" if lazy else "eager"
+    if not images.has_derivatives(image.name, image.storage):
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="{}" decoding="async">',
+            image.url, alt, css_class, loading,
+        )
+
+    fallback = image.storage.url(images.derivative_name(image.name, images.WIDTHS[1], "jpeg"))
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="{}" decoding="async">'
+        '</picture>',
+        images.srcset(image.name, "webp", image.storage), sizes,
+        fallback, images.srcset(image.name, "jpeg", image.storage), sizes,
+        alt, css_class, loading,
+    )
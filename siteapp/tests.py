@@ -1,3 +1,1901 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core import mail
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.db.models import Sum
+from django.test import LiveServerTestCase, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+from django.utils import timezone
+
+from PIL import Image
+
+from Saree_site import database as db_config
+
+from . import (
+    assets, benchmarks, cart_store, caching, checks, explain, exports, facets, holds, images, instrumentation, jobs, loadtest,
+    order_status, reports, routing, search, sms, synthetic,
+)
+from .changelists import estimated_count
+from .checkout import OutOfStock, place_order
+from .models import (
+    Cart, Category, DailyRollup, Job, Order, OrderItem, OrderStatusChange, Product, ProductFacet, ProductVariant,
+    StockHold,
+)
+from .pagination import CATALOG_PAGE_SIZE, ORDERS_PAGE_SIZE, KeysetPaginator
+from .summaries import refresh_product_summaries
+
+
+def make_products(count, category=None, prefix="saree"):
+    start = Product.objects.count()
+    products = Product.objects.bulk_create([
+        Product(
+            title=f"{prefix.title()} {start + i}",
+            slug=f"{prefix}-{start + i}",
+            category=category,
+            base_price=Decimal("1999.00"),
+        )
+        for i in range(count)
+    ])
+    return products
+
+
+def user_cart(user):
+    return cart_store.get_store().load(cart_store.user_key(user.pk))
+
+
+def set_user_cart(user, cart):
+    cart_store.get_store().save(cart_store.user_key(user.pk), cart, user.pk)
+
+
+def make_variants(products, stock=5):
+    return ProductVariant.objects.bulk_create([
+        ProductVariant(product=product, blouse_option=option, price=product.base_price, stock=stock)
+        for product in products
+        for option in ("with_blouse", "without_blouse")
+    ])
+
+
+class CatalogListingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.silk = Category.objects.create(name="Silk", slug="silk")
+        cls.cotton = Category.objects.create(name="Cotton", slug="cotton")
+
+    def setUp(self):
+        caching.clear()
+
+    def count_queries(self, url):
+        # measure the cache-miss path
+        caching.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_home_query_count_is_constant(self):
+        make_products(3, self.silk)
+        small = self.count_queries(reverse("home"))
+
+        make_products(CATALOG_PAGE_SIZE * 3, self.cotton)
+        large = self.count_queries(reverse("home"))
+
+        self.assertEqual(small, large)
+
+    def test_category_page_query_count_is_constant(self):
+        url = reverse("category_page", args=["silk"])
+        make_products(2, self.silk)
+        small = self.count_queries(url)
+
+        make_products(CATALOG_PAGE_SIZE * 2, self.silk)
+        large = self.count_queries(url)
+
+        self.assertEqual(small, large)
+
+    def test_keyset_pages_cover_catalog_once(self):
+        make_products(CATALOG_PAGE_SIZE * 2 + 5, self.silk)
+        # identical timestamps force the id tie-breaker to do the work
+        Product.objects.update(created_at=timezone.now())
+
+        paginator = KeysetPaginator(Product.objects.filter(active=True))
+        seen, cursor = [], None
+        while True:
+            page = paginator.page(cursor)
+            seen.extend(p.pk for p in page)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+
+        expected = list(Product.objects.order_by("-created_at", "-id").values_list("pk", flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        make_products(3, self.silk)
+        response = self.client.get(reverse("home"), {"after": "not-a-cursor"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["page"].is_first)
+        self.assertEqual(len(response.context["products"]), 3)
+
+
+class ProductSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.silk = Category.objects.create(name="Banarasi", slug="banarasi")
+        cls.title_hit = Product.objects.create(
+            title="Red Silk Saree", slug="red-silk", category=cls.silk,
+            description="Festive drape.", base_price=Decimal("4999"),
+        )
+        cls.description_hit = Product.objects.create(
+            title="Festive Drape", slug="festive-drape",
+            description="Soft silk blend with zari border.", base_price=Decimal("2999"),
+        )
+        Product.objects.create(
+            title="Cotton Handloom", slug="cotton-handloom",
+            description="Breathable everyday wear.", base_price=Decimal("999"),
+        )
+
+    def setUp(self):
+        # the in-process index outlives the per-test transaction rollback
+        search.inverted_index.invalidate()
+        caching.clear()
+
+    def search_titles(self, q):
+        qs = search.search_products(Product.objects.all(), q)
+        return [p.title for p in qs.order_by(*search.SEARCH_ORDERING)]
+
+    def test_title_matches_rank_above_description_matches(self):
+        self.assertEqual(self.search_titles("silk"), ["Red Silk Saree", "Festive Drape"])
+
+    def test_last_word_matches_as_prefix(self):
+        self.assertEqual(self.search_titles("hand"), ["Cotton Handloom"])
+        self.assertEqual(self.search_titles("red si"), ["Red Silk Saree"])
+
+    def test_category_name_is_searchable(self):
+        self.assertEqual(self.search_titles("banarasi"), ["Red Silk Saree"])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.search_titles("silk")  # build the index
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(title="Silk Kanjivaram", slug="silk-kanji", base_price=Decimal("9999"))
+        self.assertIn("Silk Kanjivaram", self.search_titles("kanji"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.title_hit.delete()
+        self.assertNotIn("Red Silk Saree", self.search_titles("silk"))
+
+    def test_home_search_and_suggest_views(self):
+        response = self.client.get(reverse("home"), {"q": "silk"})
+        self.assertEqual(
+            [p.title for p in response.context["products"]],
+            ["Red Silk Saree", "Festive Drape"],
+        )
+
+        response = self.client.get(reverse("search_suggest"), {"q": "cott"})
+        self.assertEqual(response.json()["results"][0]["title"], "Cotton Handloom")
+
+
+class CartTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("meera", password="pw-12345")
+        cls.variants = make_variants(make_products(10), stock=3)
+
+    def setUp(self):
+        caches["carts"].clear()
+        self.client.force_login(self.user)
+
+    def set_cart(self, cart):
+        set_user_cart(self.user, cart)
+
+    def cart_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("cart"))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_cart_page_query_count_does_not_grow_with_lines(self):
+        self.set_cart({str(self.variants[0].id): 1})
+        one_line, _ = self.cart_queries()
+
+        self.set_cart({str(v.id): 2 for v in self.variants})
+        many_lines, response = self.cart_queries()
+
+        self.assertEqual(one_line, many_lines)
+        self.assertEqual(len(response.context["items"]), len(self.variants))
+        self.assertEqual(
+            response.context["total"],
+            sum(v.price * 2 for v in self.variants),
+        )
+
+    def test_stale_variant_ids_are_dropped(self):
+        self.set_cart({str(self.variants[0].id): 1, "999999": 2, "junk": 1})
+        _, response = self.cart_queries()
+
+        self.assertEqual(len(response.context["items"]), 1)
+        self.assertEqual(user_cart(self.user), {str(self.variants[0].id): 1})
+
+    def test_add_and_update_respect_stock(self):
+        variant = self.variants[0]
+        for _ in range(4):
+            self.client.post(reverse("add_to_cart"), {"variant_id": variant.id})
+        self.assertEqual(user_cart(self.user), {str(variant.id): 3})
+
+        self.client.post(reverse("update_cart_quantity"), {"variant_id": variant.id, "action": "dec"})
+        self.assertEqual(user_cart(self.user), {str(variant.id): 2})
+
+    def test_add_unknown_variant_is_404(self):
+        response = self.client.post(reverse("add_to_cart"), {"variant_id": "nope"})
+        self.assertEqual(response.status_code, 404)
+
+
+ADDRESS = {
+    "customer_name": "Meera",
+    "phone": "9876543210",
+    "address_line1": "12 Temple Street",
+    "address_line2": "",
+    "city": "Chennai",
+    "pincode": "600001",
+}
+
+
+class CheckoutTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("meera", password="pw-12345")
+        cls.variants = make_variants(make_products(3), stock=4)
+
+    def test_checkout_view_places_order_and_decrements_stock(self):
+        caches["carts"].clear()
+        self.client.force_login(self.user)
+        a, b = self.variants[0], self.variants[1]
+        set_user_cart(self.user, {str(a.id): 2, str(b.id): 1})
+
+        form = {
+            "name": "Meera", "phone": "9876543210", "address_line1": "12 Temple Street",
+            "city": "Chennai", "pincode": "600001",
+        }
+        response = self.client.post(reverse("checkout"), form)
+
+        order = Order.objects.get()
+        self.assertRedirects(response, reverse("order_thank_you", args=[order.pk]))
+        self.assertEqual(order.total, a.price * 2 + b.price)
+        self.assertEqual(order.items.count(), 2)
+        a.refresh_from_db()
+        b.refresh_from_db()
+        self.assertEqual((a.stock, b.stock), (2, 3))
+        self.assertEqual(user_cart(self.user), {})
+
+    def test_out_of_stock_writes_nothing(self):
+        a, b = self.variants[0], self.variants[1]
+        with self.assertRaises(OutOfStock) as ctx:
+            place_order(self.user, {a.id: 1, b.id: 5}, **ADDRESS)
+
+        self.assertEqual(ctx.exception.available, 4)
+        self.assertFalse(Order.objects.exists())
+        a.refresh_from_db()
+        self.assertEqual(a.stock, 4)
+
+    def test_write_query_count_does_not_grow_with_cart_size(self):
+        def queries_for(variants):
+            quantities = {v.id: 1 for v in variants}
+            with CaptureQueriesContext(connection) as ctx:
+                place_order(self.user, quantities, **ADDRESS)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(queries_for(self.variants[:1]), queries_for(self.variants[1:]))
+
+    def test_only_serialization_failures_and_deadlocks_are_retried(self):
+        def error(sqlstate):
+            exc = OperationalError("boom")
+            exc.__cause__ = type("DatabaseError", (Exception,), {"sqlstate": sqlstate})()
+            return exc
+
+        for sqlstate, calls in [("40001", 2), ("40P01", 2), ("57014", 1)]:  # 57014: statement timeout
+            with self.subTest(sqlstate=sqlstate), \
+                    mock.patch("siteapp.checkout.connection", mock.Mock(in_atomic_block=False)), \
+                    mock.patch("siteapp.checkout.time.sleep"), \
+                    mock.patch("siteapp.checkout._place_order_once", side_effect=[error(sqlstate), "order"]) as once:
+                try:
+                    place_order(self.user, {self.variants[0].id: 1}, **ADDRESS)
+                except OperationalError:
+                    pass
+                self.assertEqual(once.call_count, calls)
+
+
+class CheckoutConcurrencyTests(TransactionTestCase):
+    STOCK = 5
+    BUYERS = 20
+
+    def test_parallel_checkouts_never_oversell(self):
+        variant = make_variants(make_products(1), stock=self.STOCK)[0]
+        outcomes = []
+        start = threading.Barrier(self.BUYERS)
+
+        def buy():
+            try:
+                start.wait()
+                place_order(None, {variant.id: 1}, **ADDRESS)
+                outcomes.append("ok")
+            except OutOfStock:
+                outcomes.append("out_of_stock")
+            except OperationalError:
+                outcomes.append("gave_up")
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=buy) for _ in range(self.BUYERS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        variant.refresh_from_db()
+        sold = OrderItem.objects.filter(variant=variant).aggregate(n=Sum("quantity"))["n"] or 0
+
+        self.assertEqual(len(outcomes), self.BUYERS)
+        self.assertGreaterEqual(variant.stock, 0)
+        self.assertLessEqual(outcomes.count("ok"), self.STOCK)
+        self.assertEqual(sold, outcomes.count("ok"))
+        self.assertEqual(variant.stock + sold, self.STOCK)
+
+
+def make_orders(user, variants, count, items_per_order=2):
+    orders = Order.objects.bulk_create([
+        Order(user=user, total=Decimal("0"), **ADDRESS) for _ in range(count)
+    ])
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, variant=variants[(i + j) % len(variants)], quantity=1, price=Decimal("100"))
+        for i, order in enumerate(orders)
+        for j in range(items_per_order)
+    ])
+    return orders
+
+
+class MyOrdersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("meera", password="pw-12345")
+        cls.variants = make_variants(make_products(4))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def my_orders_queries(self, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("my_orders"), params)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_query_count_is_constant_for_long_histories(self):
+        make_orders(self.user, self.variants, 1)
+        few, _ = self.my_orders_queries()
+
+        make_orders(self.user, self.variants, 300, items_per_order=3)
+        many, response = self.my_orders_queries()
+
+        self.assertEqual(few, many)
+        self.assertEqual(len(response.context["orders"]), ORDERS_PAGE_SIZE)
+        self.assertContains(response, "Saree 0")
+
+    def test_pages_walk_the_whole_history(self):
+        make_orders(self.user, self.variants, ORDERS_PAGE_SIZE + 3)
+        _, first = self.my_orders_queries()
+        _, second = self.my_orders_queries(after=first.context["page"].next_cursor)
+
+        self.assertEqual(len(second.context["orders"]), 3)
+        self.assertFalse(second.context["page"].has_next)
+
+
+class ImportProductsTests(TestCase):
+    HEADER = [
+        "title", "slug", "category", "description", "base_price",
+        "variant_with_blouse_price", "variant_with_blouse_stock",
+        "variant_without_blouse_price", "variant_without_blouse_stock",
+    ]
+
+    def write_csv(self, rows):
+        tmp = tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False, newline="", encoding="utf-8")
+        self.addCleanup(Path(tmp.name).unlink)
+        with tmp:
+            writer = csv.writer(tmp)
+            writer.writerow(self.HEADER)
+            writer.writerows(rows)
+        return tmp.name
+
+    def run_import(self, path, *args):
+        out = StringIO()
+        call_command("import_products", "--path", path, *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def rows(self, n, price="1999"):
+        return [
+            [f"Saree {i}", f"saree-{i}", "Silk" if i % 2 else "Cotton", "desc", price, price, 3, price, 4]
+            for i in range(n)
+        ]
+
+    def test_insert_then_unchanged_then_update(self):
+        path = self.write_csv(self.rows(25))
+        out = self.run_import(path, "--batch-size", "10")
+        self.assertIn("Products: 25 inserted, 0 updated, 0 unchanged", out)
+        self.assertIn("Variants: 50 inserted, 0 updated, 0 unchanged", out)
+        self.assertEqual(Category.objects.count(), 2)
+        self.assertEqual(ProductVariant.objects.filter(stock=4, blouse_option="without_blouse").count(), 25)
+
+        out = self.run_import(path)
+        self.assertIn("Products: 0 inserted, 0 updated, 25 unchanged", out)
+        self.assertIn("Variants: 0 inserted, 0 updated, 50 unchanged", out)
+
+        out = self.run_import(self.write_csv(self.rows(30, price="2499")))
+        self.assertIn("Products: 5 inserted, 25 updated, 0 unchanged", out)
+        self.assertEqual(Product.objects.filter(base_price=Decimal("2499")).count(), 30)
+        self.assertEqual(ProductVariant.objects.count(), 60)
+
+    def test_category_only_change_refreshes_the_facets(self):
+        row = ["Saree 0", "saree-0", "Silk", "desc", "1999", "1999", 3, "1999", 4]
+        self.run_import(self.write_csv([row]))
+        self.run_import(self.write_csv([row[:2] + ["Cotton"] + row[3:]]))
+
+        product = Product.objects.get(slug="saree-0")
+        self.assertEqual(product.category.slug, "cotton")
+        self.assertEqual(
+            list(ProductFacet.objects.filter(product=product, facet=ProductFacet.CATEGORY).values_list("value", flat=True)),
+            [str(product.category_id)],
+        )
+
+    def test_coloured_variants_are_updated_not_duplicated(self):
+        self.run_import(self.write_csv(self.rows(1)))
+        ProductVariant.objects.filter(blouse_option="with_blouse").update(color="Red")
+
+        out = self.run_import(self.write_csv(self.rows(1, price="2499")))
+        self.assertIn("Variants: 0 inserted, 2 updated", out)
+        self.assertEqual(
+            sorted(ProductVariant.objects.values_list("color", "blouse_option", "price")),
+            [("", "without_blouse", Decimal("2499")), ("Red", "with_blouse", Decimal("2499"))],
+        )
+
+    def test_dry_run_writes_nothing(self):
+        out = self.run_import(self.write_csv(self.rows(5)), "--dry-run")
+        self.assertIn("Products: 5 inserted", out)
+        self.assertFalse(Product.objects.exists())
+        self.assertFalse(Category.objects.exists())
+
+    def test_query_count_scales_with_batches_not_rows(self):
+        path = self.write_csv(self.rows(200))
+        with CaptureQueriesContext(connection) as ctx:
+            self.run_import(path, "--batch-size", "100")
+        self.assertLess(len(ctx.captured_queries), 40)
+
+    def test_bad_rows_are_skipped(self):
+        rows = self.rows(2) + [
+            ["Bad", "bad", "Silk", "", "not-a-price", "1", 1, "1", 1],
+            ["Negative", "negative", "Silk", "", "1", "1", -1, "1", 1],
+        ]
+        out = self.run_import(self.write_csv(rows))
+        self.assertIn("(2 skipped)", out)
+        self.assertEqual(Product.objects.count(), 2)
+
+
+class CatalogCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.silk = Category.objects.create(name="Silk", slug="silk")
+        cls.products = make_products(3, cls.silk)
+        cls.variants = make_variants(cls.products)
+
+    def setUp(self):
+        caching.clear()
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_listing_hit_skips_the_database(self):
+        url = reverse("category_page", args=["silk"])
+        _, cold = self.get(url)
+        response, warm = self.get(url)
+
+        self.assertGreater(cold, 0)
+        self.assertEqual(warm, 0)
+        self.assertContains(response, "Saree 2")
+        self.assertEqual(caching.stats()["grid"], {"hits": 1, "misses": 1, "hit_ratio": 0.5})
+
+    def test_pages_and_searches_are_cached_separately(self):
+        self.get(reverse("home"))
+        self.get(reverse("home") + "?q=saree")
+        self.assertEqual(caching.stats()["grid"]["misses"], 2)
+
+    def test_saving_a_variant_invalidates_product_detail(self):
+        product = self.products[0]
+        url = product.get_absolute_url()
+        self.get(url)
+
+        variant = self.variants[0]
+        variant.stock = 42
+        with self.captureOnCommitCallbacks(execute=True):
+            variant.save()
+
+        response, queries = self.get(url)
+        self.assertGreater(queries, 0)
+        self.assertContains(response, "Stock: 42")
+
+    def test_checkout_bumps_catalog_version(self):
+        before = caching.catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            place_order(None, {self.variants[0].id: 1}, **ADDRESS)
+        self.assertEqual(caching.catalog_version(), before + 1)
+
+    def test_stats_endpoint_is_staff_only(self):
+        response = self.client.get(reverse("catalog_cache_stats"))
+        self.assertEqual(response.status_code, 302)
+
+        staff = get_user_model().objects.create_user("ops", password="pw-12345", is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse("catalog_cache_stats"))
+        self.assertIn("catalog_version", response.json())
+
+
+def jpeg_upload(name="saree.jpg", size=(2000, 1500)):
+    buffer = BytesIO()
+    Image.new("RGB", size, (200, 30, 60)).save(buffer, format="JPEG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+
+    def test_lost_version_never_restarts_at_an_old_value(self):
+        old = caching.bump_catalog_version()
+        caching.get_cache().delete(caching.VERSION_KEY)
+        self.assertGreater(caching.catalog_version(), old)
+        caching.get_cache().delete(caching.VERSION_KEY)
+        self.assertGreater(caching.bump_catalog_version(), old)
+
+    def test_process_local_cache_is_reported_outside_debug(self):
+        with override_settings(DEBUG=False):
+            self.assertEqual([w.id for w in checks.check_catalog_cache(None)], ["siteapp.W001"])
+        with override_settings(DEBUG=True):
+            self.assertEqual(checks.check_catalog_cache(None), [])
+        shared = {**settings.CACHES, "catalog": {"BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "t"}}
+        with override_settings(DEBUG=False, CACHES=shared):
+            self.assertEqual(checks.check_catalog_cache(None), [])
+
+class ImageDerivativeTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = override_settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        caching.clear()
+
+    def make_product(self, slug="red-silk", **kwargs):
+        return Product.objects.create(
+            title="Red Silk", slug=slug, base_price=Decimal("4999"),
+            featured_image=jpeg_upload(f"{slug}.jpg", **kwargs),
+        )
+
+    def test_upload_creates_every_width_and_format(self):
+        product = self.make_product()
+        name = product.featured_image.name
+
+        for derivative in images.derivative_names(name):
+            self.assertTrue(default_storage.exists(derivative), derivative)
+        with default_storage.open(images.derivative_name(name, 320, "webp")) as f:
+            self.assertEqual(Image.open(f).size, (320, 240))
+
+    def test_small_originals_are_not_upscaled(self):
+        product = self.make_product(size=(500, 400))
+        name = images.derivative_name(product.featured_image.name, 1280, "jpeg")
+        with default_storage.open(name) as f:
+            self.assertEqual(Image.open(f).size, (500, 400))
+
+    def test_listing_emits_srcset(self):
+        self.make_product()
+        response = self.client.get(reverse("home"))
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, ".w320.webp 320w")
+        self.assertContains(response, 'loading="lazy"')
+
+    def test_backfill_command_uses_a_process_pool(self):
+        product = self.make_product()
+        name = product.featured_image.name
+        for derivative in images.derivative_names(name):
+            default_storage.delete(derivative)
+        self.assertFalse(images.has_derivatives(name))
+
+        other = self.make_product(slug="blue-silk")
+        for derivative in images.derivative_names(other.featured_image.name):
+            default_storage.delete(derivative)
+
+        out = StringIO()
+        call_command("generate_thumbnails", "--workers", "2", stdout=out)
+        self.assertIn("Wrote 16 derivative file(s) for 2 image(s)", out.getvalue())
+        self.assertTrue(images.has_derivatives(name))
+
+
+class ProductSummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(title="Silk", slug="silk", base_price=Decimal("1000"))
+
+    def setUp(self):
+        caching.clear()
+
+    def add_variant(self, option, price, stock):
+        return ProductVariant.objects.create(
+            product=self.product, blouse_option=option, price=Decimal(price), stock=stock,
+        )
+
+    def summary(self):
+        self.product.refresh_from_db()
+        p = self.product
+        return p.min_price, p.max_price, p.total_stock, p.in_stock
+
+    def test_variant_saves_and_deletes_maintain_summary(self):
+        self.assertEqual(self.summary(), (None, None, 0, False))
+
+        cheap = self.add_variant("without_blouse", "900", 0)
+        self.assertEqual(self.summary(), (Decimal("900"), Decimal("900"), 0, False))
+
+        self.add_variant("with_blouse", "1200", 3)
+        self.assertEqual(self.summary(), (Decimal("900"), Decimal("1200"), 3, True))
+
+        cheap.delete()
+        self.assertEqual(self.summary(), (Decimal("1200"), Decimal("1200"), 3, True))
+
+    def test_checkout_updates_summary(self):
+        variant = self.add_variant("with_blouse", "1200", 2)
+        place_order(None, {variant.id: 2}, **ADDRESS)
+        self.assertEqual(self.summary(), (Decimal("1200"), Decimal("1200"), 0, False))
+
+    def test_listing_filters_in_stock_and_sorts_by_price(self):
+        self.add_variant("with_blouse", "1200", 0)
+        for i, price in enumerate(["500", "3000", "1500"]):
+            p = Product.objects.create(title=f"P{i}", slug=f"p{i}", base_price=Decimal(price))
+            ProductVariant.objects.create(product=p, price=Decimal(price), stock=1)
+
+        response = self.client.get(reverse("home"), {"in_stock": "1", "sort": "price_asc"})
+        self.assertEqual([p.title for p in response.context["products"]], ["P0", "P2", "P1"])
+
+        response = self.client.get(reverse("home"), {"sort": "price_desc"})
+        self.assertEqual([p.title for p in response.context["products"]], ["P1", "P2", "Silk", "P0"])
+
+    def test_price_sort_pages_with_keyset_cursor(self):
+        for i in range(CATALOG_PAGE_SIZE + 2):
+            p = Product.objects.create(title=f"P{i}", slug=f"p{i}", base_price=Decimal("10"))
+            ProductVariant.objects.create(product=p, price=Decimal(100 + i), stock=1)
+
+        first = self.client.get(reverse("home"), {"sort": "price_asc"})
+        second = self.client.get(reverse("home"), {"sort": "price_asc", "after": first.context["page"].next_cursor})
+        self.assertEqual(
+            [p.min_price for p in second.context["products"]],
+            [Decimal(100 + CATALOG_PAGE_SIZE), Decimal(101 + CATALOG_PAGE_SIZE)],
+        )
+
+    def test_bulk_refresh_is_one_query(self):
+        self.add_variant("with_blouse", "1200", 2)
+        # one UPDATE; the facet rows add a read, a delete and an insert
+        with self.assertNumQueries(4):
+            refresh_product_summaries([self.product.pk])
+        # stock changes only touch the facets' in_stock flags
+        with self.assertNumQueries(2):
+            refresh_product_summaries([self.product.pk], stock_only=True)
+
+
+@override_settings(CART_PERSIST_INTERVAL=60)
+class CartStoreTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("meera", password="pw-12345")
+        cls.variants = make_variants(make_products(2), stock=10)
+
+    def setUp(self):
+        caches["carts"].clear()
+
+    def test_compact_round_trip(self):
+        self.assertEqual(cart_store.encode({"15": 2, "3": 1, "9": 0}), "3:1,15:2")
+        self.assertEqual(cart_store.decode("3:1,15:2,bad,7:x"), {"3": 1, "15": 2})
+
+    def test_burst_of_writes_hits_the_database_once(self):
+        store = cart_store.get_store()
+        with CaptureQueriesContext(connection) as ctx:
+            for qty in range(1, 6):
+                store.save("u:1", {"3": qty})
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(store.load("u:1"), {"3": 5})
+
+        caches["carts"].clear()
+        self.assertEqual(store.load("u:1"), {"3": 1})  # durable copy lags by design
+
+    def test_write_behind_to_a_process_local_cache_is_reported(self):
+        self.assertEqual([w.id for w in checks.check_cart_cache(None)], ["siteapp.W002"])
+        with override_settings(CART_PERSIST_INTERVAL=0):
+            self.assertEqual(checks.check_cart_cache(None), [])
+
+    @override_settings(CART_PERSIST_INTERVAL=0)
+    def test_write_through_mode(self):
+        store = cart_store.get_store()
+        store.save("u:1", {"3": 1})
+        store.save("u:1", {"3": 4})
+        caches["carts"].clear()
+        self.assertEqual(store.load("u:1"), {"3": 4})
+
+    def test_add_to_cart_does_not_write_the_session_table(self):
+        self.client.force_login(self.user)
+        self.client.post(reverse("add_to_cart"), {"variant_id": self.variants[0].id})
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(reverse("add_to_cart"), {"variant_id": self.variants[0].id})
+        self.assertFalse([q for q in ctx.captured_queries if "django_session" in q["sql"] and "UPDATE" in q["sql"]])
+        self.assertEqual(user_cart(self.user), {str(self.variants[0].id): 2})
+
+    def test_anonymous_cart_merges_on_login(self):
+        a, b = self.variants[0], self.variants[1]
+        set_user_cart(self.user, {str(a.id): 1})
+
+        session = self.client.session
+        session[cart_store.SESSION_TOKEN_KEY] = "tok"
+        session.save()
+        cart_store.get_store().save("a:tok", {str(a.id): 2, str(b.id): 1})
+
+        self.client.post(reverse("login"), {"username": "meera", "password": "pw-12345"})
+
+        self.assertEqual(user_cart(self.user), {str(a.id): 3, str(b.id): 1})
+        self.assertNotIn(cart_store.SESSION_TOKEN_KEY, self.client.session)
+        self.assertEqual(cart_store.get_store().load("a:tok"), {})
+
+    def test_legacy_session_cart_is_adopted(self):
+        self.client.force_login(self.user)
+        session = self.client.session
+        session["cart"] = {str(self.variants[0].id): 2}
+        session.save()
+
+        response = self.client.get(reverse("cart"))
+        self.assertEqual(len(response.context["items"]), 1)
+        self.assertEqual(user_cart(self.user), {str(self.variants[0].id): 2})
+        self.assertNotIn("cart", self.client.session)
+
+    def test_expire_abandoned_carts(self):
+        store = cart_store.get_store()
+        store.save("u:1", {"3": 1})
+        store.save("a:old", {"3": 1})
+        Cart.objects.filter(key="a:old").update(updated_at=timezone.now() - timedelta(days=45))
+
+        out = StringIO()
+        call_command("expire_carts", "--days", "30", stdout=out)
+        self.assertIn("Deleted 1", out.getvalue())
+        self.assertEqual(list(Cart.objects.values_list("key", flat=True)), ["u:1"])
+
+
+class ViewQueryBudgetTests(TestCase):
+    """Every siteapp URL stays within its query budget on a synthetic catalog."""
+
+    @classmethod
+    def setUpTestData(cls):
+        search.inverted_index.invalidate()
+        cls.catalog = synthetic.build_catalog(products=300, categories=4)
+        cls.customer = synthetic.build_customer(cls.catalog.variant_ids, orders=40)
+        cls.staff = get_user_model().objects.create_user("bench-staff", password="pw-12345", is_staff=True)
+
+    def setUp(self):
+        caches["carts"].clear()
+        self.ctx = benchmarks.build_context(self.catalog, self.customer, self.staff)
+
+    def test_every_url_has_a_scenario(self):
+        names = {p.name for p in get_resolver("siteapp.urls").url_patterns}
+        self.assertEqual(names - {s.name for s in benchmarks.SCENARIOS}, set())
+
+    def test_views_stay_within_query_budget(self):
+        for scenario in benchmarks.SCENARIOS:
+            with self.subTest(scenario.key):
+                m = benchmarks.measure(scenario, self.ctx, iterations=2)
+                self.assertLessEqual(m.queries, m.max_queries)
+
+    def test_query_counts_do_not_grow_with_data(self):
+        scenarios = [s for s in benchmarks.SCENARIOS if s.key in ("home", "category_page", "my_orders")]
+        before = benchmarks.run_benchmarks(self.ctx, iterations=1, scenarios=scenarios)
+
+        synthetic.build_catalog(products=200, categories=4, seed=1)
+        synthetic.build_orders(self.catalog.variant_ids, 60, user=self.customer, seed=1)
+        caches["carts"].clear()
+        after = benchmarks.run_benchmarks(self.ctx, iterations=1, scenarios=scenarios)
+
+        for key in before:
+            self.assertEqual(before[key].queries, after[key].queries, key)
+
+
+class BenchmarkBaselineTests(TestCase):
+    def measurement(self, queries=3, timings=(0.010,) * 20, budget=4):
+        return benchmarks.Measurement("home", queries, budget, list(timings))
+
+    def baseline(self, queries=3, p95_ms=10.0):
+        return {"views": {"home": {"queries": queries, "max_queries": 4, "p50_ms": p95_ms, "p95_ms": p95_ms}}}
+
+    def test_percentiles(self):
+        m = self.measurement(timings=[i / 1000 for i in range(1, 101)])
+        self.assertAlmostEqual(m.p50, 0.0505)
+        self.assertAlmostEqual(m.p95, 0.095)
+
+    def test_within_tolerance_passes(self):
+        results = {"home": self.measurement(timings=[0.012] * 20)}
+        self.assertEqual(benchmarks.compare(results, self.baseline()), [])
+
+    def test_slower_p95_is_a_regression(self):
+        results = {"home": self.measurement(timings=[0.020] * 20)}
+        self.assertEqual(len(benchmarks.compare(results, self.baseline())), 1)
+
+    def test_extra_queries_are_a_regression(self):
+        results = {"home": self.measurement(queries=4)}
+        self.assertIn("baseline 3", benchmarks.compare(results, self.baseline())[0])
+
+    def test_budget_checked_without_baseline(self):
+        results = {"home": self.measurement(queries=5)}
+        self.assertIn("budget is 4", benchmarks.compare(results, None)[0])
+
+    def test_baseline_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "baseline.json"
+            benchmarks.write_baseline({"home": self.measurement()}, {"products": 1}, path)
+            loaded = benchmarks.load_baseline(path)
+        self.assertEqual(loaded["views"]["home"]["queries"], 3)
+        self.assertEqual(benchmarks.compare({"home": self.measurement()}, loaded), [])
+
+    def test_missing_baseline_says_how_to_record_one(self):
+        module = "siteapp.management.commands.benchmark_views"
+        out = StringIO()
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch(f"{module}.setup_test_environment"), \
+                mock.patch(f"{module}.teardown_test_environment"), \
+                mock.patch(f"{module}.Command.run", return_value={"home": self.measurement()}):
+            call_command("benchmark_views", baseline=str(Path(tmp) / "missing.json"), stdout=out)
+        self.assertIn("Run with --update-baseline first", out.getvalue())
+        self.assertIn("(no baseline)", out.getvalue())
+
+
+@override_settings(PERF_SAMPLE_RATE=1.0, PERF_N_PLUS_ONE_THRESHOLD=3)
+class PerformanceInstrumentationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_variants(make_products(3))
+        cls.staff = get_user_model().objects.create_user("ops", password="pw-12345", is_staff=True)
+
+    def setUp(self):
+        caching.clear()
+        instrumentation.reset()
+
+    def test_records_per_url_name(self):
+        self.client.get(reverse("home"))
+        self.client.get(reverse("home"))
+
+        row = instrumentation.report()["home"]
+        self.assertEqual(row["samples"], 2)
+        self.assertGreater(row["sql_queries"]["max"], 0)
+        self.assertGreater(row["template_ms"]["max"], 0)
+        self.assertGreater(row["response_bytes"]["mean"], 1000)
+        self.assertGreaterEqual(row["wall_ms"]["max"], row["template_ms"]["max"])
+
+    @override_settings(PERF_SAMPLE_RATE=0)
+    def test_sampling_off_records_nothing(self):
+        self.client.get(reverse("home"))
+        self.assertEqual(instrumentation.report(), {})
+
+    def test_repeated_statements_are_flagged(self):
+        sample = instrumentation.Sample()
+        execute = lambda sql, params, many, context: None  # noqa: E731
+        for pk in range(4):
+            sample(execute, f"SELECT * FROM siteapp_product WHERE id = {pk}", None, False, {})
+        sample(execute, 'SELECT * FROM "siteapp_category"', None, False, {})
+
+        self.assertEqual(sample.suspected_n_plus_one(), {"SELECT * FROM siteapp_product WHERE id = ?": 4})
+
+    def test_signature_collapses_in_lists(self):
+        self.assertEqual(
+            instrumentation.signature("SELECT 1 WHERE id IN (%s, %s, %s)"),
+            instrumentation.signature("SELECT 1 WHERE id IN (%s)"),
+        )
+
+    def test_expired_workers_are_pruned(self):
+        cache = instrumentation.get_cache()
+        cache.set("perf:worker:gone", {"home": {}}, timeout=None)
+        cache.set(instrumentation.WORKERS_KEY, ["perf:worker:gone"])
+        cache.delete("perf:worker:gone")  # its snapshot expired
+
+        with mock.patch.object(cache, "set", wraps=cache.set) as set_:
+            instrumentation.recorder.flush()
+
+        own = f"perf:worker:{os.getpid()}"
+        self.assertEqual(cache.get(instrumentation.WORKERS_KEY), [own])
+        self.assertEqual(set_.call_args_list[0].kwargs["timeout"], instrumentation.snapshot_ttl())
+
+    def test_worker_dropped_by_a_concurrent_flush_registers_again(self):
+        self.client.get(reverse("home"))
+        instrumentation.recorder.flush()
+        cache = instrumentation.get_cache()
+        cache.set(instrumentation.WORKERS_KEY, [])  # overwritten by another worker
+
+        cache.add(instrumentation.WORKERS_LOCK_KEY, "other")
+        instrumentation.recorder.flush()
+        self.assertEqual(cache.get(instrumentation.WORKERS_KEY), [])
+
+        cache.delete(instrumentation.WORKERS_LOCK_KEY)
+        self.assertEqual(instrumentation.report()["home"]["samples"], 1)
+
+    def test_histogram_percentiles(self):
+        hist = instrumentation.Histogram(instrumentation.MS_BUCKETS)
+        for value in [3] * 90 + [400] * 10:
+            hist.observe(value)
+        self.assertEqual(hist.percentile(50), 5)
+        self.assertEqual(hist.percentile(95), 400)
+
+    def test_staff_endpoint_and_command(self):
+        self.client.get(reverse("home"))
+        self.assertEqual(self.client.get(reverse("perf_stats")).status_code, 302)
+
+        self.client.force_login(self.staff)
+        data = self.client.get(reverse("perf_stats"), {"view": "home"}).json()
+        self.assertEqual(list(data), ["home"])
+
+        out = StringIO()
+        call_command("perf_report", stdout=out)
+        self.assertIn("home", out.getvalue())
+
+
+class IndexAuditTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        search.inverted_index.invalidate()
+        cls.catalog = synthetic.build_catalog(products=50, categories=2)
+        cls.customer = synthetic.build_customer(cls.catalog.variant_ids, orders=30)
+        synthetic.build_orders(cls.catalog.variant_ids, 200)
+        cls.staff = get_user_model().objects.create_superuser("audit-admin", email="", password="pw-12345")
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def setUp(self):
+        caches["carts"].clear()
+        self.ctx = benchmarks.build_context(self.catalog, self.customer, self.staff)
+
+    def test_detects_full_scans(self):
+        sql = 'SELECT "id" FROM "siteapp_order" WHERE "customer_name" = %s'
+        self.assertEqual([s.table for s in explain.seq_scans(sql, ["x"])], ["siteapp_order"])
+
+    def test_indexed_lookups_do_not_scan(self):
+        for sql, params in [
+            ('SELECT "id" FROM "siteapp_order" WHERE "city" = %s', ["Kochi"]),
+            ('SELECT "id" FROM "siteapp_order" WHERE "created_at" >= %s', [timezone.now()]),
+            ('SELECT "id" FROM "auth_user" WHERE "email" = %s', ["a@example.com"]),
+        ]:
+            with self.subTest(sql):
+                self.assertEqual(explain.seq_scans(sql, params), [])
+
+    def test_derived_tables_are_not_table_scans(self):
+        sql = 'SELECT COUNT(*) FROM (SELECT "id" FROM "siteapp_order" ORDER BY "created_at" LIMIT 10) subquery'
+        self.assertEqual(explain.seq_scans(sql, []), [])
+
+    def test_order_changelist_has_no_large_scans(self):
+        scenarios = [s for s in explain.EXTRA_SCENARIOS if s.key == "admin:siteapp_order_changelist"]
+        self.assertTrue(scenarios)
+        self.assertEqual(explain.audit(self.ctx, min_rows=100, scenarios=scenarios), [])
+
+    def test_customer_views_have_no_large_scans(self):
+        scenarios = [s for s in benchmarks.SCENARIOS if s.key in ("my_orders", "order_track:lookup", "order_thank_you")]
+        self.assertEqual(explain.audit(self.ctx, min_rows=100, scenarios=scenarios), [])
+
+
+FLAKY_CALLS = []
+
+
+@jobs.task("tests.flaky", max_attempts=2)
+def flaky_task(fail_times):
+    FLAKY_CALLS.append(fail_times)
+    if len(FLAKY_CALLS) <= fail_times:
+        raise RuntimeError("gateway timeout")
+
+
+@jobs.task("tests.record")
+def record_task(n):
+    FLAKY_CALLS.append(n)
+
+
+@override_settings(SMS_BACKEND="siteapp.sms.LocMemBackend", STOCK_ALERT_RECIPIENTS=["stock@example.com"])
+class JobQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("meera", email="meera@example.com", password="pw-12345")
+        cls.admin = get_user_model().objects.create_superuser("boss", email="", password="pw-12345")
+        cls.variants = make_variants(make_products(2), stock=5)
+
+    def setUp(self):
+        caches["carts"].clear()
+        sms.outbox.clear()
+        FLAKY_CALLS.clear()
+
+    def checkout(self, qty=1):
+        self.client.force_login(self.user)
+        set_user_cart(self.user, {str(self.variants[0].id): qty})
+        form = {
+            "name": "Meera", "phone": "9876543210", "address_line1": "12 Temple Street",
+            "city": "Chennai", "pincode": "600001",
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("checkout"), form)
+        return Order.objects.latest("pk")
+
+    def test_checkout_queues_confirmation_instead_of_sending(self):
+        order = self.checkout()
+
+        self.assertEqual(list(Job.objects.values_list("task", "payload")), [("order_confirmation", {"order_id": order.pk})])
+        self.assertEqual(sms.outbox, [])
+        self.assertEqual(mail.outbox, [])
+
+        self.assertEqual(jobs.work(once=True), 1)
+        self.assertEqual(sms.outbox[0].to, "9876543210")
+        self.assertEqual(mail.outbox[0].to, ["meera@example.com"])
+        self.assertIn(f"#{order.pk}", mail.outbox[0].body)
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+
+    def test_low_stock_alert(self):
+        self.checkout(qty=3)
+        self.assertTrue(Job.objects.filter(task="low_stock_alert").exists())
+
+        jobs.work(once=True)
+        alert = [m for m in mail.outbox if m.to == ["stock@example.com"]]
+        self.assertEqual(len(alert), 1)
+        self.assertIn("2 left", alert[0].body)
+
+    def test_failed_checkout_queues_nothing(self):
+        with self.assertRaises(OutOfStock), self.captureOnCommitCallbacks(execute=True):
+            place_order(self.user, {self.variants[0].id: 99}, **ADDRESS)
+        self.assertFalse(Job.objects.exists())
+
+    def test_admin_status_action_notifies_each_order(self):
+        orders = make_orders(self.user, self.variants, 3)
+        Order.objects.update(status="packed")
+        self.client.force_login(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("admin:siteapp_order_changelist"), {
+                "action": "mark_shipped",
+                "_selected_action": [o.pk for o in orders],
+            })
+
+        self.assertEqual(Order.objects.filter(status="shipped").count(), 3)
+        self.assertEqual(Job.objects.filter(task="order_status_changed").count(), 3)
+        jobs.work(once=True)
+        self.assertEqual(len(sms.outbox), 3)
+        self.assertIn("shipped", sms.outbox[0].body)
+
+    def test_retries_with_backoff_then_fails(self):
+        job = jobs.enqueue("tests.flaky", fail_times=5)
+
+        with self.assertLogs("siteapp.jobs", "ERROR"):
+            jobs.work(once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=jobs.BACKOFF_BASE - 1))
+        self.assertIn("gateway timeout", job.last_error)
+
+        # not due yet
+        self.assertEqual(jobs.work(once=True), 0)
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        with self.assertLogs("siteapp.jobs", "ERROR"):
+            jobs.work(once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_retry_succeeds(self):
+        job = jobs.enqueue("tests.flaky", fail_times=1)
+        with self.assertLogs("siteapp.jobs", "ERROR"):
+            jobs.work(once=True)
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        jobs.work(once=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+
+    def test_stale_jobs_are_requeued(self):
+        job = jobs.enqueue("tests.record", n=1)
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.RUNNING, locked_at=timezone.now() - timedelta(hours=1),
+        )
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(jobs.work(once=True), 1)
+
+    def test_stale_jobs_out_of_attempts_fail(self):
+        job = jobs.enqueue("tests.record", n=1)
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.RUNNING, attempts=job.max_attempts, locked_at=timezone.now() - timedelta(hours=1),
+        )
+        self.assertEqual(jobs.requeue_stale(), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn("Lease expired", job.last_error)
+
+    def test_unknown_task_is_rejected_when_queued(self):
+        with self.assertRaises(LookupError):
+            jobs.enqueue_on_commit("no.such.task", x=1)
+
+
+class JobWorkerConcurrencyTests(TransactionTestCase):
+    def test_each_job_runs_once_across_threads(self):
+        FLAKY_CALLS.clear()
+        jobs.enqueue_many("tests.record", [{"n": i} for i in range(30)])
+
+        processed = jobs.work(concurrency=4, once=True)
+
+        self.assertEqual(processed, 30)
+        self.assertEqual(sorted(FLAKY_CALLS), list(range(30)))
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 30)
+
+
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Silk", slug="silk")
+        cls.products = make_products(3, category=cls.category)
+        make_variants(cls.products)
+        cls.user = get_user_model().objects.create_user("meera", password="pw-12345")
+        cls.order = make_orders(cls.user, make_variants(make_products(1, prefix="tracked")), 1)[0]
+
+    def setUp(self):
+        caching.clear()
+
+    async def test_catalog_pages(self):
+        response = await self.async_client.get(reverse("home"))
+        self.assertContains(response, "Saree 0")
+
+        response = await self.async_client.get(reverse("category_page", args=["silk"]))
+        self.assertContains(response, "Saree 2")
+        response = await self.async_client.get(reverse("category_page", args=["nope"]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_product_detail(self):
+        response = await self.async_client.get(self.products[0].get_absolute_url())
+        self.assertContains(response, self.products[0].title)
+        response = await self.async_client.get(reverse("product_detail", args=["missing"]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_order_track(self):
+        url = reverse("order_track")
+        response = await self.async_client.post(url, {"order_id": self.order.pk, "phone": self.order.phone})
+        self.assertContains(response, f"Order #{self.order.pk}")
+        self.assertContains(response, "With Blouse")
+
+        response = await self.async_client.post(url, {"order_id": "abc", "phone": "1"})
+        self.assertRedirects(response, url, fetch_redirect_response=False)
+
+    async def test_logged_in_header_renders_without_sync_db_access(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse("home"))
+        self.assertContains(response, "Hi, meera!")
+
+    @override_settings(PERF_SAMPLE_RATE=1.0)
+    async def test_instrumentation_sees_async_queries(self):
+        instrumentation.reset()
+        await self.async_client.get(self.products[1].get_absolute_url())
+        row = instrumentation.report()["product_detail"]
+        self.assertGreater(row["sql_queries"]["max"], 0)
+
+
+class LoadTestHarnessTests(LiveServerTestCase):
+    def test_reports_throughput_and_latency(self):
+        make_variants(make_products(2))
+        result = loadtest.run(
+            self.live_server_url, [reverse("home"), reverse("order_track")],
+            concurrency=4, duration=0.5, warmup=0,
+        )
+        summary = result.summary()
+        self.assertGreater(summary["requests"], 0)
+        self.assertEqual(summary["errors"], 0)
+        self.assertEqual(list(summary["statuses"]), [200])
+        self.assertGreaterEqual(summary["p95_ms"], summary["p50_ms"])
+
+
+class StockHoldTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user("meera", password="pw-12345")
+        cls.other = User.objects.create_user("kavya", password="pw-12345")
+        cls.variant = make_variants(make_products(1), stock=3)[0]
+
+    def setUp(self):
+        caches["carts"].clear()
+        self.client.force_login(self.user)
+        self.key = cart_store.user_key(self.user.pk)
+        self.other_key = cart_store.user_key(self.other.pk)
+
+    def add(self):
+        return self.client.post(reverse("add_to_cart"), {"variant_id": self.variant.id}, follow=True)
+
+    def test_other_carts_holds_limit_what_can_be_added(self):
+        holds.reserve(self.other_key, self.variant.id, 2)
+
+        self.add()
+        response = self.add()
+
+        self.assertEqual(user_cart(self.user), {str(self.variant.id): 1})
+        self.assertContains(response, "Only 1 piece(s) available.")
+        self.assertEqual(holds.available([self.variant.id]), {self.variant.id: 0})
+        self.assertEqual(holds.available([self.variant.id], self.key), {self.variant.id: 1})
+
+    def test_cart_changes_reserve_and_release(self):
+        self.add()
+        self.add()
+        self.assertEqual(StockHold.objects.get(cart_key=self.key).quantity, 2)
+
+        self.client.post(reverse("update_cart_quantity"), {"variant_id": self.variant.id, "action": "dec"})
+        self.assertEqual(StockHold.objects.get(cart_key=self.key).quantity, 1)
+
+        self.client.post(reverse("clear_cart"))
+        self.assertFalse(StockHold.objects.exists())
+
+    def test_shrinking_a_hold_never_fails(self):
+        holds.reserve(self.key, self.variant.id, 3)
+        ProductVariant.objects.filter(pk=self.variant.pk).update(stock=1)
+
+        holds.reserve(self.key, self.variant.id, 2)
+        with self.assertRaises(holds.NotAvailable) as ctx:
+            holds.reserve(self.key, self.variant.id, 3)
+        self.assertEqual(ctx.exception.available, 1)
+
+    def test_product_page_and_add_use_unheld_stock(self):
+        caching.clear()
+        holds.reserve(self.other_key, self.variant.id, 2)
+        response = self.client.get(self.variant.product.get_absolute_url())
+        self.assertContains(response, "Stock: 1")
+
+        holds.reserve(self.other_key, self.variant.id, 3)
+        response = self.client.get(self.variant.product.get_absolute_url())
+        self.assertContains(response, "Out of stock")
+        response = self.add()
+        self.assertContains(response, "This item is out of stock.")
+        self.assertEqual(user_cart(self.user), {})
+
+    def test_lowering_quantity_after_the_hold_lapsed(self):
+        for _ in range(3):
+            self.add()
+        StockHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        holds.reserve(self.other_key, self.variant.id, 3)
+
+        response = self.client.post(
+            reverse("update_cart_quantity"), {"variant_id": self.variant.id, "action": "dec"}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(user_cart(self.user), {str(self.variant.id): 2})
+        self.assertEqual(StockHold.objects.get(cart_key=self.key).quantity, 2)
+
+    def test_lapsed_holds_stop_counting_and_are_swept(self):
+        holds.reserve(self.other_key, self.variant.id, 3)
+        StockHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        holds.reserve(self.key, self.variant.id, 2)
+
+        self.assertEqual(holds.available([self.variant.id]), {self.variant.id: 1})
+        self.assertEqual(holds.expire(batch_size=1), 1)
+        self.assertEqual(list(StockHold.objects.values_list("cart_key", flat=True)), [self.key])
+
+    def test_checkout_counts_other_holds_and_releases_own(self):
+        holds.reserve(self.other_key, self.variant.id, 2)
+        with self.assertRaises(OutOfStock) as ctx:
+            place_order(self.user, {self.variant.id: 2}, cart_key=self.key, **ADDRESS)
+        self.assertEqual(ctx.exception.available, 1)
+
+        holds.reserve(self.key, self.variant.id, 1)
+        place_order(self.user, {self.variant.id: 1}, cart_key=self.key, **ADDRESS)
+
+        self.assertEqual(list(StockHold.objects.values_list("cart_key", flat=True)), [self.other_key])
+        self.variant.refresh_from_db()
+        self.assertEqual(self.variant.stock, 2)
+
+
+class OrderStatusTransitionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user("meera", password="pw-12345")
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "pw-12345")
+        cls.variants = make_variants(make_products(2), stock=5)
+
+    def mark(self, orders, action):
+        self.client.force_login(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse("admin:siteapp_order_changelist"), {
+                "action": action,
+                "_selected_action": [o.pk for o in orders],
+            }, follow=True)
+
+    def test_invalid_transitions_are_skipped(self):
+        pending, delivered = make_orders(self.user, self.variants, 2)
+        Order.objects.filter(pk=delivered.pk).update(status="delivered")
+
+        response = self.mark([pending, delivered], "mark_confirmed")
+
+        self.assertEqual(
+            dict(Order.objects.values_list("pk", "status")),
+            {pending.pk: "confirmed", delivered.pk: "delivered"},
+        )
+        self.assertContains(response, "1 order(s) marked as Confirmed.")
+        self.assertContains(response, "1 order(s) skipped")
+
+    def test_cancel_restores_stock_and_writes_audit_log(self):
+        orders = make_orders(self.user, self.variants, 4)
+        Order.objects.filter(pk=orders[3].pk).update(status="shipped")
+
+        self.mark(orders, "mark_cancelled")
+
+        # the shipped order's items stay out; the other three come back
+        self.assertEqual(list(ProductVariant.objects.order_by("pk").values_list("stock", flat=True)), [6, 7, 7, 6])
+        self.assertEqual(Order.objects.filter(status="cancelled").count(), 3)
+        change = OrderStatusChange.objects.filter(order=orders[0]).get()
+        self.assertEqual((change.from_status, change.to_status, change.changed_by), ("pending", "cancelled", self.admin))
+        self.assertFalse(OrderStatusChange.objects.filter(order=orders[3]).exists())
+        self.assertEqual(Job.objects.filter(task="order_status_changed").count(), 3)
+        self.assertEqual(list(Product.objects.values_list("total_stock", flat=True)), [13, 13])
+
+    def test_query_count_does_not_grow_with_selection(self):
+        def queries_for(count):
+            make_orders(self.user, self.variants, count)
+            with CaptureQueriesContext(connection) as ctx:
+                result = order_status.transition(Order.objects.filter(status="pending"), "cancelled")
+            self.assertEqual(len(result.changed), count)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(queries_for(2), queries_for(50))
+
+    def test_status_is_read_only_on_existing_orders(self):
+        order = make_orders(self.user, self.variants, 1)[0]
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse("admin:siteapp_order_change", args=[order.pk]))
+        self.assertNotContains(response, 'name="status"')
+
+
+class AdminChangelistTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = synthetic.build_catalog(products=40, categories=2)
+        cls.customer = synthetic.build_customer(cls.catalog.variant_ids, orders=1)
+        cls.admin = get_user_model().objects.create_superuser("admin", "admin@example.com", "pw-12345")
+        synthetic.build_orders(cls.catalog.variant_ids, 150, items_per_order=1)
+
+    def setUp(self):
+        caches["default"].clear()
+        self.client.force_login(self.admin)
+        self.url = reverse("admin:siteapp_order_changelist")
+
+    def test_query_counts_do_not_grow_with_orders(self):
+        ctx = benchmarks.build_context(self.catalog, self.customer, self.admin)
+        benchmarks.measure(benchmarks.ADMIN_SCENARIOS[0], ctx)  # cached filter choices
+        before = benchmarks.run_benchmarks(ctx, iterations=1, scenarios=benchmarks.ADMIN_SCENARIOS)
+        synthetic.build_orders(self.catalog.variant_ids, 200, items_per_order=1, seed=1)
+        after = benchmarks.run_benchmarks(ctx, iterations=1, scenarios=benchmarks.ADMIN_SCENARIOS)
+
+        self.assertEqual(benchmarks.growth({150: before, 350: after}, max_growth=100), [])
+        for m in after.values():
+            self.assertLessEqual(m.queries, m.max_queries, m.key)
+
+    def test_cursor_continues_after_the_last_row(self):
+        first = self.client.get(self.url)
+        first_ids = [o.pk for o in first.context["cl"].result_list]
+        self.assertEqual(len(first_ids), 100)
+        self.assertContains(first, "Older →")
+
+        second = self.client.get(self.url + first.context["cl"].next_cursor_url)
+        second_ids = [o.pk for o in second.context["cl"].result_list]
+
+        expected = list(Order.objects.order_by("-created_at", "-id").values_list("pk", flat=True))
+        self.assertEqual(first_ids + second_ids, expected)
+        self.assertIsNone(second.context["cl"].next_cursor_url)
+
+    def test_numeric_search_uses_phone_pincode_and_id(self):
+        order = Order.objects.order_by("pk").first()
+        Order.objects.filter(pk=order.pk).update(phone="7000012345", pincode="560001")
+
+        for term in ("70000", "560001", str(order.pk)):
+            with self.subTest(term):
+                response = self.client.get(self.url, {"q": term})
+                self.assertIn(order, list(response.context["cl"].result_list))
+
+        response = self.client.get(self.url, {"q": "12345"})
+        self.assertNotIn(order, list(response.context["cl"].result_list))
+
+    def test_estimated_count(self):
+        self.assertEqual(estimated_count(Order.objects.all(), exact_limit=1000), Order.objects.count())
+        # SQLite has no planner estimate: past the limit the count is exact
+        self.assertEqual(estimated_count(Order.objects.all(), exact_limit=10), Order.objects.count())
+        self.assertEqual(estimated_count(Order.objects.filter(status="nope"), exact_limit=10), 0)
+
+    def test_date_hierarchy_lists_the_span(self):
+        Order.objects.filter(pk=Order.objects.order_by("pk").first().pk).update(
+            created_at=timezone.now() - timedelta(days=800)
+        )
+        response = self.client.get(self.url)
+        years = [d.year for d in response.context["cl"].queryset.datetimes("created_at", "year")]
+        now = timezone.localtime()
+        self.assertEqual(years, list(range(now.year - len(years) + 1, now.year + 1)))
+        self.assertGreaterEqual(len(years), 3)
+
+    def test_variant_changelist_joins_products(self):
+        url = reverse("admin:siteapp_productvariant_changelist")
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url)
+        synthetic.build_catalog(products=40, categories=2, seed=1)
+        with CaptureQueriesContext(connection) as more:
+            self.client.get(url)
+        self.assertEqual(len(ctx.captured_queries), len(more.captured_queries))
+
+
+class SalesReportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.staff = User.objects.create_user("staff", password="pw-12345", is_staff=True)
+        cls.category = Category.objects.create(name="Silk", slug="silk")
+        cls.variants = make_variants(make_products(2, category=cls.category))
+
+    def order(self, city="Chennai", lines=((0, 2),)):
+        order = Order.objects.create(total=Decimal("0"), **{**ADDRESS, "city": city})
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, variant=self.variants[i], quantity=qty, price=Decimal("100.00"))
+            for i, qty in lines
+        ])
+        return order
+
+    def rollup(self, dimension, key):
+        return DailyRollup.objects.get(dimension=dimension, key=str(key), date=timezone.localdate())
+
+    def test_refresh_is_incremental(self):
+        self.order(lines=((0, 2), (1, 1)))
+        self.order(city="Kochi")
+        self.assertEqual(reports.refresh(lag=0).orders, 2)
+        self.assertEqual(reports.refresh(lag=0).orders, 0)
+
+        self.order()
+        self.assertEqual(reports.refresh(lag=0).orders, 1)
+
+        category = self.rollup(DailyRollup.CATEGORY, self.category.pk)
+        self.assertEqual((category.orders, category.units, category.revenue), (3, 7, Decimal("700.00")))
+        variant = self.rollup(DailyRollup.VARIANT, self.variants[0].pk)
+        self.assertEqual((variant.orders, variant.units), (3, 6))
+        self.assertEqual(self.rollup(DailyRollup.CITY, "Kochi").orders, 1)
+        self.assertEqual(self.rollup(DailyRollup.PAYMENT_STATUS, "pending").label, "Pending")
+
+    def test_recent_orders_wait_for_the_lag(self):
+        self.order()
+        self.assertEqual(reports.refresh(lag=3600).orders, 0)
+        self.assertEqual(reports.refresh(lag=0).orders, 1)
+
+    def test_cancellations_are_subtracted(self):
+        self.order()
+        cancelled = self.order(city="Kochi")
+        reports.refresh(lag=0)
+        order_status.transition(Order.objects.filter(pk=cancelled.pk), "cancelled")
+
+        self.assertEqual(reports.refresh(lag=0).cancellations, 1)
+        self.assertEqual(self.rollup(DailyRollup.CITY, "Kochi").orders, 0)
+        self.assertEqual(self.rollup(DailyRollup.PRODUCT, self.variants[0].product_id).units, 2)
+
+        incremental = list(DailyRollup.objects.order_by("dimension", "key").values_list("key", "units", "orders"))
+        reports.refresh(lag=0, rebuild=True)
+        rebuilt = list(DailyRollup.objects.order_by("dimension", "key").values_list("key", "units", "orders"))
+        self.assertEqual(
+            [row for row in incremental if row[1]],
+            [row for row in rebuilt if row[1]],
+        )
+
+    def test_orders_cancelled_before_folding_never_count(self):
+        self.order()
+        legacy = self.order(city="Kochi")
+        Order.objects.filter(pk=legacy.pk).update(status="cancelled")  # no audit row
+        audited = self.order(city="Madurai")
+        order_status.transition(Order.objects.filter(pk=audited.pk), "cancelled")
+
+        for rebuild in (False, True):
+            with self.subTest(rebuild=rebuild):
+                reports.refresh(lag=0, rebuild=rebuild)
+                self.assertFalse(DailyRollup.objects.filter(dimension=DailyRollup.CITY, key="Kochi").exists())
+                self.assertEqual(self.rollup(DailyRollup.CITY, "Madurai").orders, 0)
+                self.assertEqual(self.rollup(DailyRollup.PRODUCT, self.variants[0].product_id).units, 2)
+
+    def test_dashboard_and_export_read_only_rollups(self):
+        self.order(lines=((0, 1), (1, 3)))
+        reports.refresh(lag=0)
+        self.client.force_login(self.staff)
+
+        with CaptureQueriesContext(connection) as ctx:
+            page = self.client.get(reverse("sales_report"))
+            export = self.client.get(reverse("sales_report_csv"), {"dimension": "variant"})
+        self.assertFalse([q for q in ctx.captured_queries if "siteapp_order" in q["sql"]])
+
+        self.assertContains(page, "Silk")
+        rows = list(csv.reader(StringIO(export.content.decode())))
+        self.assertEqual(rows[0], reports.EXPORT_COLUMNS)
+        self.assertEqual(sorted(row[4] for row in rows[1:]), ["1", "3"])
+
+        self.assertEqual(self.client.get(reverse("sales_report_csv"), {"dimension": "nope"}).status_code, 404)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.staff = User.objects.create_user("staff", password="pw-12345", is_staff=True)
+        cls.variants = make_variants(make_products(2))
+        cls.orders = make_orders(None, cls.variants, 3)
+        Order.objects.filter(pk=cls.orders[0].pk).update(city="Kochi", status="shipped")
+        Order.objects.filter(pk=cls.orders[1].pk).update(created_at=timezone.now() - timedelta(days=10))
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def get(self, fmt, **params):
+        response = self.client.get(reverse("export_orders", args=[fmt]), params)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_has_one_line_per_item(self):
+        rows = list(csv.DictReader(StringIO(self.get("csv"))))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual([int(r["order_id"]) for r in rows], sorted(o.pk for o in self.orders for _ in range(2)))
+
+        rows = list(csv.DictReader(StringIO(self.get("csv", city="Kochi", status="shipped"))))
+        self.assertEqual({int(r["order_id"]) for r in rows}, {self.orders[0].pk})
+
+        today = timezone.localdate().isoformat()
+        rows = list(csv.DictReader(StringIO(self.get("csv", start=today, end=today))))
+        self.assertEqual({int(r["order_id"]) for r in rows}, {self.orders[0].pk, self.orders[2].pk})
+
+    def test_ndjson_nests_items_per_order(self):
+        lines = [json.loads(line) for line in self.get("ndjson").splitlines()]
+        self.assertEqual([line["order_id"] for line in lines], [o.pk for o in self.orders])
+        self.assertEqual(len(lines[0]["items"]), 2)
+        self.assertEqual(set(lines[0]["items"][0]), {"variant_id", "product", "color", "blouse_option", "quantity", "price"})
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get(reverse("export_orders", args=["xml"])).status_code, 404)
+        self.assertEqual(self.client.get(reverse("export_orders", args=["csv"]), {"start": "May 1"}).status_code, 400)
+
+    def test_streams_in_chunks(self):
+        with mock.patch.object(exports, "LINES_PER_WRITE", 2):
+            chunks = list(exports.export_orders("csv"))
+        self.assertEqual(len(chunks), 4)  # header + 6 item lines, two per chunk
+
+    async def test_async_requests_stream_asynchronously(self):
+        await self.async_client.aforce_login(self.staff)
+        response = await self.async_client.get(reverse("export_catalog", args=["csv"]))
+        self.assertTrue(response.is_async)
+        body = b"".join([chunk async for chunk in response])
+        self.assertEqual(len(body.decode().splitlines()), 1 + len(self.variants))
+
+    def test_commands(self):
+        out = StringIO()
+        call_command("export_catalog", "--format", "ndjson", stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), len(self.variants))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "orders.csv"
+            call_command("export_orders", "--city", "Kochi", "--output", str(path))
+            self.assertEqual(len(path.read_text().splitlines()), 3)
+
+
+class FacetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.silk = Category.objects.create(name="Silk", slug="silk")
+        cls.cotton = Category.objects.create(name="Cotton", slug="cotton")
+        # red silk with and without blouse, blue silk, red cotton (sold out)
+        cls.red_silk, cls.blue_silk = make_products(2, cls.silk, prefix="silk")
+        (cls.red_cotton,) = make_products(1, cls.cotton, prefix="cotton")
+        for product, color, option, price, stock in [
+            (cls.red_silk, "Red", "with_blouse", "1500", 2),
+            (cls.red_silk, "Red", "without_blouse", "2500", 1),
+            (cls.blue_silk, "Blue", "with_blouse", "6000", 4),
+            (cls.red_cotton, "red ", "with_blouse", "1800", 0),
+        ]:
+            ProductVariant.objects.create(
+                product=product, color=color, blouse_option=option, price=Decimal(price), stock=stock,
+            )
+
+    def setUp(self):
+        caching.clear()
+
+    def index(self, product):
+        return set(ProductFacet.objects.filter(product=product).values_list("facet", "value", "in_stock"))
+
+    def test_index_follows_variants_and_products(self):
+        self.assertEqual(self.index(self.red_silk), {
+            ("category", str(self.silk.pk), True),
+            ("blouse", "with_blouse", True),
+            ("blouse", "without_blouse", True),
+            ("color", "red", True),
+            ("price", "under-2000", True),
+            ("price", "2000-5000", True),
+        })
+        self.assertIn(("color", "red", False), self.index(self.red_cotton))
+
+        self.red_silk.variants.filter(blouse_option="without_blouse").update(price=Decimal("12000"))
+        self.red_silk.variants.get(blouse_option="without_blouse").save()
+        self.assertIn(("price", "10000-plus", True), self.index(self.red_silk))
+        self.assertNotIn(("price", "2000-5000", True), self.index(self.red_silk))
+
+        place_order(None, {v.pk: v.stock for v in self.red_silk.variants.all()}, **ADDRESS)
+        self.assertFalse(any(in_stock for _, _, in_stock in self.index(self.red_silk)))
+
+        self.red_silk.active = False
+        self.red_silk.save()
+        self.assertEqual(self.index(self.red_silk), set())
+
+        self.silk.delete()
+        self.assertIn(("category", "", True), self.index(self.blue_silk))
+
+    def test_rebuild_matches_incremental_index(self):
+        before = set(ProductFacet.objects.values_list("product_id", "facet", "value", "in_stock"))
+        out = StringIO()
+        call_command("rebuild_facets", "--batch-size", "2", stdout=out)
+        self.assertIn("Facet index rebuilt", out.getvalue())
+        self.assertEqual(set(ProductFacet.objects.values_list("product_id", "facet", "value", "in_stock")), before)
+
+    def test_listing_filters_and_counts(self):
+        response = self.client.get(reverse("home"), {"color": "red"})
+        self.assertEqual({p.pk for p in response.context["products"]}, {self.red_silk.pk, self.red_cotton.pk})
+
+        groups = {g["name"]: {o["value"]: (o["count"], o["selected"]) for o in g["options"]}
+                  for g in response.context["facet_groups"]}
+        # a facet's own selection does not narrow its counts
+        self.assertEqual(groups["color"], {"blue": (1, False), "red": (2, True)})
+        self.assertEqual(groups["blouse"], {"with_blouse": (2, False), "without_blouse": (1, False)})
+        self.assertEqual(groups["price"], {"under-2000": (2, False), "2000-5000": (1, False)})
+        self.assertEqual(dict((c.slug, n) for c, n in response.context["category_chips"]), {"silk": 1, "cotton": 1})
+        self.assertEqual(response.context["in_stock_count"], 1)
+
+        response = self.client.get(reverse("home"), {"color": "red", "in_stock": "1"})
+        self.assertEqual([p.pk for p in response.context["products"]], [self.red_silk.pk])
+        self.assertEqual(response.context["all_count"], 1)
+
+    def test_category_page_counts_other_categories(self):
+        response = self.client.get(reverse("category_page", args=["silk"]), {"price": ["under-2000", "5000-10000"]})
+        self.assertEqual({p.pk for p in response.context["products"]}, {self.red_silk.pk, self.blue_silk.pk})
+        self.assertEqual(dict((c.slug, n) for c, n in response.context["category_chips"]), {"silk": 2, "cotton": 1})
+        self.assertEqual(response.context["all_count"], 3)
+        self.assertIn("price=under-2000", response.context["filter_query"])
+
+    def test_counts_cost_one_query_per_selected_facet(self):
+        with self.assertNumQueries(1):
+            facets.counts({})
+        with self.assertNumQueries(3):
+            facets.counts({"category": [str(self.silk.pk)], "color": ["red"]})
+
+
+class StaticPipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.TemporaryDirectory()
+        cls.collected = override_settings(STATIC_ROOT=cls.static_root.name)
+        cls.collected.enable()
+        call_command("collectstatic", interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.collected.disable()
+        cls.static_root.cleanup()
+        super().tearDownClass()
+
+    def home_html(self):
+        caching.clear()
+        return self.client.get(reverse("home")).content.decode()
+
+    def test_first_paint_is_hashed_precompressed_css(self):
+        html = self.home_html()
+        self.assertNotIn("cdn.tailwindcss.com", html)
+        before = assets.first_paint(html, "identity")
+        after = assets.first_paint(html, "br")
+
+        self.assertEqual(len(after.assets), 2)  # tailwind.css + style.css, no blocking scripts
+        for url in after.assets:
+            self.assertRegex(url, r"/static/siteapp/(tailwind|style)\.[0-9a-f]{12}\.css$")
+        self.assertLessEqual(after.total, assets.FIRST_PAINT_BUDGET)
+        self.assertLess(after.total * 3, before.total)
+        self.assertLess(assets.first_paint(html, "gzip").total, before.total)
+
+    def test_served_with_far_future_immutable_headers(self):
+        url = next(iter(assets.first_paint(self.home_html()).assets))
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("max-age=315360000", response["Cache-Control"])
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+
+        # unhashed names may change under the same URL
+        response = self.client.get("/static/siteapp/style.css")
+        self.assertNotIn("immutable", response["Cache-Control"])
+
+    async def test_served_from_the_async_middleware_chain(self):
+        html = (await self.async_client.get(reverse("home"))).content.decode()
+        url = next(iter(assets.first_paint(html).assets))
+        response = await self.async_client.get(url, headers={"Accept-Encoding": "br"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Encoding"], "br")
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.silk = Category.objects.create(name="Silk", slug="silk")
+        (cls.product,) = make_products(1, cls.silk)
+        cls.variant = make_variants([cls.product])[0]
+
+    def setUp(self):
+        caching.clear()
+
+    def revalidate(self, url, response, **headers):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"], **headers)
+
+    def test_unchanged_pages_get_304_without_rendering(self):
+        for url, queries in [
+            (reverse("home"), 0),
+            (reverse("category_page", args=["silk"]), 0),
+            (self.product.get_absolute_url(), 1),  # the product's created_at
+        ]:
+            with self.subTest(url=url):
+                self.client.get(url)  # sets the CSRF cookie the validators include
+                first = self.client.get(url)
+                self.assertTrue(first["ETag"].startswith('W/"'))
+                self.assertIn("no-cache", first["Cache-Control"])
+
+                with self.assertNumQueries(queries), self.assertTemplateNotUsed("siteapp/base.html"):
+                    second = self.revalidate(url, first)
+                self.assertEqual(second.status_code, 304)
+                self.assertEqual(second["ETag"], first["ETag"])
+
+                since = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+                self.assertEqual(since.status_code, 304)
+
+    def test_catalog_changes_and_other_pages_do_not_match(self):
+        url = reverse("home")
+        self.client.get(url)
+        first = self.client.get(url)
+
+        other = self.client.get(url + "?sort=price_asc", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(other.status_code, 200)
+
+        self.variant.price += 1
+        with self.captureOnCommitCallbacks(execute=True):
+            self.variant.save()
+        changed = self.revalidate(url, first)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], first["ETag"])
+
+    def test_missing_products_and_sessions_are_not_validated(self):
+        url = self.product.get_absolute_url()
+        self.client.get(url)
+        first = self.client.get(url)
+
+        # raw update, cache flushed within the same second: only the product lookup notices
+        Product.objects.filter(pk=self.product.pk).update(active=False)
+        caching.clear()
+        self.assertEqual(self.revalidate(url, first).status_code, 404)
+
+        user = get_user_model().objects.create_user("meera", password="pw")
+        self.client.force_login(user)
+        response = self.revalidate(reverse("home"), first)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("ETag", response)
+
+
+SEPARATE_REPLICA = routing.replica_configured() and not connections.settings[routing.REPLICA]["TEST"].get("MIRROR")
+
+
+@skipUnless(SEPARATE_REPLICA, "needs an unmirrored replica: --settings=Saree_site.settings_replica_test")
+class ReplicaRoutingTests(TestCase):
+    databases = {"default", routing.REPLICA} if SEPARATE_REPLICA else {"default"}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = get_user_model().objects.create_user("staff", password="pw-12345", is_staff=True)
+        (cls.primary_only,) = make_products(1, prefix="primary")
+        # "replicated": the same rows on both databases
+        cls.product = Product.objects.create(title="Replicated", slug="replicated", base_price=Decimal("1999.00"))
+        Product.objects.using(routing.REPLICA).create(
+            pk=cls.product.pk, title="Replicated", slug="replicated", base_price=Decimal("1999.00"),
+        )
+        cls.variant = make_variants([cls.product])[0]
+        ProductVariant.objects.using(routing.REPLICA).create(
+            pk=cls.variant.pk, product_id=cls.product.pk, blouse_option=cls.variant.blouse_option,
+            price=cls.variant.price, stock=cls.variant.stock,
+        )
+
+    def setUp(self):
+        caching.clear()
+        # the catalog last changed well outside the lag window
+        caching.get_cache().set(caching.CHANGED_KEY, 0, timeout=None)
+
+    def test_catalog_pages_read_from_the_replica(self):
+        with CaptureQueriesContext(connections[routing.REPLICA]) as replica:
+            self.assertEqual(self.client.get(self.product.get_absolute_url()).status_code, 200)
+        self.assertTrue(replica.captured_queries)
+        # not replicated yet
+        self.assertEqual(self.client.get(self.primary_only.get_absolute_url()).status_code, 404)
+
+    def test_successful_post_pins_the_visitor_to_the_primary(self):
+        user = get_user_model().objects.create_user("meera", password="pw")
+        self.client.force_login(user)
+        response = self.client.post(reverse("add_to_cart"), {"variant_id": self.variant.pk, "quantity": 1})
+        self.assertIn(routing.PIN_COOKIE, response.cookies)
+
+        caching.clear()
+        caching.get_cache().set(caching.CHANGED_KEY, 0, timeout=None)
+        self.assertEqual(self.client.get(self.primary_only.get_absolute_url()).status_code, 200)
+
+        caching.clear()
+        caching.get_cache().set(caching.CHANGED_KEY, 0, timeout=None)
+        self.client.cookies[routing.PIN_COOKIE] = "0"  # expired
+        self.assertEqual(self.client.get(self.primary_only.get_absolute_url()).status_code, 404)
+
+    def test_recent_catalog_change_reads_from_the_primary(self):
+        caching.get_cache().set(caching.CHANGED_KEY, int(timezone.now().timestamp()), timeout=None)
+        with CaptureQueriesContext(connections[routing.REPLICA]) as replica:
+            self.assertEqual(self.client.get(self.primary_only.get_absolute_url()).status_code, 200)
+        self.assertEqual(replica.captured_queries, [])
+
+    def test_streamed_export_reads_from_the_replica_and_writes_stay_on_the_primary(self):
+        Product.objects.filter(pk=self.product.pk).update(title="Renamed on the primary")
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse("export_catalog", args=["csv"]))
+        rows = list(csv.DictReader(StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual([r["product"] for r in rows], ["Replicated"])
+
+        read = Product.objects.using(routing.REPLICA).get(pk=self.product.pk)
+        self.assertEqual(routing.ReplicaRouter().db_for_write(Product, instance=read), "default")
+
+
+class DatabaseConfigTests(SimpleTestCase):
+    def test_pooled_with_health_checks_by_default(self):
+        config = db_config.database({})
+        self.assertEqual(config["CONN_MAX_AGE"], 0)
+        self.assertTrue(config["CONN_HEALTH_CHECKS"])
+        self.assertEqual(config["OPTIONS"]["pool"]["max_size"], 10)
+        self.assertNotIn("prepare_threshold", config["OPTIONS"])
+
+        config = db_config.database({"DATABASE_POOL": "0", "DATABASE_HOST": "db.internal"})
+        self.assertNotIn("pool", config["OPTIONS"])
+        self.assertEqual(config["CONN_MAX_AGE"], 60)
+        self.assertEqual(config["HOST"], "db.internal")
+
+    def test_statement_timeout_depends_on_the_process_role(self):
+        storefront = db_config.database({"DATABASE_ROLE": db_config.STOREFRONT})
+        self.assertEqual(storefront["OPTIONS"]["options"], "-c statement_timeout=5000")
+        command = db_config.database({})
+        self.assertEqual(command["OPTIONS"]["options"], "-c statement_timeout=600000")
+        unlimited = db_config.database({"DATABASE_COMMAND_STATEMENT_TIMEOUT": "0"})
+        self.assertNotIn("options", unlimited["OPTIONS"])
+
+    def test_prepared_statements_are_opt_in(self):
+        config = db_config.database({"DATABASE_PREPARE_THRESHOLD": "5"})
+        self.assertTrue(config["OPTIONS"]["server_side_binding"])
+        self.assertEqual(config["OPTIONS"]["prepare_threshold"], 5)
+        self.assertFalse(config["DISABLE_SERVER_SIDE_CURSORS"])
+
+    def test_pgbouncer_drops_what_does_not_survive_transaction_pooling(self):
+        config = db_config.database({
+            "DATABASE_PREPARE_THRESHOLD": "5", "DATABASE_PGBOUNCER": "1", "DATABASE_ROLE": db_config.STOREFRONT,
+        })
+        self.assertNotIn("prepare_threshold", config["OPTIONS"])
+        self.assertNotIn("options", config["OPTIONS"])
+        self.assertTrue(config["DISABLE_SERVER_SIDE_CURSORS"])
@@ -6,6 +6,7 @@ from django.contrib.auth import views as auth_views
 urlpatterns = [
     path('', views.home, name='home'),
     path('products/<slug:slug>/', views.product_detail, name='product_detail'),
+    path('search/suggest/', views.search_suggest, name='search_suggest'),
 
     path('cart/', views.cart_page, name='cart'),
     path('cart/add/', views.add_to_cart, name='add_to_cart'),
@@ -32,5 +33,15 @@ urlpatterns = [
     ), name='logout'),
 
     path('my-orders/', views.my_orders, name='my_orders'),
+
+    # staff-only diagnostics
+    path('staff/cache-stats/', views.catalog_cache_stats, name='catalog_cache_stats'),
+    path('staff/perf/', views.perf_stats, name='perf_stats'),
+
+    # staff reporting
+    path('staff/reports/', views.sales_report, name='sales_report'),
+    path('staff/reports/export.csv', views.sales_report_csv, name='sales_report_csv'),
+    path('staff/export/orders.<str:fmt>', views.export_orders, name='export_orders'),
+    path('staff/export/catalog.<str:fmt>', views.export_catalog, name='export_catalog'),
 ]
 
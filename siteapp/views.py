@@ -1,47 +1,251 @@
-from decimal import Decimal
+import csv
 
+from asgiref.sync import sync_to_async
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import get_user_model, login
 from django.contrib.auth.decorators import login_required
-from django.db import transaction
-from django.db.models import Q
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Prefetch
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
+from django.template.loader import render_to_string
 
+from . import caching, cart_store, exports, facets, holds, instrumentation, reports, routing
+from .cart import get_cart, get_variant_or_404, resolve_cart, save_cart
+from .checkout import OutOfStock, place_order
+from .conditional import conditional_page, product_created
 from .forms import SignUpForm, CheckoutForm
-from .models import Product, ProductVariant, OrderItem, Order, Category
+from .models import Product, Order, OrderItem, Category, DailyRollup, ProductFacet
+from .pagination import CATALOG_ORDERING, LISTING_SORTS, ORDERS_PAGE_SIZE, KeysetPaginator
+from .search import SEARCH_ORDERING, search_products, suggest
 
 
 User = get_user_model()
 
 
-def home(request):
-    categories = Category.objects.all()
-    products = Product.objects.filter(active=True).order_by("-created_at")
+async def _prepare_for_render(request):
+    """
+    Resolve what the base template reads lazily (user, session, cart badge)
+    so rendering in an async view never touches the database.
+    """
+    request.user = await request.auser()
+    await sync_to_async(get_cart)(request)
+
+
+async def _all_categories():
+    return [c async for c in Category.objects.all()]
+
+
+async def _catalog_listing(request, slug=None):
+    """
+    Shared listing for ``home`` and ``category_page``: one keyset-paginated
+    page of active products with their category joined in, so the number of
+    queries per page stays constant regardless of catalog size. Facet filters
+    (blouse / color / price) and their counts come from the facet index. The
+    rendered grid, the counts and the category list are cached per catalog
+    version.
+
+    Async: under ASGI a listing waits on the cache and the database without
+    holding a worker thread.
+    """
+    categories = await caching.aget_or_set(await caching.amake_key("categories"), _all_categories)
+
+    category = None
+    if slug is not None:
+        category = next((c for c in categories if c.slug == slug), None)
+        if category is None:
+            raise Http404("No such category.")
 
     q = request.GET.get("q", "").strip()
-    if q:
-        products = products.filter(
-            Q(title__icontains=q) |
-            Q(description__icontains=q)
-        )
+    sort = request.GET.get("sort", "")
+    in_stock_only = bool(request.GET.get("in_stock"))
+    selection = facets.parse_selection(request.GET)
+
+    async def render_grid():
+        products = Product.objects.filter(active=True).select_related("category")
+        if category is not None:
+            products = products.filter(category=category)
+
+        if in_stock_only:
+            products = products.filter(in_stock=True)
+        products = facets.filter_products(products, selection)
+
+        ordering = LISTING_SORTS.get(sort, CATALOG_ORDERING)
+        if sort in ("price_asc", "price_desc"):
+            # products without variants have no price to sort by
+            products = products.filter(min_price__isnull=False)
+
+        if q:
+            # the SQLite fallback may have to load its index first
+            products = await sync_to_async(search_products)(products, q)
+            if sort not in LISTING_SORTS:
+                ordering = SEARCH_ORDERING
+
+        page = await KeysetPaginator(products, ordering).apage(request.GET.get("after"))
+        grid_context = {
+            "products": page.object_list,
+            "page": page,
+            "current_search": q,
+            "filtered": bool(selection),
+        }
+        return render_to_string("siteapp/_product_grid.html", grid_context, request=request)
+
+    async def count_facets():
+        counted = dict(selection)
+        if category is not None:
+            counted[ProductFacet.CATEGORY] = [str(category.pk)]
+        return await sync_to_async(facets.counts)(counted, q)
+
+    facet_counts = await caching.aget_or_set(
+        await caching.amake_key("facets", category.slug if category else "", sorted(selection.items()), q),
+        count_facets,
+    )
+    category_counts = facets.category_counts(facet_counts, in_stock_only)
+    # chip links keep the filters, but start from the first page
+    filter_query = request.GET.copy()
+    filter_query.pop("after", None)
 
     context = {
-        "products": products,
+        "product_grid": await caching.aget_or_set(await caching.alisting_key(request, category), render_grid),
         "categories": categories,
-        "current_category": None,
+        "category_chips": [(c, category_counts.get(c.pk, 0)) for c in categories],
+        "all_count": facets.all_count(facet_counts, in_stock_only),
+        "facet_groups": facets.options(selection, facet_counts, in_stock_only),
+        "in_stock_count": facets.in_stock_count(facet_counts, category),
+        "filter_query": filter_query.urlencode(),
+        "current_category": category,
         "current_search": q,
+        "current_sort": sort,
+        "in_stock_only": in_stock_only,
     }
+    await _prepare_for_render(request)
     return render(request, "siteapp/home.html", context)
 
 
-def product_detail(request, slug):
-    product = get_object_or_404(Product, slug=slug, active=True)
-    variants = product.variants.all()
+@routing.replica_reads
+@conditional_page()
+async def home(request):
+    return await _catalog_listing(request)
+
+
+def search_suggest(request):
+    q = request.GET.get("q", "").strip()
+    results = []
+    if q:
+        results = [
+            {"title": p.title, "url": p.get_absolute_url()}
+            for p in suggest(q)
+        ]
+    return JsonResponse({"results": results})
+
+
+@routing.replica_reads
+@conditional_page(product_created)
+async def product_detail(request, slug):
+    async def load():
+        try:
+            product = await Product.objects.select_related("category").aget(slug=slug, active=True)
+        except Product.DoesNotExist:
+            raise Http404("No such product.")
+        return {
+            "product": product,
+            "variants": [v async for v in product.variants.all()],
+        }
+
+    context = await caching.aget_or_set(await caching.amake_key("product", slug), load)
+    await _prepare_for_render(request)
+    # stock less other carts' holds; not cached, holds change without a catalog bump
+    held = await holds.aheld_by_others([v.pk for v in context["variants"]], cart_store.cart_key(request))
+    for v in context["variants"]:
+        v.available = holds.unheld(v, held)
+    return render(request, "siteapp/product_detail.html", context)
+
+
+@staff_member_required
+def catalog_cache_stats(request):
+    return JsonResponse({
+        "catalog_version": caching.catalog_version(),
+        "stats": caching.stats(),
+    })
+
+
+@staff_member_required
+def perf_stats(request):
+    return JsonResponse(instrumentation.report(request.GET.get("view") or None))
+
+
+@staff_member_required
+@routing.replica_reads
+def sales_report(request):
+    """Sales dashboard; reads only the daily rollups (reports.py)."""
+    start, end = reports.date_range(request.GET.get("start"), request.GET.get("end"))
     context = {
-        "product": product,
-        "variants": variants,
+        "start": start,
+        "end": end,
+        "days": reports.daily_totals(start, end),
+        "categories_by_day": reports.by_day(DailyRollup.CATEGORY, start, end),
+        "top_variants": reports.top(DailyRollup.VARIANT, start, end),
+        "top_cities": reports.top(DailyRollup.CITY, start, end, limit=10),
+        "payment_statuses": reports.top(DailyRollup.PAYMENT_STATUS, start, end, limit=None),
+        "dimensions": DailyRollup.DIMENSION_CHOICES,
     }
-    return render(request, "siteapp/product_detail.html", context)
+    return render(request, "siteapp/sales_report.html", context)
+
+
+@staff_member_required
+@routing.replica_reads
+def sales_report_csv(request):
+    dimension = request.GET.get("dimension", DailyRollup.CATEGORY)
+    if dimension not in dict(DailyRollup.DIMENSION_CHOICES):
+        raise Http404("No such dimension.")
+    start, end = reports.date_range(request.GET.get("start"), request.GET.get("end"))
+
+    response = HttpResponse(content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="sales-{dimension}-{start}-{end}.csv"'
+    writer = csv.writer(response)
+    writer.writerow(reports.EXPORT_COLUMNS)
+    writer.writerows(reports.export_rows(dimension, start, end))
+    return response
+
+
+def _stream(request, chunks, fmt, name):
+    if isinstance(request, ASGIRequest):
+        # a sync iterator would be read into memory before the first byte
+        chunks = exports.aiterate(chunks)
+    response = StreamingHttpResponse(chunks, content_type=exports.FORMATS[fmt])
+    response["Content-Disposition"] = f'attachment; filename="{name}.{fmt}"'
+    return response
+
+
+@staff_member_required
+@routing.replica_reads
+def export_orders(request, fmt):
+    """Orders with their items as CSV / NDJSON, filtered by ?start=&end=&status=&city=."""
+    if fmt not in exports.FORMATS:
+        raise Http404("No such format.")
+    try:
+        start = exports.parse_date(request.GET.get("start"))
+        end = exports.parse_date(request.GET.get("end"))
+    except ValueError:
+        return HttpResponseBadRequest("Dates must look like 2025-01-31.")
+
+    chunks = exports.export_orders(
+        fmt, start=start, end=end,
+        status=request.GET.get("status") or None,
+        city=request.GET.get("city") or None,
+        # read while streaming, after the view has returned
+        using=routing.current(),
+    )
+    return _stream(request, chunks, fmt, "orders")
+
+
+@staff_member_required
+@routing.replica_reads
+def export_catalog(request, fmt):
+    if fmt not in exports.FORMATS:
+        raise Http404("No such format.")
+    return _stream(request, exports.export_catalog(fmt, using=routing.current()), fmt, "catalog")
 
 
 def add_to_cart(request):
@@ -53,24 +257,27 @@ def add_to_cart(request):
         messages.error(request, "Please log in to add items to your cart.")
         return redirect("login")
 
-    variant_id = request.POST.get("variant_id")
-    variant = get_object_or_404(ProductVariant, id=variant_id)
+    variant = get_variant_or_404(request.POST.get("variant_id"))
 
-    # OUT OF STOCK
-    if variant.stock <= 0:
+    key = cart_store.cart_key(request, create=True)
+
+    # OUT OF STOCK (pieces in other shoppers' carts are held for them)
+    if holds.unheld(variant, holds.held_by_others([variant.id], key)) <= 0:
         messages.error(request, "This item is out of stock.")
         return redirect("product_detail", slug=variant.product.slug)
 
-    cart = request.session.get("cart", {})
-    variant_id = str(variant_id)
+    cart = get_cart(request)
+    variant_id = str(variant.id)
     current_qty = cart.get(variant_id, 0)
 
-    if current_qty + 1 > variant.stock:
-        messages.error(request, f"Only {variant.stock} piece(s) available.")
+    try:
+        holds.reserve(key, variant.id, current_qty + 1)
+    except holds.NotAvailable as exc:
+        messages.error(request, f"Only {exc.available} piece(s) available.")
         return redirect("cart")
 
     cart[variant_id] = current_qty + 1
-    request.session["cart"] = cart
+    save_cart(request, cart)
 
     messages.success(request, "Item added to cart.")
     return redirect("cart")
@@ -78,49 +285,26 @@ def add_to_cart(request):
 
 @login_required
 def cart_page(request):
-    cart = request.session.get("cart", {})
-
-    items = []
-    total = Decimal("0.00")
-
-    for variant_id, qty in cart.items():
-        variant = get_object_or_404(ProductVariant, id=variant_id)
-        subtotal = variant.price * qty
-        items.append({
-            "variant": variant,
-            "quantity": qty,
-            "subtotal": subtotal,
-        })
-        total += subtotal
+    items = resolve_cart(request)
+    if items:
+        holds.extend(cart_store.cart_key(request))
 
     context = {
         "items": items,
-        "total": total,
+        "total": items.total,
     }
     return render(request, "siteapp/cart.html", context)
 
 
 @login_required
 def checkout(request):
-    cart = request.session.get("cart", {})
+    # build items + total from cart
+    items = resolve_cart(request)
+    total = items.total
 
-    if not cart:
+    if not items:
         return redirect("cart")
 
-    # build items + total from cart
-    items = []
-    total = Decimal("0.00")
-    for variant_id, qty in cart.items():
-        variant = get_object_or_404(ProductVariant, id=variant_id)
-        subtotal = variant.price * qty
-
-        items.append({
-            "variant": variant,
-            "quantity": qty,
-            "subtotal": subtotal,
-        })
-        total += subtotal
-
     if request.method == "POST":
         form = CheckoutForm(request.POST)
         if not form.is_valid():
@@ -134,60 +318,32 @@ def checkout(request):
 
         # valid data
         cleaned = form.cleaned_data
-        name = cleaned["name"]
-        phone = cleaned["phone"]
-        address1 = cleaned["address_line1"]
-        address2 = cleaned["address_line2"]
-        city = cleaned["city"]
-        pincode = cleaned["pincode"]
-
-        # stock validation before ordering
-        for item in items:
-            variant = item["variant"]
-            qty = item["quantity"]
-
-            if variant.stock < qty:
-                messages.error(
-                    request,
-                    f"Only {variant.stock} left for {variant.product.title} ({variant.color})."
-                )
-                return redirect("cart")
-
-        # atomically create order, items, and reduce stock
-        with transaction.atomic():
-            order = Order.objects.create(
-                user=request.user if request.user.is_authenticated else None,
-                customer_name=name,
-                phone=phone,
-                address_line1=address1,
-                address_line2=address2,
-                city=city,
-                pincode=pincode,
-                total=total,
-                status="pending",
-                payment_method="cod",       # for now always COD
-                payment_status="pending",   # not yet collected
-            )
+        quantities = {item.variant.id: item.quantity for item in items}
 
-            for item in items:
-                OrderItem.objects.create(
-                    order=order,
-                    variant=item["variant"],
-                    quantity=item["quantity"],
-                    price=item["variant"].price,
-                )
-
-            for item in items:
-                variant = item["variant"]
-                variant.stock -= item["quantity"]
-                variant.save()
+        # stock is re-checked and decremented under row locks
+        try:
+            order = place_order(
+                request.user if request.user.is_authenticated else None,
+                quantities,
+                cart_key=cart_store.cart_key(request),
+                customer_name=cleaned["name"],
+                phone=cleaned["phone"],
+                address_line1=cleaned["address_line1"],
+                address_line2=cleaned["address_line2"],
+                city=cleaned["city"],
+                pincode=cleaned["pincode"],
+            )
+        except OutOfStock as exc:
+            messages.error(request, exc.message)
+            return redirect("cart")
 
-        request.session["cart"] = {}
+        save_cart(request, {})
         return redirect("order_thank_you", pk=order.pk)
 
     else:
         # GET request: empty form
         form = CheckoutForm()
+        holds.extend(cart_store.cart_key(request))
 
     context = {
         "items": items,
@@ -198,8 +354,18 @@ def checkout(request):
 
 
 
+def _orders_with_items():
+    # items and their variant/product come from one extra query
+    return Order.objects.prefetch_related(
+        Prefetch(
+            "items",
+            queryset=OrderItem.objects.select_related("variant__product"),
+        )
+    )
+
+
 def order_thank_you(request, pk):
-    order = get_object_or_404(Order, pk=pk)
+    order = get_object_or_404(_orders_with_items(), pk=pk)
     return render(request, "siteapp/order_thank_you.html", {"order": order})
 
 
@@ -212,11 +378,12 @@ def remove_from_cart(request):
         return redirect("cart")
 
     variant_id = str(variant_id)
-    cart = request.session.get("cart", {})
+    cart = get_cart(request)
 
     if variant_id in cart:
         del cart[variant_id]
-        request.session["cart"] = cart
+        save_cart(request, cart)
+        holds.release(cart_store.cart_key(request), [variant_id])
         messages.success(request, "Item removed from cart.")
 
     return redirect("cart")
@@ -226,7 +393,10 @@ def clear_cart(request):
     if request.method != "POST":
         return redirect("cart")
 
-    request.session["cart"] = {}
+    key = cart_store.cart_key(request)
+    save_cart(request, {})
+    if key is not None:
+        holds.release(key)
     messages.success(request, "Cart cleared.")
     return redirect("cart")
 
@@ -242,38 +412,47 @@ def update_cart_quantity(request):
         return redirect("cart")
 
     variant_id = str(variant_id)
-    cart = request.session.get("cart", {})
+    cart = get_cart(request)
 
     if variant_id not in cart:
         return redirect("cart")
 
     current_qty = cart[variant_id]
-    variant = get_object_or_404(ProductVariant, id=variant_id)
+    variant = get_variant_or_404(variant_id)
+
+    key = cart_store.cart_key(request, create=True)
 
     if action == "inc":
-        # don't allow exceeding stock
-        if current_qty + 1 > variant.stock:
+        # don't allow exceeding stock not held by other carts
+        try:
+            holds.reserve(key, variant.id, current_qty + 1)
+        except holds.NotAvailable as exc:
             messages.error(
                 request,
-                f"Only {variant.stock} piece(s) available for {variant.product.title}."
+                f"Only {exc.available} piece(s) available for {variant.product.title}."
             )
             return redirect("cart")
 
         cart[variant_id] = current_qty + 1
 
     elif action == "dec":
-        # if quantity goes to 0, remove item
+        # if quantity goes to 0, remove item (and its hold)
+        try:
+            holds.reserve(key, variant.id, current_qty - 1, current=current_qty)
+        except holds.NotAvailable:
+            messages.error(request, f"{variant.product.title} is no longer available.")
+            return redirect("cart")
         if current_qty <= 1:
             del cart[variant_id]
             messages.success(request, "Item removed from cart.")
         else:
             cart[variant_id] = current_qty - 1
 
-    request.session["cart"] = cart
+    save_cart(request, cart)
     return redirect("cart")
 
 
-def order_track(request):
+async def order_track(request):
     order = None
 
     if request.method == "POST":
@@ -285,33 +464,19 @@ def order_track(request):
             return redirect("order_track")
 
         try:
-            order = Order.objects.get(id=order_id, phone=phone)
-        except Order.DoesNotExist:
+            order = await _orders_with_items().aget(id=order_id, phone=phone)
+        except (Order.DoesNotExist, ValueError):
             messages.error(request, "No order found for that ID and phone number.")
             return redirect("order_track")
 
+    await _prepare_for_render(request)
     return render(request, "siteapp/order_track.html", {"order": order})
 
 
-def category_page(request, slug):
-    category = get_object_or_404(Category, slug=slug)
-    categories = Category.objects.all()
-    products = Product.objects.filter(active=True, category=category).order_by("-created_at")
-
-    q = request.GET.get("q", "").strip()
-    if q:
-        products = products.filter(
-            Q(title__icontains=q) |
-            Q(description__icontains=q)
-        )
-
-    context = {
-        "products": products,
-        "categories": categories,
-        "current_category": category,
-        "current_search": q,
-    }
-    return render(request, "siteapp/home.html", context)
+@routing.replica_reads
+@conditional_page()
+async def category_page(request, slug):
+    return await _catalog_listing(request, slug=slug)
 
 
 def signup(request):
@@ -330,5 +495,11 @@ def signup(request):
 
 @login_required
 def my_orders(request):
-    orders = Order.objects.filter(user=request.user).order_by("-created_at")
-    return render(request, "siteapp/my_orders.html", {"orders": orders})
+    orders = _orders_with_items().filter(user=request.user)
+    page = KeysetPaginator(orders, page_size=ORDERS_PAGE_SIZE).page(request.GET.get("after"))
+
+    context = {
+        "orders": page.object_list,
+        "page": page,
+    }
+    return render(request, "siteapp/my_orders.html", context)